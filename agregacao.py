@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# Dimensões de cliente disponíveis no cubo (novas quebras entram aqui, sem novas varreduras)
+DIMENSOES = ("segmento", "categoria_servico", "servico_nivel2")
+
+# Quem atende o cliente na atribuição por oficina mais próxima
+ATENDIMENTO_PRINCIPAIS = "Principais"
+ATENDIMENTO_CONCORRENTES = "Concorrentes"
+ATENDIMENTO_NENHUM = "Nenhuma"
+ATENDIMENTOS = (ATENDIMENTO_PRINCIPAIS, ATENDIMENTO_CONCORRENTES, ATENDIMENTO_NENHUM)
+
+
+def classificar_atendimento(ids_oficina, ids_principais, ids_concorrentes):
+    """Rótulo de atendimento por cliente a partir do id da oficina atribuída"""
+    ids_oficina = np.asarray(ids_oficina)
+    return pd.Categorical(
+        np.select(
+            [np.isin(ids_oficina, ids_principais), np.isin(ids_oficina, ids_concorrentes)],
+            [ATENDIMENTO_PRINCIPAIS, ATENDIMENTO_CONCORRENTES],
+            default=ATENDIMENTO_NENHUM,
+        ),
+        categories=ATENDIMENTOS,
+    )
+
+
+def construir_cubo(clientes_df, atendimento=None, no_raio_concorrente=None, dimensoes=DIMENSOES, pesos=None):
+    """Contagem de clientes por (atendimento, no raio de concorrente, dimensões) em um único groupby.
+
+    As chaves são categóricas, então o groupby trabalha sobre os códigos e só
+    as combinações presentes viram linhas. O resultado é pequeno (no máximo
+    o produto das cardinalidades) e todas as tabelas da interface saem dele.
+    Com ``pesos`` (p. ex. participações do modelo de Huff) a coluna
+    ``clientes`` é a soma dos pesos em vez da contagem.
+    """
+    n = len(clientes_df)
+    if atendimento is None:
+        atendimento = pd.Categorical([ATENDIMENTO_NENHUM] * n, categories=ATENDIMENTOS)
+    if no_raio_concorrente is None:
+        no_raio_concorrente = np.zeros(n, dtype=bool)
+
+    chaves = {"atendimento": atendimento, "no_raio_concorrente": np.asarray(no_raio_concorrente, dtype=bool)}
+    for dimensao in dimensoes:
+        chaves[dimensao] = clientes_df[dimensao].astype("category").to_numpy()
+    chaves = pd.DataFrame(chaves)
+
+    colunas = list(chaves.columns)
+    if pesos is None:
+        cubo = chaves.groupby(colunas, observed=True).size()
+    else:
+        cubo = chaves.assign(peso=np.asarray(pesos, dtype=np.float64)).groupby(colunas, observed=True)["peso"].sum()
+    cubo = cubo.rename("clientes").reset_index()
+    for dimensao in ("atendimento",) + tuple(dimensoes):
+        cubo[dimensao] = cubo[dimensao].astype(str)
+    return cubo
+
+
+def _contagens(valores, cubo):
+    """Contagens inteiras; somas ponderadas (valores esperados) ficam com uma casa decimal"""
+    return valores.astype(int) if pd.api.types.is_integer_dtype(cubo["clientes"]) else valores.round(1)
+
+
+def fatiar(cubo, **filtros):
+    """Linhas do cubo que atendem a ``coluna=valor`` (ou ``coluna=[valores]``)"""
+    mascara = np.ones(len(cubo), dtype=bool)
+    for coluna, valor in filtros.items():
+        valores = valor if isinstance(valor, (list, tuple, set)) else [valor]
+        mascara &= cubo[coluna].isin(valores).to_numpy()
+    return cubo[mascara]
+
+
+def distribuicao(cubo, dimensao, **filtros):
+    """Contagem por valor da dimensão, em ordem decrescente (como ``value_counts``)"""
+    contagem = fatiar(cubo, **filtros).groupby(dimensao)["clientes"].sum()
+    contagem = contagem[contagem > 0]
+    return _contagens(contagem.sort_values(ascending=False, kind="stable"), cubo)
+
+
+def distribuicao_por_atendimento(cubo, dimensao, atendimentos=(ATENDIMENTO_PRINCIPAIS, ATENDIMENTO_CONCORRENTES)):
+    """Tabela dimensão x atendimento (valores em ordem alfabética, zeros preenchidos)"""
+    fatia = fatiar(cubo, atendimento=list(atendimentos))
+    tabela = fatia.pivot_table(index=dimensao, columns="atendimento", values="clientes", aggfunc="sum", fill_value=0)
+    return _contagens(tabela.reindex(columns=list(atendimentos), fill_value=0), cubo)
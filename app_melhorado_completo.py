@@ -3,118 +3,116 @@ import pandas as pd
 import numpy as np
 import folium
 from streamlit_folium import st_folium
-from geopy.distance import geodesic
 from shapely.geometry import Point
 import random
 import io
 import os
 
+from agregacao import construir_cubo, distribuicao, distribuicao_por_atendimento
+import cobertura
+import exportacao
+from mapa import adicionar_densidade, adicionar_oficinas_agrupadas, camadas_densidade
+import instrumentacao
+import motor
+import simulacao
+from motor import METODO_DISTANCIA, RAIO_MAXIMO_KM, posicoes_no_raio
+from rede_viaria import TEMPO_MAXIMO_MIN, no_tempo_de_oficinas
+
 # Obter o diretório atual do script
 CURRENT_DIR = os.path.dirname(__file__)
 
-# Função para determinar a categoria de serviço com base no nome da oficina
-def get_service_category(office_name):
-    office_name_lower = office_name.lower()
-    if "funilaria" in office_name_lower or "pintura" in office_name_lower:
-        return "Funilaria e Pintura"
-    elif "pneu" in office_name_lower or "roda" in office_name_lower:
-        return "Pneus e Rodas"
-    elif "eletrica" in office_name_lower or "eletr" in office_name_lower:
-        return "Elétrica"
-    elif "mecanica" in office_name_lower or "motor" in office_name_lower:
-        return "Mecânica"
-    elif "freio" in office_name_lower:
-        return "Freios"
-    elif "suspensao" in office_name_lower:
-        return "Suspensão"
-    elif "ar condicionado" in office_name_lower or "ar-condicionado" in office_name_lower:
-        return "Ar Condicionado"
-    elif "direcao" in office_name_lower:
-        return "Direção"
-    elif "escapamento" in office_name_lower:
-        return "Escapamento"
-    elif "vidro" in office_name_lower or "parabrisa" in office_name_lower:
-        return "Vidros"
-    elif "insulfilm" in office_name_lower:
-        return "Insulfilm"
-    elif "som" in office_name_lower or "multimidia" in office_name_lower:
-        return "Som e Multimídia"
-    elif "acessorios" in office_name_lower:
-        return "Acessórios"
-    elif "revisao" in office_name_lower or "preventiva" in office_name_lower:
-        return "Revisão e Manutenção Preventiva"
-    elif "estetica" in office_name_lower or "lavagem" in office_name_lower or "polimento" in office_name_lower:
-        return "Estética Automotiva"
-    else:
-        return "Outros Serviços"
-
-# Função para determinar o serviço nível 2 com base no nome da oficina
-def get_service_level2(office_name):
-    office_name_lower = office_name.lower()
-    if "troca de oleo" in office_name_lower:
-        return "Troca de Óleo"
-    elif "balanceamento" in office_name_lower or "geometria" in office_name_lower:
-        return "Balanceamento e Geometria"
-    elif "alinhamento" in office_name_lower:
-        return "Alinhamento"
-    elif "freio" in office_name_lower:
-        return "Manutenção de Freios"
-    elif "suspensao" in office_name_lower:
-        return "Manutenção de Suspensão"
-    elif "escapamento" in office_name_lower:
-        return "Manutenção de Escapamento"
-    elif "bateria" in office_name_lower:
-        return "Troca de Bateria"
-    elif "filtro" in office_name_lower:
-        return "Troca de Filtros"
-    elif "limpeza de bico" in office_name_lower:
-        return "Limpeza de Bicos"
-    elif "cambio" in office_name_lower:
-        return "Manutenção de Câmbio"
-    elif "motor" in office_name_lower:
-        return "Manutenção de Motor"
-    elif "ar condicionado" in office_name_lower or "ar-condicionado" in office_name_lower:
-        return "Manutenção de Ar Condicionado"
-    elif "direcao" in office_name_lower:
-        return "Manutenção de Direção"
-    elif "insulfilm" in office_name_lower:
-        return "Instalação de Insulfilm"
-    elif "som" in office_name_lower or "multimidia" in office_name_lower:
-        return "Instalação de Som/Multimídia"
-    elif "alarme" in office_name_lower:
-        return "Instalação de Alarme"
-    elif "rastreador" in office_name_lower:
-        return "Instalação de Rastreador"
-    elif "martelinho de ouro" in office_name_lower:
-        return "Martelinho de Ouro"
-    elif "polimento" in office_name_lower:
-        return "Polimento"
-    elif "cristalizacao" in office_name_lower or "vitrificacao" in office_name_lower:
-        return "Cristalização/Vitrificação"
-    elif "lavagem" in office_name_lower:
-        return "Lavagem"
-    else:
-        return "Não Especificado"
-
-def to_csv(df):
-    """Converte DataFrame para CSV em bytes"""
-    return df.to_csv(index=False).encode("utf-8")
+def botao_exportar(df, rotulo, nome_arquivo, formato, chave):
+    """Botão de download que só gera o arquivo (em lotes, ver exportacao.py) quando clicado"""
+    st.download_button(
+        label=rotulo,
+        data=lambda: exportacao.arquivo_exportacao(df, formato),
+        file_name=f"{nome_arquivo}.{formato}",
+        mime=exportacao.TIPOS_MIME[formato],
+        key=chave,
+    )
 
 # Configuração da página
 st.set_page_config(page_title="Simulador Visual - Versão Estável", layout="wide")
 
-# Carregar dados
+# Medição das etapas desta execução (painel "Desempenho" e, com SIMULADOR_LOG_DESEMPENHO, log JSON lines)
+instrumentacao.configurar_log()
+medidor = instrumentacao.Medidor()
+
+# Base compartilhada por todas as sessões do processo (st.cache_resource, sem cópia
+# por sessão): dados já enriquecidos com classificação, máscaras de bits, demanda e,
+# com o grafo ao lado dos dados, âncoras na rede viária; índices espaciais, matriz de
+# capacidades e tempos até as oficinas. Os arrays ficam somente leitura e as sessões
+# trabalham com posições e visões (iloc, copy-on-write) sobre os DataFrames, sem
+# nunca atribuir colunas neles. Um grafo adicionado depois só entra ao limpar o cache.
+ARQUIVO_GRAFO = os.path.join(CURRENT_DIR, motor.ARQUIVO_GRAFO)
+
+@st.cache_resource
+def carregar_base():
+    arquivo_grafo = ARQUIVO_GRAFO if os.path.exists(ARQUIVO_GRAFO) else None
+    return motor.congelar_base(motor.carregar_base(CURRENT_DIR, METODO_DISTANCIA, arquivo_grafo=arquivo_grafo))
+
+with medidor.etapa("carregar_dados") as registro:
+    base = carregar_base()
+    registro["linhas_saida"] = len(base.clientes)
+clientes_df, oficinas_df, codificadores = base.clientes, base.oficinas, base.codificadores
+capacidades_oficinas = base.capacidades
+
+# Rede viária opcional: com ela o raio pode ser medido em minutos
+rede_disponivel = base.rede is not None
+tempos_oficinas = base.tempos_oficinas
+
+# Anéis de cobertura de todas as oficinas (clientes acumulados por anel de 0,5 km e
+# grupo de segmento/serviço), calculados uma vez por processo na primeira consulta
+@st.cache_resource
+def carregar_aneis():
+    return cobertura.construir_aneis(carregar_base())
+
+# Pipeline de filtros em etapas: cada etapa é memorizada pelos próprios parâmetros
+# (tuplas) e devolve só posições, então mexer em um widget recalcula apenas as
+# etapas a partir dele; mover o raio reaproveita todas e faz só uma busca binária
+@st.cache_data
+def etapa_segmento_zona(segmentos, zonas):
+    """Posições de clientes e oficinas após os filtros de segmento e zona, e os bairros disponíveis"""
+    base = carregar_base()
+    return motor.filtrar_segmento_zona(base.clientes, base.oficinas, base.codificadores, segmentos, zonas)
+
 @st.cache_data
-def load_data():
-    clientes_df = pd.read_csv(os.path.join(CURRENT_DIR, "clientes_com_segmento.csv"))
-    oficinas_df = pd.read_csv(os.path.join(CURRENT_DIR, "oficinas_com_segmento.csv"))
-    return clientes_df, oficinas_df
+def etapa_bairros(segmentos, zonas, bairros):
+    posicoes_clientes, posicoes_oficinas, _ = etapa_segmento_zona(segmentos, zonas)
+    base = carregar_base()
+    return motor.filtrar_bairros(base.clientes, base.oficinas, posicoes_clientes, posicoes_oficinas, bairros)
 
-clientes_df, oficinas_df = load_data()
+@st.cache_data
+def etapa_servicos(segmentos, zonas, bairros, categorias, servicos_nivel2):
+    posicoes_clientes, posicoes_oficinas = etapa_bairros(segmentos, zonas, bairros)
+    base = carregar_base()
+    return motor.filtrar_servicos(base.clientes, base.oficinas, posicoes_clientes, posicoes_oficinas, categorias, servicos_nivel2)
+
+@st.cache_data
+def etapa_distancias(filtros, centroide):
+    """Clientes e oficinas filtrados a até RAIO_MAXIMO_KM do centroide, ordenados por distância"""
+    base = carregar_base()
+    return tuple(
+        motor.distancias_ordenadas(indice, filtradas, centroide, RAIO_MAXIMO_KM)
+        for indice, filtradas in zip((base.indice_clientes, base.indice_oficinas), etapa_servicos(*filtros))
+    )
 
-# Adicionar coluna de categoria de serviço e serviço nível 2 às oficinas
-oficinas_df["categoria_servico"] = oficinas_df["nome_oficina"].apply(get_service_category)
-oficinas_df["servico_nivel2"] = oficinas_df["nome_oficina"].apply(get_service_level2)
+@st.cache_data
+def etapa_tempos(filtros, centroide):
+    """Como etapa_distancias, em minutos de viagem pela rede viária até TEMPO_MAXIMO_MIN"""
+    base = carregar_base()
+    return tuple(
+        motor.tempos_ordenados(base.rede, df, filtradas, centroide, TEMPO_MAXIMO_MIN)
+        for df, filtradas in zip((base.clientes, base.oficinas), etapa_servicos(*filtros))
+    )
+
+@st.cache_data
+def etapa_camadas_calor(filtros, segmento):
+    """Grades de densidade do heatmap de um segmento, memorizadas pelo estado dos filtros"""
+    posicoes_clientes, _ = etapa_servicos(*filtros)
+    clientes = carregar_base().clientes.iloc[posicoes_clientes]
+    clientes = clientes[clientes["segmento"] == segmento]
+    return camadas_densidade(clientes["latitude"].to_numpy(), clientes["longitude"].to_numpy())
 
 # Sidebar para filtros
 st.sidebar.header("Filtros")
@@ -132,15 +130,6 @@ segmentos_selecionados = st.sidebar.multiselect(
     default=todos_segmentos if selecionar_todos_segmentos else []
 )
 
-# Aplicar filtros mantendo as opções disponíveis
-clientes_filtrados_temp = clientes_df
-oficinas_filtradas_temp = oficinas_df
-
-# Filtro por segmento
-if segmentos_selecionados:
-    clientes_filtrados_temp = clientes_filtrados_temp[clientes_filtrados_temp["segmento"].isin(segmentos_selecionados)]
-    oficinas_filtradas_temp = oficinas_df[oficinas_df["segmento"].apply(lambda x: any(item in x.split("_") for item in segmentos_selecionados))]
-
 # Filtro por Zona
 todas_zonas_sorted = sorted(todas_zonas)
 selecionar_todas_zonas = st.sidebar.checkbox("Selecionar todas as zonas", key="chk_todas_zonas")
@@ -150,15 +139,10 @@ zona_selecionada = st.sidebar.multiselect(
     default=todas_zonas_sorted if selecionar_todas_zonas else []
 )
 
-if zona_selecionada:
-    clientes_filtrados_temp = clientes_filtrados_temp[clientes_filtrados_temp["zona"].isin(zona_selecionada)]
-    oficinas_filtradas_temp = oficinas_filtradas_temp[oficinas_filtradas_temp["zona"].isin(zona_selecionada)]
-
-clientes_por_zona = clientes_filtrados_temp
-oficinas_por_zona = oficinas_filtradas_temp
+# Filtros de segmento e zona aplicados mantendo as opções disponíveis
+_, _, bairros_disponiveis = etapa_segmento_zona(tuple(segmentos_selecionados), tuple(zona_selecionada))
 
 # Filtro por Bairro - mantendo opções disponíveis
-bairros_disponiveis = sorted(clientes_filtrados_temp["bairro"].unique().tolist())
 selecionar_todos_bairros = st.sidebar.checkbox("Selecionar todos os bairros", key="chk_todos_bairros")
 bairros_selecionados = st.sidebar.multiselect(
     "Bairros",
@@ -166,13 +150,6 @@ bairros_selecionados = st.sidebar.multiselect(
     default=bairros_disponiveis if selecionar_todos_bairros else []
 )
 
-if bairros_selecionados:
-    clientes_filtrados_temp = clientes_filtrados_temp[clientes_filtrados_temp["bairro"].isin(bairros_selecionados)]
-    oficinas_filtradas_temp = oficinas_filtradas_temp[oficinas_filtradas_temp["bairro"].isin(bairros_selecionados)]
-
-clientes_filtrados = clientes_filtrados_temp
-oficinas_filtradas = oficinas_filtradas_temp
-
 # Filtro por Categoria de Serviço (Nível 1)
 categorias_servico = sorted(clientes_df["nivel_1_servico"].unique().tolist())
 selecionar_todas_categorias = st.sidebar.checkbox("Selecionar todas as categorias", key="chk_todas_categorias")
@@ -182,10 +159,6 @@ categorias_selecionadas = st.sidebar.multiselect(
     default=categorias_servico if selecionar_todas_categorias else []
 )
 
-if categorias_selecionadas:
-    clientes_filtrados = clientes_filtrados[clientes_filtrados["nivel_1_servico"].isin(categorias_selecionadas)]
-    oficinas_filtradas = oficinas_filtradas[oficinas_filtradas["categoria_servico"].isin(categorias_selecionadas)]
-
 # Filtro por Serviço Específico (Nível 2)
 servicos_nivel2 = sorted(clientes_df["nivel_2_servico"].unique().tolist())
 selecionar_todos_servicos = st.sidebar.checkbox("Selecionar todos os serviços", key="chk_todos_servicos")
@@ -195,9 +168,21 @@ servicos_nivel2_selecionados = st.sidebar.multiselect(
     default=servicos_nivel2 if selecionar_todos_servicos else []
 )
 
-if servicos_nivel2_selecionados:
-    clientes_filtrados = clientes_filtrados[clientes_filtrados["nivel_2_servico"].isin(servicos_nivel2_selecionados)]
-    oficinas_filtradas = oficinas_filtradas[oficinas_filtradas["servico_nivel2"].isin(servicos_nivel2_selecionados)]
+
+# Conjunto filtrado final (etapas memorizadas: só recalcula a partir do widget alterado)
+filtros = (
+    tuple(segmentos_selecionados),
+    tuple(zona_selecionada),
+    tuple(bairros_selecionados),
+    tuple(categorias_selecionadas),
+    tuple(servicos_nivel2_selecionados),
+)
+medidor.contexto.update(filtros=filtros)
+with medidor.etapa("filtros", len(clientes_df)) as registro:
+    posicoes_clientes_filtrados, posicoes_oficinas_filtradas = etapa_servicos(*filtros)
+    registro["linhas_saida"] = len(posicoes_clientes_filtrados)
+clientes_filtrados = clientes_df.iloc[posicoes_clientes_filtrados]
+oficinas_filtradas = oficinas_df.iloc[posicoes_oficinas_filtradas]
 
 # Seleção de oficinas principais - usando todas as oficinas disponíveis
 oficinas_principais_nomes = st.sidebar.multiselect(
@@ -213,7 +198,27 @@ else:
     oficinas_principais_df = pd.DataFrame()
 
 # Raio de busca com incremento de 0,5 km
-raio_busca = st.sidebar.slider("Raio de busca (km)", 1.0, 20.0, 5.0, step=0.5)
+# (ou, com a rede viária, em minutos de viagem com incremento de 5 min)
+raio_em_minutos = rede_disponivel and st.sidebar.radio(
+    "Medida do raio", ["Distância (km)", "Tempo de viagem (min)"], key="radio_medida_raio"
+) == "Tempo de viagem (min)"
+if raio_em_minutos:
+    raio_busca = st.sidebar.slider("Raio de busca (min)", 5.0, TEMPO_MAXIMO_MIN, 15.0, step=5.0)
+    rotulo_raio = f"{raio_busca:.0f} min"
+else:
+    raio_busca = st.sidebar.slider("Raio de busca (km)", 1.0, RAIO_MAXIMO_KM, 5.0, step=0.5)
+    rotulo_raio = f"{raio_busca:.1f} km"
+
+# Modelo de atribuição: oficina mais próxima (100% do cliente) ou Huff (demanda dividida,
+# só com distâncias em km)
+MODELOS_ATRIBUICAO = {"Oficina mais próxima": motor.MODELO_MAIS_PROXIMA, "Huff (gravitacional)": motor.MODELO_HUFF}
+modelo_atribuicao = motor.MODELO_MAIS_PROXIMA
+if not raio_em_minutos:
+    modelo_atribuicao = MODELOS_ATRIBUICAO[st.sidebar.radio("Modelo de atribuição", list(MODELOS_ATRIBUICAO), key="radio_modelo_atribuicao")]
+if modelo_atribuicao == motor.MODELO_HUFF:
+    beta_huff = st.sidebar.slider("Decaimento com a distância (β)", 0.5, 4.0, motor.BETA_PADRAO, step=0.5)
+    # Multiplica a atratividade das principais (coluna "atratividade" do cadastro, ou 1) em relação aos concorrentes
+    fator_atratividade = st.sidebar.slider("Atratividade das principais (×)", 0.5, 5.0, 1.0, step=0.5)
 
 # Inicializar variáveis vazias para evitar NameError
 concorrentes_no_raio = pd.DataFrame()
@@ -223,8 +228,17 @@ centroide_lon = None
 
 # Calcular o centroide das oficinas principais se houver alguma selecionada
 if not oficinas_principais_df.empty:
-    centroide_lat = oficinas_principais_df["latitude"].mean()
-    centroide_lon = oficinas_principais_df["longitude"].mean()
+    centroide_lat, centroide_lon = motor.centroide(oficinas_principais_df)
+
+    # Distâncias ao centroide memorizadas por (filtros, centroide); o raio só corta a lista
+    # ordenada, e as posições são reaproveitadas pelas métricas e filtros abaixo
+    medidor.contexto.update(principais=len(oficinas_principais_df), raio=rotulo_raio, modelo=modelo_atribuicao)
+    with medidor.etapa("raio", len(posicoes_clientes_filtrados)) as registro:
+        etapa_raio = etapa_tempos if raio_em_minutos else etapa_distancias
+        distancias_clientes, distancias_oficinas = etapa_raio(filtros, (centroide_lat, centroide_lon))
+        posicoes_clientes_raio = posicoes_no_raio(*distancias_clientes, raio_busca)
+        posicoes_oficinas_raio = posicoes_no_raio(*distancias_oficinas, raio_busca)
+        registro["linhas_saida"] = len(posicoes_clientes_raio)
 
 # Exibir informações principais
 st.header("Informações Principais")
@@ -236,16 +250,10 @@ if not oficinas_principais_df.empty:
     col2.metric("Oficinas no Filtro", len(oficinas_filtradas))
     
     # Calcular clientes no raio
-    clientes_no_raio_count = len(clientes_filtrados[clientes_filtrados.apply(
-        lambda row: geodesic((row["latitude"], row["longitude"]), (centroide_lat, centroide_lon)).km <= raio_busca,
-        axis=1
-    )])
+    clientes_no_raio_count = len(posicoes_clientes_raio)
     
     # Calcular oficinas no raio (incluindo principais e concorrentes)
-    oficinas_no_raio_count = len(oficinas_filtradas[oficinas_filtradas.apply(
-        lambda row: geodesic((row["latitude"], row["longitude"]), (centroide_lat, centroide_lon)).km <= raio_busca,
-        axis=1
-    )])
+    oficinas_no_raio_count = len(posicoes_oficinas_raio)
     
     col3.metric("Clientes no Raio", clientes_no_raio_count)
     col4.metric("Oficinas no Raio", oficinas_no_raio_count)
@@ -264,33 +272,41 @@ if not oficinas_principais_df.empty:
         st.write(f"**Endereço:** {oficina['bairro']}, {oficina['zona']}")
 
     # Filtrar clientes dentro do raio do centroide
-    clientes_no_raio = clientes_filtrados[clientes_filtrados.apply(
-        lambda row: geodesic((row["latitude"], row["longitude"]), (centroide_lat, centroide_lon)).km <= raio_busca,
-        axis=1
-    )].copy()
+    clientes_no_raio = clientes_df.iloc[posicoes_clientes_raio].copy()
 
     st.write(f"Clientes filtrados antes do raio: {len(clientes_filtrados)}") # Debug print
-    st.write(f"Clientes encontrados no raio de {raio_busca:.1f} km a partir do centroide das oficinas principais: {len(clientes_no_raio)}")
+    st.write(f"Clientes encontrados no raio de {rotulo_raio} a partir do centroide das oficinas principais: {len(clientes_no_raio)}")
+
+    # Cobertura em todos os raios do slider sem refazer a simulação: a lista de distâncias
+    # ao centroide já está ordenada e cada oficina tem os anéis pré-calculados
+    if st.checkbox("Mostrar cobertura por raio", key="chk_cobertura"):
+        if raio_em_minutos:
+            curvas = pd.DataFrame(index=pd.Index(np.arange(5.0, TEMPO_MAXIMO_MIN + 5.0, 5.0), name="raio_min"))
+        else:
+            aneis = carregar_aneis()
+            grupos = aneis.selecao_grupos(segmentos_selecionados, categorias_selecionadas, servicos_nivel2_selecionados)
+            curvas = aneis.curvas(oficinas_principais_df.index, grupos).iloc[1:]
+            curvas.columns = oficinas_principais_df["nome_oficina"].to_numpy()
+        curvas.insert(0, "Centroide (todos os filtros)", cobertura.contagens_por_raio(distancias_clientes[1], curvas.index.to_numpy()))
+        st.line_chart(curvas)
+        st.caption(
+            f"Clientes a até cada raio (atual: {rotulo_raio}). A curva do centroide usa todos os filtros; "
+            "as de cada oficina, só os de segmento e serviço."
+            if not raio_em_minutos else f"Clientes a até cada tempo de viagem do centroide (atual: {rotulo_raio})."
+        )
 
     # Exibir distribuição por segmento dos clientes no raio
+    # (preenchida mais abaixo, a partir do cubo montado depois da atribuição)
     st.subheader("Distribuição por Segmento (Clientes no Raio)")
-    if not clientes_no_raio.empty:
-        distribuicao_segmento_raio = clientes_no_raio["segmento"].value_counts().reset_index()
-        distribuicao_segmento_raio.columns = ["Segmento", "Quantidade de Clientes no Raio"]
-        st.table(distribuicao_segmento_raio)
-    else:
-        st.info("Nenhum cliente encontrado no raio para os segmentos selecionados.")
+    area_distribuicao_segmento_raio = st.empty()
 
     # Encontrar concorrentes dentro do raio
-    concorrentes_no_raio = oficinas_filtradas[oficinas_filtradas.apply(
-        lambda row: geodesic((row["latitude"], row["longitude"]), (centroide_lat, centroide_lon)).km <= raio_busca,
-        axis=1
-    )].copy()
+    concorrentes_no_raio = oficinas_df.iloc[posicoes_oficinas_raio].copy()
 
     # Remover oficinas principais da lista de concorrentes
     concorrentes_no_raio = concorrentes_no_raio[~concorrentes_no_raio["nome_oficina"].isin(oficinas_principais_nomes)]
 
-    st.write(f"Concorrentes encontrados no raio de {raio_busca:.1f} km: {len(concorrentes_no_raio)}")
+    st.write(f"Concorrentes encontrados no raio de {rotulo_raio}: {len(concorrentes_no_raio)}")
 
     # Exibir concorrentes no raio e permitir seleção
     st.subheader("Concorrentes no Raio")
@@ -310,130 +326,126 @@ if not oficinas_principais_df.empty:
             if ativo:
                 concorrentes_ativos.append(row)
 
-        if concorrentes_ativos:
-            st.write(f"Concorrentes ativos selecionados: {len(concorrentes_ativos)}")
-
-            # Função para determinar a oficina mais próxima para cada cliente
-            def oficina_mais_proxima(cliente):
-                # Lista de oficinas candidatas (principais + concorrentes ativos)
-                # Convertendo para lista de dicionários para facilitar a comparação por nome
-                opcoes = oficinas_principais_df.to_dict("records") + [c.to_dict() for c in concorrentes_ativos]
-
-                if not opcoes:
-                    return None, float("inf")
-
-                # Filtrar oficinas que realizam o serviço demandado pelo cliente
-                candidatas = []
-                for o in opcoes:
-                    # Verificar se o segmento da oficina atende o segmento do cliente
-                    oficina_segmentos = o["segmento"].split("_") # Assume que segmentos são separados por underscore
-                    if cliente["segmento"] in oficina_segmentos:
-                         # Verificar se a oficina realiza o serviço demandado pelo cliente
-                        if o["categoria_servico"] == get_service_category(cliente["tipo_servico_demandado"]) or \
-                           o["servico_nivel2"] == get_service_level2(cliente["tipo_servico_demandado"]):
-                           candidatas.append(o)
-
-                if not candidatas:
-                    return None, float("inf") # Nenhum escritório que atenda o segmento e serviço do cliente
-
-                min_distance = float("inf")
-                closest_office = None
-
-                for office in candidatas:
-                    distance = geodesic((cliente["latitude"], cliente["longitude"]), (office["latitude"], office["longitude"])).km
-                    if distance < min_distance:
-                        min_distance = distance
-                        closest_office = office
-
-                return closest_office, min_distance
-
-            # Aplicar a função para encontrar a oficina mais próxima para cada cliente no raio
-            clientes_no_raio[["oficina_mais_proxima", "distancia_oficina_mais_proxima"]] = clientes_no_raio.apply(
-                lambda row: pd.Series(oficina_mais_proxima(row)), axis=1
-            )
-
-            # Clientes atendidos pelas oficinas principais
-            # Comparar por nome da oficina para maior robustez
-            clientes_atendidos_principais = clientes_no_raio[
-                clientes_no_raio["oficina_mais_proxima"].apply(lambda x: isinstance(x, dict) and x.get("nome_oficina") in oficinas_principais_df["nome_oficina"].tolist())
-            ]
-
-            # Clientes atendidos pelos concorrentes ativos
-            # Comparar por nome da oficina para maior robustez
-            concorrentes_ativos_nomes = [c["nome_oficina"] for c in concorrentes_ativos]
-            clientes_atendidos_concorrentes = clientes_no_raio[
-                clientes_no_raio["oficina_mais_proxima"].apply(lambda x: isinstance(x, dict) and x.get("nome_oficina") in concorrentes_ativos_nomes)
-            ]
-
-            st.subheader("Distribuição de Clientes Atendidos (no Raio)")
-
-            # Distribuição por Segmento
-            st.markdown("**Por Segmento:**")
-            dist_segmento_principais = clientes_atendidos_principais["segmento"].value_counts().astype(int).reset_index()
-            dist_segmento_principais.columns = ["Segmento", "Atendidos pelas Principais"]
-            dist_segmento_concorrentes = clientes_atendidos_concorrentes["segmento"].value_counts().astype(int).reset_index()
-            dist_segmento_concorrentes.columns = ["Segmento", "Atendidos pelos Concorrentes"]
-
-            dist_segmento_combinada = pd.merge(dist_segmento_principais, dist_segmento_concorrentes, on="Segmento", how="outer").fillna(0)
-            dist_segmento_combinada[["Atendidos pelas Principais", "Atendidos pelos Concorrentes"]] = \
-                dist_segmento_combinada[["Atendidos pelas Principais", "Atendidos pelos Concorrentes"]].astype(int)
-            st.table(dist_segmento_combinada)
-
-            # Distribuição por Categoria de Serviço
-            st.markdown("**Por Categoria de Serviço:**")
-            dist_categoria_principais = clientes_atendidos_principais["tipo_servico_demandado"].apply(get_service_category).value_counts().astype(int).reset_index()
-            dist_categoria_principais.columns = ["Categoria de Serviço", "Atendidos pelas Principais"]
-            dist_categoria_concorrentes = clientes_atendidos_concorrentes["tipo_servico_demandado"].apply(get_service_category).value_counts().astype(int).reset_index()
-            dist_categoria_concorrentes.columns = ["Categoria de Serviço", "Atendidos pelos Concorrentes"]
-
-            dist_categoria_combinada = pd.merge(dist_categoria_principais, dist_categoria_concorrentes, on="Categoria de Serviço", how="outer").fillna(0)
-            dist_categoria_combinada[["Atendidos pelas Principais", "Atendidos pelos Concorrentes"]] = \
-                dist_categoria_combinada[["Atendidos pelas Principais", "Atendidos pelos Concorrentes"]].astype(int)
-            st.table(dist_categoria_combinada)
-
-            # Distribuição por Serviço Nível 2
-            st.markdown("**Por Serviço Nível 2:**")
-            dist_nivel2_principais = clientes_atendidos_principais["tipo_servico_demandado"].apply(get_service_level2).value_counts().astype(int).reset_index()
-            dist_nivel2_principais.columns = ["Serviço Nível 2", "Atendidos pelas Principais"]
-            dist_nivel2_concorrentes = clientes_atendidos_concorrentes["tipo_servico_demandado"].apply(get_service_level2).value_counts().astype(int).reset_index()
-            dist_nivel2_concorrentes.columns = ["Serviço Nível 2", "Atendidos pelos Concorrentes"]
-
-            dist_nivel2_combinada = pd.merge(dist_nivel2_principais, dist_nivel2_concorrentes, on="Serviço Nível 2", how="outer").fillna(0)
-            dist_nivel2_combinada[["Atendidos pelas Principais", "Atendidos pelos Concorrentes"]] = \
-                dist_nivel2_combinada[["Atendidos pelas Principais", "Atendidos pelos Concorrentes"]].astype(int)
-            st.table(dist_nivel2_combinada)
-
-            # Detalhes dos clientes no raio
-            st.subheader("Detalhes dos Clientes no Raio")
-            clientes_export = clientes_no_raio[["segmento", "zona", "bairro", "latitude", "longitude", "tipo_servico_demandado", "oficina_mais_proxima", "distancia_oficina_mais_proxima"]].copy()
-            clientes_export["oficina_mais_proxima"] = clientes_export["oficina_mais_proxima"].apply(lambda x: x.get("nome_oficina") if isinstance(x, dict) else "Nenhuma")
-            clientes_export["distancia_oficina_mais_proxima"] = clientes_export["distancia_oficina_mais_proxima"].apply(lambda x: f"{x:.1f} km" if x != float("inf") else "N/A")
-            st.dataframe(clientes_export)
-
-            # Botão para exportar clientes para CSV
-            clientes_csv = to_csv(clientes_export)
-            st.download_button(
-                label="📊 Exportar Clientes para CSV",
-                data=clientes_csv,
-                file_name="clientes_no_raio.csv",
-                mime="text/csv",
+    # Atribuição e raio dos concorrentes calculados antes de qualquer tabela,
+    # para que todas as distribuições saiam de um único cubo
+    atendimento_clientes = None
+    no_raio_concorrente = None
+    if concorrentes_ativos:
+        # Atribuição em lote da oficina compatível mais próxima (guarda o id da oficina, -1 se nenhuma)
+        ids_concorrentes_ativos = [c.name for c in concorrentes_ativos]
+        # (a receita anual esperada é somada por oficina na mesma passada)
+        with medidor.etapa("atribuicao", len(clientes_no_raio)) as registro:
+            ids_oficina, distancia_oficina, atendimento_clientes, receita_por_oficina = motor.atribuir_clientes(
+                clientes_no_raio, capacidades_oficinas, oficinas_principais_df.index, ids_concorrentes_ativos, METODO_DISTANCIA,
+                pesos=clientes_no_raio["receita_anual"].to_numpy(),
+                tempos_oficinas=tempos_oficinas if raio_em_minutos else None,
             )
-
-            # Detalhes das oficinas (principais + concorrentes no raio)
-            st.subheader("Detalhes das Oficinas (Principais e Concorrentes no Raio)")
-            oficinas_export = pd.concat([oficinas_principais_df, pd.DataFrame(concorrentes_ativos)])
-            st.dataframe(oficinas_export[["nome_oficina", "segmento", "zona", "bairro", "latitude", "longitude", "categoria_servico", "servico_nivel2"]])
-
-            # Botão para exportar oficinas para CSV
-            oficinas_csv = to_csv(oficinas_export)
-            st.download_button(
-                label="🏢 Exportar Oficinas para CSV",
-                data=oficinas_csv,
-                file_name="oficinas_no_raio.csv",
-                mime="text/csv",
+            registro["linhas_saida"] = int((ids_oficina >= 0).sum())
+        clientes_no_raio["oficina_mais_proxima"] = ids_oficina
+        clientes_no_raio["distancia_oficina_mais_proxima"] = distancia_oficina
+
+        # Clientes no raio de algum concorrente ativo
+        with medidor.etapa("raio_concorrentes", len(clientes_no_raio)) as registro:
+            if raio_em_minutos:
+                no_raio_concorrente = no_tempo_de_oficinas(clientes_no_raio, ids_concorrentes_ativos, tempos_oficinas, raio_busca)
+            else:
+                no_raio_concorrente = motor.no_raio_de_concorrentes(
+                    clientes_no_raio, pd.DataFrame(concorrentes_ativos), raio_busca, METODO_DISTANCIA
+                )
+            registro["linhas_saida"] = int(no_raio_concorrente.sum())
+
+    # Cubo com todas as quebras (atendimento x raio de concorrente x segmento x categoria x nível 2)
+    with medidor.etapa("cubo", len(clientes_no_raio)) as registro:
+        cubo_clientes = construir_cubo(clientes_no_raio, atendimento_clientes, no_raio_concorrente)
+        registro["linhas_saida"] = len(cubo_clientes)
+    cubo_atendimento = cubo_clientes
+
+    if concorrentes_ativos and modelo_atribuicao == motor.MODELO_HUFF:
+        # Demanda de cada cliente dividida entre as oficinas compatíveis a até o raio de truncamento;
+        # as tabelas de atendimento passam a mostrar clientes esperados
+        with medidor.etapa("huff", len(clientes_no_raio)):
+            atratividade = motor.atratividade_oficinas(oficinas_df)
+            atratividade[oficinas_principais_df.index] *= fator_atratividade
+            parcela_principais, parcela_concorrentes, _, receita_por_oficina = motor.participacao_clientes(
+                clientes_no_raio, capacidades_oficinas, oficinas_principais_df.index, ids_concorrentes_ativos,
+                beta_huff, motor.RAIO_TRUNCAMENTO_PADRAO_KM, METODO_DISTANCIA,
+                pesos=clientes_no_raio["receita_anual"].to_numpy(), atratividade=atratividade,
             )
+        cubo_atendimento = motor.cubo_participacao(clientes_no_raio, parcela_principais, parcela_concorrentes, no_raio_concorrente)
 
+    if not clientes_no_raio.empty:
+        distribuicao_segmento_raio = distribuicao(cubo_clientes, "segmento").reset_index()
+        distribuicao_segmento_raio.columns = ["Segmento", "Quantidade de Clientes no Raio"]
+        area_distribuicao_segmento_raio.table(distribuicao_segmento_raio)
     else:
+        area_distribuicao_segmento_raio.info("Nenhum cliente encontrado no raio para os segmentos selecionados.")
+
+    if concorrentes_ativos:
+        st.write(f"Concorrentes ativos selecionados: {len(concorrentes_ativos)}")
+        receita_principais = receita_por_oficina[oficinas_principais_df.index].sum()
+        st.write(
+            f"Receita anual esperada no raio: R$ {clientes_no_raio['receita_anual'].sum():,.2f} "
+            f"(principais: R$ {receita_principais:,.2f}; concorrentes: R$ {receita_por_oficina.sum() - receita_principais:,.2f})"
+        )
+
+        # Monte Carlo da demanda sobre a atribuição já calculada (só os sorteios mudam entre réplicas)
+        if modelo_atribuicao == motor.MODELO_MAIS_PROXIMA:
+            with st.expander("Simulação de demanda (Monte Carlo)"):
+                col_rep, col_hor, col_sem = st.columns(3)
+                replicacoes = col_rep.number_input("Réplicas", 100, 20000, simulacao.REPLICACOES_PADRAO, step=100)
+                horizonte_dias = col_hor.number_input("Horizonte (dias)", 1, 3650, int(simulacao.HORIZONTE_PADRAO_DIAS), step=30)
+                semente = col_sem.number_input("Semente", 0, 2**31 - 1, 0)
+                if st.checkbox("Executar simulação", key="chk_monte_carlo"):
+                    monte_carlo = simulacao.simular_demanda_clientes(
+                        clientes_no_raio, ids_oficina, replicacoes=int(replicacoes), horizonte_dias=float(horizonte_dias), semente=int(semente)
+                    )
+                    carga = monte_carlo.resumo
+                    carga.insert(0, "Oficina", oficinas_df["nome_oficina"].reindex(carga.index).to_numpy())
+                    carga.insert(1, "Principal", carga.index.isin(oficinas_principais_df.index))
+                    st.caption(
+                        f"Serviços e receita por oficina em {horizonte_dias} dias: média de {replicacoes} réplicas, "
+                        f"intervalo de {simulacao.NIVEL_CONFIANCA_PADRAO:.0%} da média e faixa de {simulacao.NIVEL_CONFIANCA_PADRAO:.0%} das réplicas"
+                    )
+                    st.dataframe(carga.sort_values(["Principal", "servicos_media"], ascending=False).round(1), hide_index=True)
+
+        st.subheader("Distribuição de Clientes Atendidos (no Raio)")
+        if modelo_atribuicao == motor.MODELO_HUFF:
+            st.caption(
+                f"Clientes esperados pelo modelo de Huff (β = {beta_huff}, atratividade das principais × {fator_atratividade:g}, "
+                f"truncamento em {motor.RAIO_TRUNCAMENTO_PADRAO_KM:.0f} km)"
+            )
+        for dimensao, titulo, rotulo in (
+            ("segmento", "**Por Segmento:**", "Segmento"),
+            ("categoria_servico", "**Por Categoria de Serviço:**", "Categoria de Serviço"),
+            ("servico_nivel2", "**Por Serviço Nível 2:**", "Serviço Nível 2"),
+        ):
+            st.markdown(titulo)
+            dist_combinada = distribuicao_por_atendimento(cubo_atendimento, dimensao).reset_index()
+            dist_combinada.columns = [rotulo, "Atendidos pelas Principais", "Atendidos pelos Concorrentes"]
+            st.table(dist_combinada)
+
+        # Detalhes dos clientes no raio
+        st.subheader("Detalhes dos Clientes no Raio")
+        unidade_raio = "min" if raio_em_minutos else "km"
+        coluna_distancia = f"distancia_oficina_mais_proxima_{unidade_raio}"
+        clientes_export = clientes_no_raio[["segmento", "zona", "bairro", "latitude", "longitude", "tipo_servico_demandado", "oficina_mais_proxima"]].copy()
+        clientes_export["oficina_mais_proxima"] = oficinas_df["nome_oficina"].reindex(clientes_export["oficina_mais_proxima"]).fillna("Nenhuma").to_numpy()
+        # Distância numérica (NaN sem oficina compatível), formatada só na exibição
+        clientes_export[coluna_distancia] = exportacao.distancias_tipadas(clientes_no_raio["distancia_oficina_mais_proxima"])
+        st.dataframe(clientes_export, column_config={coluna_distancia: st.column_config.NumberColumn(format=f"%.1f {unidade_raio}")})
+
+        # Exportação dos clientes e das oficinas no formato escolhido
+        formato_exportacao = st.radio("Formato da exportação", exportacao.FORMATOS, format_func=str.upper, horizontal=True, key="radio_formato_exportacao")
+        botao_exportar(clientes_export, "📊 Exportar Clientes", "clientes_no_raio", formato_exportacao, "btn_exportar_clientes")
+
+        # Detalhes das oficinas (principais + concorrentes no raio)
+        st.subheader("Detalhes das Oficinas (Principais e Concorrentes no Raio)")
+        oficinas_export = pd.concat([oficinas_principais_df, pd.DataFrame(concorrentes_ativos)])
+        st.dataframe(oficinas_export[["nome_oficina", "segmento", "zona", "bairro", "latitude", "longitude", "categoria_servico", "servico_nivel2"]])
+
+        botao_exportar(oficinas_export, "🏢 Exportar Oficinas", "oficinas_no_raio", formato_exportacao, "btn_exportar_oficinas")
+
+    elif concorrentes_no_raio.empty:
         st.info("Nenhuma oficina principal selecionada para simulação.")
 
 # Visualização no mapa
@@ -451,7 +463,8 @@ else:
     centro_lon = -46.6333
     zoom_inicial = 10
 
-# Criar mapa
+# Criar mapa (medido até o fim da montagem; a serialização é medida à parte)
+registro_mapa = medidor.iniciar("mapa", len(clientes_filtrados))
 mapa = folium.Map(location=[centro_lat, centro_lon], zoom_start=zoom_inicial)
 
 # Adicionar marcadores para oficinas principais primeiro
@@ -464,89 +477,70 @@ if not oficinas_principais_df.empty:
             icon=folium.Icon(color="green", icon="wrench", prefix="fa")
         ).add_to(mapa)
         
-        # Adicionar círculo de raio
-        folium.Circle(
-            location=[float(oficina["latitude"]), float(oficina["longitude"])],
-            radius=raio_busca * 1000,  # Converter km para metros
-            color="green",
-            fill=True,
-            fillColor="green",
-            fillOpacity=0.1,
-            popup=f"Raio de {raio_busca} km",
-            weight=2
-        ).add_to(mapa)
-
-# Adicionar heatmaps depois dos marcadores principais
-if not clientes_filtrados.empty:
-    # Heatmap para clientes Meoo
-    if "Meoo" in segmentos_selecionados:
-        meoo_clients = clientes_filtrados[clientes_filtrados["segmento"] == "Meoo"]
-        if not meoo_clients.empty:
-            heatmap_meoo_data = meoo_clients[["latitude", "longitude"]].values.tolist()
-            folium.plugins.HeatMap(
-                heatmap_meoo_data,
-                gradient={0.4: "blue", 0.65: "lime", 1: "red"},
-                min_opacity=0.3,
-                radius=15,
-                blur=15,
-                max_zoom=16
+        # Adicionar círculo de raio (o raio em minutos não é um círculo no mapa)
+        if not raio_em_minutos:
+            folium.Circle(
+                location=[float(oficina["latitude"]), float(oficina["longitude"])],
+                radius=raio_busca * 1000,  # Converter km para metros
+                color="green",
+                fill=True,
+                fillColor="green",
+                fillOpacity=0.1,
+                popup=f"Raio de {raio_busca} km",
+                weight=2
             ).add_to(mapa)
 
-    # Heatmap para clientes GF
-    if "GF" in segmentos_selecionados:
-        gf_clients = clientes_filtrados[clientes_filtrados["segmento"] == "GF"]
-        if not gf_clients.empty:
-            heatmap_gf_data = gf_clients[["latitude", "longitude"]].values.tolist()
-            folium.plugins.HeatMap(
-                heatmap_gf_data,
-                gradient={0.4: "green", 0.65: "yellow", 1: "orange"},
+# Adicionar heatmaps depois dos marcadores principais, com os pontos pré-agregados
+# em grades por faixa de zoom em vez de enviar cada cliente para o navegador
+if not clientes_filtrados.empty:
+    gradientes_segmento = {
+        "Meoo": {0.4: "blue", 0.65: "lime", 1: "red"},
+        "GF": {0.4: "green", 0.65: "yellow", 1: "orange"},
+    }
+    for segmento, gradiente in gradientes_segmento.items():
+        if segmento in segmentos_selecionados:
+            adicionar_densidade(
+                mapa,
+                etapa_camadas_calor(filtros, segmento),
+                gradient=gradiente,
                 min_opacity=0.3,
                 radius=15,
                 blur=15,
                 max_zoom=16
-            ).add_to(mapa)
+            )
 
-# Adicionar marcadores para concorrentes por último
+# Adicionar concorrentes por último, agrupados (FastMarkerCluster) no navegador
 if not oficinas_principais_df.empty and not concorrentes_no_raio.empty:
     concorrentes_ativos_nomes = [c["nome_oficina"] for c in concorrentes_ativos] if concorrentes_ativos else []
-    for idx, concorrente in concorrentes_no_raio.iterrows():
-        nome = concorrente["nome_oficina"]
-        cor = "blue" if nome in concorrentes_ativos_nomes else "lightgray"
-        folium.Marker(
-            location=[concorrente["latitude"], concorrente["longitude"]],
-            popup=f"Concorrente: {nome}",
-            icon=folium.Icon(color=cor, icon="wrench", prefix="fa")
-        ).add_to(mapa)
+    adicionar_oficinas_agrupadas(
+        mapa,
+        concorrentes_no_raio,
+        "Concorrente",
+        np.where(concorrentes_no_raio["nome_oficina"].isin(concorrentes_ativos_nomes), "blue", "lightgray"),
+    )
 
 # Sempre exibir o mapa com dimensões adequadas
-st_map = st_folium(mapa, width=800, height=600)
+# (sem objetos de retorno: mover ou dar zoom no mapa não dispara um novo rerun)
+medidor.concluir(registro_mapa)
+with medidor.etapa("render_mapa"):
+    st_map = st_folium(mapa, width=800, height=600, returned_objects=[])
 
 # Análise dos clientes atendidos pelos concorrentes
 if len(concorrentes_ativos) > 0:
-    clientes_atendidos_concorrentes = clientes_no_raio[clientes_no_raio.apply(
-        lambda row: any(
-            geodesic((row["latitude"], row["longitude"]), (conc["latitude"], conc["longitude"])).km <= raio_busca
-            for conc in concorrentes_ativos
-        ),
-        axis=1
-    )]
-
-    # Distribuição por serviço (nível 2)
-    dist_nivel2_concorrentes = clientes_atendidos_concorrentes["tipo_servico_demandado"].apply(get_service_level2).value_counts().astype(int).reset_index()
-    dist_nivel2_concorrentes.columns = ["Serviço (Nível 2)", "Quantidade"]
-    st.write("Distribuição por Serviço (Nível 2) - Concorrentes:")
-    st.table(dist_nivel2_concorrentes)
-
-    # Distribuição por categoria de serviço
-    dist_categoria_concorrentes = clientes_atendidos_concorrentes["tipo_servico_demandado"].apply(get_service_category).value_counts().astype(int).reset_index()
-    dist_categoria_concorrentes.columns = ["Categoria de Serviço", "Quantidade"]
-    st.write("Distribuição por Categoria de Serviço - Concorrentes:")
-    st.table(dist_categoria_concorrentes)
-
-    # Distribuição por segmento
-    dist_segmento_concorrentes = clientes_atendidos_concorrentes["segmento"].value_counts().reset_index()
-    dist_segmento_concorrentes.columns = ["Segmento", "Quantidade"]
-    st.write("Distribuição por Segmento - Concorrentes:")
-    st.table(dist_segmento_concorrentes)
-
-
+    # Clientes no raio de algum concorrente ativo, fatiados do mesmo cubo
+    for dimensao, titulo, rotulo in (
+        ("servico_nivel2", "Distribuição por Serviço (Nível 2) - Concorrentes:", "Serviço (Nível 2)"),
+        ("categoria_servico", "Distribuição por Categoria de Serviço - Concorrentes:", "Categoria de Serviço"),
+        ("segmento", "Distribuição por Segmento - Concorrentes:", "Segmento"),
+    ):
+        dist_concorrentes = distribuicao(cubo_clientes, dimensao, no_raio_concorrente=True).reset_index()
+        dist_concorrentes.columns = [rotulo, "Quantidade"]
+        st.write(titulo)
+        st.table(dist_concorrentes)
+
+# Painel opcional com o tempo, as linhas e a memória de cada etapa desta execução
+if st.sidebar.checkbox("Mostrar desempenho", key="chk_desempenho"):
+    with st.sidebar.expander("Desempenho", expanded=True):
+        desempenho = medidor.tabela()
+        st.caption(f"Execução {medidor.execucao}: {desempenho['segundos'].sum():.2f} s nas etapas medidas")
+        st.dataframe(desempenho.round(3), hide_index=True)
@@ -0,0 +1,112 @@
+"""Ingestão dos CSVs de clientes e oficinas para arquivos Feather (Arrow IPC) tipados.
+
+Uso: ``python armazenamento.py [diretorio]`` converte todos os ``clientes_*.csv``
+e ``oficinas_*.csv`` do diretório (por padrão, o deste script) em arquivos
+``.feather`` sem compressão ao lado dos CSVs, que o app lê via memory-map.
+
+``servicos_realizados`` fica como coluna de listas do Arrow (``pd.ArrowDtype``)
+nos dois caminhos: lida do Feather, continua apontando para o memory-map, sem
+uma lista Python por linha; quem precisa dos serviços usa a máscara de bits
+(``mascaras.py``).
+"""
+
+import argparse
+import ast
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Colunas de texto com poucos valores distintos, armazenadas como categóricas
+COLUNAS_CATEGORICAS = [
+    "regiao",
+    "zona",
+    "bairro",
+    "segmento",
+    "tipo_servico_demandado",
+    "frequencia_demanda",
+    "nivel_1_servico",
+    "nivel_2_servico",
+    "veiculo",
+]
+
+# Coordenadas em float32: a resolução (~0,4 m em São Paulo) é muito menor que o passo do raio
+COLUNAS_COORDENADAS = ["latitude", "longitude"]
+
+COLUNAS_INTEIRAS = {"id_cliente": np.int32, "ano_veiculo": np.int16}
+
+PADROES_ENTRADA = ["clientes_*.csv", "oficinas_*.csv"]
+
+
+def explodir_servicos(servicos):
+    """Converte a lista serializada ("['Freios', 'Motor']") em coluna de listas do Arrow, uma vez por texto distinto"""
+    codigos, unicos = pd.factorize(servicos)
+    listas = pa.array([ast.literal_eval(texto) for texto in unicos] + [[]], type=pa.list_(pa.string()))
+    return pd.Series(pd.arrays.ArrowExtensionArray(listas.take(codigos)), index=servicos.index, name=servicos.name)
+
+
+def _tipo_pandas(tipo):
+    """Listas do Arrow continuam no Arrow (``pd.ArrowDtype``); os demais tipos usam a conversão padrão"""
+    return pd.ArrowDtype(tipo) if pa.types.is_list(tipo) else None
+
+
+def tipar(df):
+    """Aplica os tipos compactos usados pelo app (float32, categóricas, inteiros menores)"""
+    for coluna in COLUNAS_COORDENADAS:
+        if coluna in df:
+            df[coluna] = df[coluna].astype(np.float32)
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df:
+            df[coluna] = df[coluna].astype("category")
+    for coluna, tipo in COLUNAS_INTEIRAS.items():
+        if coluna in df:
+            df[coluna] = df[coluna].astype(tipo)
+    if "servicos_realizados" in df and pd.api.types.is_string_dtype(df["servicos_realizados"]):
+        df["servicos_realizados"] = explodir_servicos(df["servicos_realizados"])
+    return df
+
+
+def caminho_feather(caminho_csv):
+    return os.path.splitext(caminho_csv)[0] + ".feather"
+
+
+def converter_csv(caminho_csv):
+    """Lê um CSV, aplica os tipos e grava o Feather correspondente; retorna o caminho gravado"""
+    df = tipar(pd.read_csv(caminho_csv))
+    destino = caminho_feather(caminho_csv)
+    # Sem compressão para permitir leitura por memory-map
+    df.to_feather(destino, compression="uncompressed")
+    return destino
+
+
+def carregar_tabela(caminho_csv):
+    """Carrega o Feather gerado a partir de ``caminho_csv`` (via memory-map) ou, se não
+    houver um atualizado, o próprio CSV com os mesmos tipos aplicados"""
+    destino = caminho_feather(caminho_csv)
+    if os.path.exists(destino) and (
+        not os.path.exists(caminho_csv) or os.path.getmtime(destino) >= os.path.getmtime(caminho_csv)
+    ):
+        return feather.read_table(destino, memory_map=True).to_pandas(split_blocks=True, types_mapper=_tipo_pandas)
+    return tipar(pd.read_csv(caminho_csv))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converte os CSVs de clientes e oficinas em Feather tipado.")
+    parser.add_argument("diretorio", nargs="?", default=os.path.dirname(os.path.abspath(__file__)))
+    args = parser.parse_args(argv)
+
+    arquivos = sorted(
+        caminho for padrao in PADROES_ENTRADA for caminho in glob.glob(os.path.join(args.diretorio, padrao))
+    )
+    if not arquivos:
+        parser.error(f"nenhum arquivo {' ou '.join(PADROES_ENTRADA)} em {args.diretorio}")
+    for caminho_csv in arquivos:
+        destino = converter_csv(caminho_csv)
+        print(f"{os.path.basename(caminho_csv)} -> {os.path.basename(destino)}")
+
+
+if __name__ == "__main__":
+    main()
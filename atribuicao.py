@@ -0,0 +1,245 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from distancias import RAIO_MEDIO_TERRA_KM, distancia_km
+
+# Folga relativa usada para reavaliar quase-empates quando o método não é o haversine:
+# a razão entre distância esférica e elipsoidal varia menos de 0,5% em qualquer direção
+TOLERANCIA_REORDENACAO = 0.01
+
+# Distância mínima no modelo de Huff: evita o peso infinito de um cliente na porta da oficina
+DISTANCIA_MINIMA_HUFF_KM = 0.1
+
+
+def vetores_unitarios(latitudes, longitudes):
+    """Coordenadas em graus convertidas para vetores unitários 3D (n, 3)"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=1)
+
+
+@dataclass(frozen=True)
+class MatrizCapacidades:
+    """Matriz oficina x capacidade montada uma única vez a partir do cadastro de oficinas.
+
+    Segmentos atendidos e serviços realizados ficam como máscaras de bits (ver
+    mascaras.py); categoria e serviço nível 2 ficam como códigos inteiros. O
+    subconjunto de oficinas candidatas de um cenário é obtido com ``linhas``.
+    """
+
+    ids: np.ndarray
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    unitarios: np.ndarray
+    mascara_segmento: np.ndarray
+    mascara_servicos: np.ndarray
+    categorias: tuple
+    codigo_categoria: np.ndarray
+    niveis2: tuple
+    codigo_nivel2: np.ndarray
+
+    def __len__(self):
+        return len(self.ids)
+
+    def linhas(self, posicoes):
+        """Submatriz com as oficinas nas posições informadas (na ordem dada)"""
+        posicoes = np.asarray(posicoes, dtype=np.int64)
+        return MatrizCapacidades(
+            ids=self.ids[posicoes],
+            latitudes=self.latitudes[posicoes],
+            longitudes=self.longitudes[posicoes],
+            unitarios=self.unitarios[posicoes],
+            mascara_segmento=self.mascara_segmento[posicoes],
+            mascara_servicos=self.mascara_servicos[posicoes],
+            categorias=self.categorias,
+            codigo_categoria=self.codigo_categoria[posicoes],
+            niveis2=self.niveis2,
+            codigo_nivel2=self.codigo_nivel2[posicoes],
+        )
+
+    def posicoes(self, ids):
+        """Posições das oficinas com os ids informados"""
+        return pd.Index(self.ids).get_indexer(ids)
+
+
+def construir_matriz_capacidades(oficinas_df):
+    """Monta a MatrizCapacidades para todas as oficinas (ids = índice do DataFrame).
+
+    Requer as colunas ``mascara_segmento`` e, opcionalmente, ``mascara_servicos``
+    adicionadas por ``mascaras.adicionar_mascaras``.
+    """
+    mascara_servicos = (
+        oficinas_df["mascara_servicos"].to_numpy(dtype=np.int64)
+        if "mascara_servicos" in oficinas_df
+        else np.full(len(oficinas_df), -1, dtype=np.int64)
+    )
+    codigo_categoria, categorias = pd.factorize(oficinas_df["categoria_servico"])
+    codigo_nivel2, niveis2 = pd.factorize(oficinas_df["servico_nivel2"])
+
+    return MatrizCapacidades(
+        ids=oficinas_df.index.to_numpy(),
+        latitudes=oficinas_df["latitude"].to_numpy(dtype=np.float64),
+        longitudes=oficinas_df["longitude"].to_numpy(dtype=np.float64),
+        unitarios=vetores_unitarios(oficinas_df["latitude"], oficinas_df["longitude"]),
+        mascara_segmento=oficinas_df["mascara_segmento"].to_numpy(dtype=np.int64),
+        mascara_servicos=mascara_servicos,
+        categorias=tuple(categorias),
+        codigo_categoria=codigo_categoria,
+        niveis2=tuple(niveis2),
+        codigo_nivel2=codigo_nivel2,
+    )
+
+
+def _codigos(valores, vocabulario):
+    """Códigos de ``valores`` no vocabulário das oficinas (-1 quando ausente)"""
+    return pd.Index(vocabulario).get_indexer(pd.Index(valores))
+
+
+def perfis_compativeis(clientes_df, categorias_clientes, niveis2_clientes, capacidades, exigir_servico_realizado=False):
+    """Agrupa os clientes por perfil (segmento, serviço, categoria, nível 2) e devolve, para
+    cada perfil com alguma oficina compatível, ``(posicoes_clientes, colunas_compativeis)``"""
+    n = len(clientes_df)
+    codigos = np.stack([
+        clientes_df["mascara_segmento"].to_numpy(dtype=np.int64),
+        clientes_df["mascara_servico"].to_numpy(dtype=np.int64) if exigir_servico_realizado else np.zeros(n, dtype=np.int64),
+        _codigos(categorias_clientes, capacidades.categorias),
+        _codigos(niveis2_clientes, capacidades.niveis2),
+    ], axis=1)
+    perfis, codigo_perfil = np.unique(codigos, axis=0, return_inverse=True)
+    codigo_perfil = codigo_perfil.ravel()
+    ordem = np.argsort(codigo_perfil, kind="stable")
+    inicios = np.searchsorted(codigo_perfil[ordem], np.arange(len(perfis) + 1))
+
+    grupos = []
+    for p, (segmento, servico, categoria, nivel2) in enumerate(perfis):
+        compativel = ((capacidades.mascara_segmento & segmento) != 0) & (
+            ((capacidades.codigo_categoria == categoria) & (categoria >= 0))
+            | ((capacidades.codigo_nivel2 == nivel2) & (nivel2 >= 0))
+        )
+        if exigir_servico_realizado:
+            compativel &= (capacidades.mascara_servicos & servico) != 0
+        colunas = np.flatnonzero(compativel)
+        if len(colunas):
+            grupos.append((ordem[inicios[p]:inicios[p + 1]], colunas))
+    return grupos
+
+
+def atribuir_oficina_mais_proxima(clientes_df, categorias_clientes, niveis2_clientes, capacidades,
+                                  metodo="haversine", tamanho_bloco=16384, exigir_servico_realizado=False, pesos=None):
+    """Oficina compatível mais próxima de cada cliente, em lote.
+
+    Uma oficina é compatível quando atende o segmento do cliente (AND entre as
+    máscaras de segmento) e tem a mesma categoria ou o mesmo serviço nível 2
+    do serviço demandado. Com ``exigir_servico_realizado`` a oficina também
+    precisa ter o serviço demandado em ``servicos_realizados`` (AND entre as
+    máscaras de serviço). Os clientes são agrupados por perfil (segmento,
+    serviço, categoria, nível 2) e cada perfil só é comparado com as colunas
+    compatíveis da matriz de capacidades, em blocos: a ordenação usa o
+    produto escalar entre vetores unitários (uma multiplicação de matrizes por
+    bloco) e só o par escolhido tem a distância calculada com ``metodo``.
+    Empates ficam com a oficina que aparece primeiro em ``capacidades``.
+
+    Retorna ``(posicao, distancia_km, totais)``: a posição da oficina em
+    ``capacidades`` (-1 quando nenhuma é compatível), a distância até ela
+    (infinita quando não há oficina) e, com ``pesos`` (um valor por cliente,
+    p. ex. a receita anual), o total atribuído a cada oficina de
+    ``capacidades``, somado bloco a bloco na mesma passada (``None`` sem ``pesos``).
+    """
+    n = len(clientes_df)
+    posicao = np.full(n, -1, dtype=np.int64)
+    distancia = np.full(n, np.inf)
+    totais = np.zeros(len(capacidades))
+    if n == 0 or len(capacidades) == 0:
+        return posicao, distancia, None if pesos is None else totais
+    if pesos is not None:
+        pesos = np.asarray(pesos, dtype=np.float64)
+
+    latitudes = clientes_df["latitude"].to_numpy(dtype=np.float64)
+    longitudes = clientes_df["longitude"].to_numpy(dtype=np.float64)
+    unitarios = vetores_unitarios(latitudes, longitudes)
+
+    for clientes_perfil, colunas in perfis_compativeis(
+        clientes_df, categorias_clientes, niveis2_clientes, capacidades, exigir_servico_realizado
+    ):
+        unitarios_oficinas = capacidades.unitarios[colunas]
+
+        for inicio in range(0, len(clientes_perfil), tamanho_bloco):
+            bloco = clientes_perfil[inicio:inicio + tamanho_bloco]
+            # cos do ângulo central: maior valor = oficina mais próxima na esfera
+            cossenos = unitarios[bloco] @ unitarios_oficinas.T
+            melhor = np.argmax(cossenos, axis=1)
+
+            if metodo != "haversine":
+                # Quase-empates na esfera são reavaliados com o método pedido
+                melhor_cosseno = np.clip(cossenos[np.arange(len(bloco)), melhor], -1.0, 1.0)
+                limiar = np.cos(np.minimum(np.arccos(melhor_cosseno) * (1 + TOLERANCIA_REORDENACAO), np.pi))
+                linhas, candidatas = np.nonzero(cossenos >= limiar[:, None])
+                d = distancia_km(latitudes[bloco[linhas]], longitudes[bloco[linhas]],
+                                 capacidades.latitudes[colunas[candidatas]], capacidades.longitudes[colunas[candidatas]], metodo)
+                ordem_pares = np.lexsort((candidatas, d, linhas))
+                linhas_unicas, primeiros = np.unique(linhas[ordem_pares], return_index=True)
+                melhor[linhas_unicas] = candidatas[ordem_pares][primeiros]
+
+            posicao[bloco] = colunas[melhor]
+            if pesos is not None:
+                totais += np.bincount(colunas[melhor], weights=pesos[bloco], minlength=len(capacidades))
+
+    atribuidos = np.flatnonzero(posicao >= 0)
+    distancia[atribuidos] = distancia_km(
+        latitudes[atribuidos], longitudes[atribuidos],
+        capacidades.latitudes[posicao[atribuidos]], capacidades.longitudes[posicao[atribuidos]], metodo,
+    )
+    return posicao, distancia, None if pesos is None else totais
+
+
+def participacao_huff(clientes_df, categorias_clientes, niveis2_clientes, capacidades, beta=2.0,
+                      raio_truncamento_km=10.0, atratividade=None, metodo="haversine", tamanho_bloco=16384,
+                      exigir_servico_realizado=False):
+    """Participação de mercado pelo modelo de Huff (gravitacional), em lote.
+
+    A demanda de cada cliente é dividida entre as oficinas compatíveis (mesma
+    regra de ``atribuir_oficina_mais_proxima``) a até ``raio_truncamento_km``,
+    em proporção a ``atratividade / distancia ** beta`` (atratividade 1 por
+    padrão; distâncias abaixo de DISTANCIA_MINIMA_HUFF_KM contam como ela).
+    Por perfil e bloco de clientes, o produto escalar entre vetores unitários
+    descarta os pares fora do raio e só os pares restantes têm a distância
+    calculada com ``metodo``, então o resultado fica esparso.
+
+    Retorna a matriz cliente x oficina em formato coordenado,
+    ``(linhas, colunas, participacoes)``: posição do cliente, posição da
+    oficina em ``capacidades`` e fração da demanda (cada cliente com alguma
+    oficina no raio soma 1; clientes sem oficina não aparecem).
+    """
+    vazio = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+    if len(clientes_df) == 0 or len(capacidades) == 0:
+        return vazio
+    atratividade = np.ones(len(capacidades)) if atratividade is None else np.asarray(atratividade, dtype=np.float64)
+
+    latitudes = clientes_df["latitude"].to_numpy(dtype=np.float64)
+    longitudes = clientes_df["longitude"].to_numpy(dtype=np.float64)
+    unitarios = vetores_unitarios(latitudes, longitudes)
+    # Ângulo central do raio com folga para a diferença entre esfera e elipsoide
+    cosseno_limite = np.cos(min(raio_truncamento_km * (1 + TOLERANCIA_REORDENACAO) / RAIO_MEDIO_TERRA_KM, np.pi))
+
+    partes = [vazio]
+    for clientes_perfil, colunas in perfis_compativeis(
+        clientes_df, categorias_clientes, niveis2_clientes, capacidades, exigir_servico_realizado
+    ):
+        unitarios_oficinas = capacidades.unitarios[colunas]
+        for inicio in range(0, len(clientes_perfil), tamanho_bloco):
+            bloco = clientes_perfil[inicio:inicio + tamanho_bloco]
+            linhas, candidatas = np.nonzero(unitarios[bloco] @ unitarios_oficinas.T >= cosseno_limite)
+            oficinas = colunas[candidatas]
+            d = distancia_km(latitudes[bloco[linhas]], longitudes[bloco[linhas]],
+                             capacidades.latitudes[oficinas], capacidades.longitudes[oficinas], metodo)
+            dentro = d <= raio_truncamento_km
+            linhas, oficinas, d = linhas[dentro], oficinas[dentro], d[dentro]
+
+            utilidade = atratividade[oficinas] / np.maximum(d, DISTANCIA_MINIMA_HUFF_KM) ** beta
+            soma = np.bincount(linhas, weights=utilidade, minlength=len(bloco))
+            partes.append((bloco[linhas], oficinas, utilidade / soma[linhas]))
+
+    return tuple(np.concatenate(coluna) for coluna in zip(*partes))
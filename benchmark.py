@@ -0,0 +1,222 @@
+"""Benchmark das etapas do simulador sobre dados sintéticos em várias escalas.
+
+Uso: ``python benchmark.py [--escalas 12k 100k 1m] [--repeticoes 3] [--gravar-base]``
+
+Cada etapa do app é medida separadamente, na ordem do script e com as
+mesmas funções: carga dos dados (``load_data``), índices e capacidades,
+cadeia de filtros da barra lateral, buscas de raio, atribuição da oficina
+mais próxima, raio dos concorrentes, tabelas de distribuição e montagem do
+mapa folium (incluindo a renderização do HTML). O tempo é o menor de
+``--repeticoes`` execuções e o pico de memória vem de uma execução extra
+sob ``tracemalloc``.
+
+Os dados de cada escala são gerados uma vez por ``gerador_sintetico.py``
+(semente fixa) em ``--dados``. Os resultados são comparados com o arquivo de
+base (``--base``): uma etapa mais lenta ou com pico de memória maior que a
+base além da tolerância falha a execução (código de saída 1).
+``--gravar-base`` grava os resultados atuais como a nova base; como os
+tempos dependem da máquina, a base deve ser gravada no mesmo ambiente em
+que a comparação roda.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import folium
+import numpy as np
+
+import motor
+from agregacao import DIMENSOES, construir_cubo, distribuicao, distribuicao_por_atendimento
+from atribuicao import construir_matriz_capacidades
+from gerador_sintetico import gerar_dados
+from mapa import adicionar_densidade, adicionar_oficinas_agrupadas, camadas_densidade
+
+# Escala: (clientes, oficinas)
+ESCALAS = {"12k": (12_000, 300), "100k": (100_000, 1_000), "1m": (1_000_000, 10_000)}
+ESCALAS_PADRAO = ("12k", "100k")
+
+SEMENTE = 0
+ARQUIVO_BASE = "benchmark_base.json"
+DIRETORIO_DADOS = ".benchmark"
+
+# Regressão: acima da base em mais que a tolerância relativa e que o piso absoluto
+TOLERANCIA = 0.25
+PISO_SEGUNDOS = 0.05
+PISO_MB = 1.0
+
+# Cenário medido: as duas primeiras oficinas como principais, todos os segmentos e concorrentes
+RAIO_KM = motor.RAIO_PADRAO_KM
+N_PRINCIPAIS = 2
+
+
+def etapa_carregar(estado):
+    estado["clientes"], estado["oficinas"], estado["codificadores"] = motor.carregar_dados(estado["diretorio"])
+
+
+def etapa_indices(estado):
+    estado["indices"] = motor.construir_indices(estado["clientes"], estado["oficinas"], motor.METODO_DISTANCIA)
+    estado["capacidades"] = construir_matriz_capacidades(estado["oficinas"])
+
+
+def etapa_filtros(estado):
+    clientes, oficinas = estado["clientes"], estado["oficinas"]
+    segmentos = tuple(sorted(clientes["segmento"].astype(str).unique()))
+    zonas = tuple(sorted(oficinas["zona"].astype(str).unique()))
+    estado["filtradas"] = motor.filtrar(clientes, oficinas, estado["codificadores"], segmentos, zonas)
+
+
+def etapa_raio(estado):
+    principais = estado["oficinas"].iloc[:N_PRINCIPAIS]
+    estado["principais"] = principais
+    centro = motor.centroide(principais)
+    estado["no_raio"] = tuple(
+        motor.posicoes_no_raio(*motor.distancias_ordenadas(indice, filtradas, centro, motor.RAIO_MAXIMO_KM), RAIO_KM)
+        for indice, filtradas in zip(estado["indices"], estado["filtradas"])
+    )
+
+
+def etapa_atribuicao(estado):
+    posicoes_clientes, posicoes_oficinas = estado["no_raio"]
+    clientes_no_raio = estado["clientes"].iloc[posicoes_clientes]
+    concorrentes = estado["oficinas"].iloc[posicoes_oficinas]
+    concorrentes = concorrentes[~concorrentes.index.isin(estado["principais"].index)]
+    ids_oficina, _, atendimento, _ = motor.atribuir_clientes(
+        clientes_no_raio, estado["capacidades"], estado["principais"].index, concorrentes.index, motor.METODO_DISTANCIA,
+        pesos=clientes_no_raio["receita_anual"].to_numpy(),
+    )
+    estado.update(clientes_no_raio=clientes_no_raio, concorrentes=concorrentes, atendimento=atendimento)
+
+
+def etapa_raio_concorrentes(estado):
+    estado["no_raio_concorrente"] = motor.no_raio_de_concorrentes(
+        estado["clientes_no_raio"], estado["concorrentes"], RAIO_KM, motor.METODO_DISTANCIA
+    )
+
+
+def etapa_tabelas(estado):
+    cubo = construir_cubo(estado["clientes_no_raio"], estado["atendimento"], estado["no_raio_concorrente"])
+    for dimensao in DIMENSOES:
+        distribuicao(cubo, dimensao)
+        distribuicao_por_atendimento(cubo, dimensao)
+        distribuicao(cubo, dimensao, no_raio_concorrente=True)
+
+
+def etapa_mapa(estado):
+    principais = estado["principais"]
+    mapa = folium.Map(location=[principais["latitude"].mean(), principais["longitude"].mean()], zoom_start=12)
+    for _, oficina in principais.iterrows():
+        folium.Marker(location=[float(oficina["latitude"]), float(oficina["longitude"])]).add_to(mapa)
+        folium.Circle(location=[float(oficina["latitude"]), float(oficina["longitude"])], radius=RAIO_KM * 1000).add_to(mapa)
+    clientes = estado["clientes"].iloc[estado["filtradas"][0]]
+    for segmento in clientes["segmento"].astype(str).unique():
+        selecao = clientes[clientes["segmento"] == segmento]
+        adicionar_densidade(mapa, camadas_densidade(selecao["latitude"].to_numpy(), selecao["longitude"].to_numpy()), radius=15)
+    concorrentes = estado["concorrentes"]
+    adicionar_oficinas_agrupadas(mapa, concorrentes, "Concorrente", np.full(len(concorrentes), "blue"))
+    mapa.get_root().render()
+
+
+ETAPAS = {
+    "carregar": etapa_carregar,
+    "indices": etapa_indices,
+    "filtros": etapa_filtros,
+    "raio": etapa_raio,
+    "atribuicao": etapa_atribuicao,
+    "raio_concorrentes": etapa_raio_concorrentes,
+    "tabelas": etapa_tabelas,
+    "mapa": etapa_mapa,
+}
+
+
+def preparar_dados(escala, diretorio_dados):
+    """Diretório com os dados sintéticos da escala (gerados na primeira vez)"""
+    diretorio = os.path.join(diretorio_dados, escala)
+    if not os.path.exists(os.path.join(diretorio, motor.ARQUIVO_OFICINAS)):
+        n_clientes, n_oficinas = ESCALAS[escala]
+        print(f"Gerando dados {escala} em {diretorio}...")
+        gerar_dados(diretorio, n_clientes, n_oficinas, semente=SEMENTE)
+    return diretorio
+
+
+def medir_escala(diretorio, repeticoes=3):
+    """Tempo (menor de ``repeticoes``) e pico de memória (MB) de cada etapa, em ordem"""
+    estado = {"diretorio": diretorio}
+    resultados = {}
+    for nome, etapa in ETAPAS.items():
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            etapa(estado)
+            tempos.append(time.perf_counter() - inicio)
+        tracemalloc.start()
+        etapa(estado)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultados[nome] = {"segundos": min(tempos), "pico_mb": pico / 2**20}
+    return resultados
+
+
+def regressoes(resultados, base, tolerancia=TOLERANCIA):
+    """Lista de (chave, métrica, atual, base) que pioraram além da tolerância e dos pisos"""
+    piores = []
+    for chave, medidas in resultados.items():
+        if chave not in base:
+            continue
+        for metrica, piso in (("segundos", PISO_SEGUNDOS), ("pico_mb", PISO_MB)):
+            atual, referencia = medidas[metrica], base[chave][metrica]
+            if atual > referencia * (1 + tolerancia) and atual - referencia > piso:
+                piores.append((chave, metrica, atual, referencia))
+    return piores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede cada etapa do simulador e compara com a base gravada.")
+    parser.add_argument("--escalas", nargs="+", choices=list(ESCALAS), default=list(ESCALAS_PADRAO))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--dados", default=DIRETORIO_DADOS, help="diretório dos dados sintéticos gerados")
+    parser.add_argument("--base", default=ARQUIVO_BASE, help="arquivo JSON com os resultados de referência")
+    parser.add_argument("--gravar-base", action="store_true", help="grava os resultados atuais como base")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA, help="piora relativa aceita (padrão: 0.25)")
+    parser.add_argument("--saida", default=None, help="grava os resultados desta execução em JSON")
+    args = parser.parse_args(argv)
+
+    base = {}
+    if os.path.exists(args.base):
+        with open(args.base, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)
+
+    resultados = {}
+    print(f"{'escala':<6} {'etapa':<18} {'segundos':>9} {'pico MB':>9} {'base s':>9} {'base MB':>9}")
+    for escala in args.escalas:
+        for etapa, medidas in medir_escala(preparar_dados(escala, args.dados), args.repeticoes).items():
+            chave = f"{escala}/{etapa}"
+            resultados[chave] = medidas
+            referencia = base.get(chave, {})
+            print(
+                f"{escala:<6} {etapa:<18} {medidas['segundos']:>9.3f} {medidas['pico_mb']:>9.1f} "
+                f"{referencia.get('segundos', float('nan')):>9.3f} {referencia.get('pico_mb', float('nan')):>9.1f}"
+            )
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=1)
+    if args.gravar_base:
+        with open(args.base, "w", encoding="utf-8") as arquivo:
+            json.dump({**base, **resultados}, arquivo, indent=1, sort_keys=True)
+        print(f"-> base gravada em {args.base}")
+        return 0
+
+    piores = regressoes(resultados, base, args.tolerancia)
+    for chave, metrica, atual, referencia in piores:
+        print(f"[regressão] {chave} {metrica}: {atual:.3f} (base {referencia:.3f})", file=sys.stderr)
+    if not base:
+        print(f"Sem base em {args.base}: rode com --gravar-base para criar a referência")
+    return 1 if piores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
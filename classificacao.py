@@ -0,0 +1,113 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Regras em ordem de prioridade: a primeira regra com alguma palavra-chave presente vence
+REGRAS_CATEGORIA = [
+    ("Funilaria e Pintura", ("funilaria", "pintura")),
+    ("Pneus e Rodas", ("pneu", "roda")),
+    ("Elétrica", ("eletrica", "eletr")),
+    ("Mecânica", ("mecanica", "motor")),
+    ("Freios", ("freio",)),
+    ("Suspensão", ("suspensao",)),
+    ("Ar Condicionado", ("ar condicionado", "ar-condicionado")),
+    ("Direção", ("direcao",)),
+    ("Escapamento", ("escapamento",)),
+    ("Vidros", ("vidro", "parabrisa")),
+    ("Insulfilm", ("insulfilm",)),
+    ("Som e Multimídia", ("som", "multimidia")),
+    ("Acessórios", ("acessorios",)),
+    ("Revisão e Manutenção Preventiva", ("revisao", "preventiva")),
+    ("Estética Automotiva", ("estetica", "lavagem", "polimento")),
+]
+CATEGORIA_PADRAO = "Outros Serviços"
+
+REGRAS_NIVEL2 = [
+    ("Troca de Óleo", ("troca de oleo",)),
+    ("Balanceamento e Geometria", ("balanceamento", "geometria")),
+    ("Alinhamento", ("alinhamento",)),
+    ("Manutenção de Freios", ("freio",)),
+    ("Manutenção de Suspensão", ("suspensao",)),
+    ("Manutenção de Escapamento", ("escapamento",)),
+    ("Troca de Bateria", ("bateria",)),
+    ("Troca de Filtros", ("filtro",)),
+    ("Limpeza de Bicos", ("limpeza de bico",)),
+    ("Manutenção de Câmbio", ("cambio",)),
+    ("Manutenção de Motor", ("motor",)),
+    ("Manutenção de Ar Condicionado", ("ar condicionado", "ar-condicionado")),
+    ("Manutenção de Direção", ("direcao",)),
+    ("Instalação de Insulfilm", ("insulfilm",)),
+    ("Instalação de Som/Multimídia", ("som", "multimidia")),
+    ("Instalação de Alarme", ("alarme",)),
+    ("Instalação de Rastreador", ("rastreador",)),
+    ("Martelinho de Ouro", ("martelinho de ouro",)),
+    ("Polimento", ("polimento",)),
+    ("Cristalização/Vitrificação", ("cristalizacao", "vitrificacao")),
+    ("Lavagem", ("lavagem",)),
+]
+NIVEL2_PADRAO = "Não Especificado"
+
+
+class ClassificadorPalavrasChave:
+    """Classificador por palavras-chave com uma única expressão regular compilada.
+
+    Cada regra vira um grupo de uma alternação dentro de um lookahead, o que
+    encontra todas as ocorrências (inclusive sobrepostas) numa só varredura
+    do texto; o rótulo é o da regra de menor índice encontrada, reproduzindo
+    a cadeia de ``if``/``elif`` original. Os resultados ficam memorizados por
+    texto distinto.
+    """
+
+    def __init__(self, regras, padrao):
+        self.rotulos = [rotulo for rotulo, _ in regras]
+        self.padrao = padrao
+        alternativas = "|".join(
+            "(" + "|".join(re.escape(palavra) for palavra in palavras) + ")" for _, palavras in regras
+        )
+        self._expressao = re.compile(f"(?=(?:{alternativas}))")
+        self._memo = {}
+
+    def __call__(self, texto):
+        rotulo = self._memo.get(texto)
+        if rotulo is None:
+            regras = [m.lastindex for m in self._expressao.finditer(texto.lower())]
+            rotulo = self.rotulos[min(regras) - 1] if regras else self.padrao
+            self._memo[texto] = rotulo
+        return rotulo
+
+    def classificar(self, valores):
+        """Classifica uma Series inteira em O(valores distintos), devolvendo uma Series categórica"""
+        codigos, unicos = pd.factorize(valores)
+        rotulos_unicos = [self(valor) for valor in unicos]
+        presentes = set(rotulos_unicos)
+        categorias = [r for r in self.rotulos + [self.padrao] if r in presentes]
+        posicao = {rotulo: i for i, rotulo in enumerate(categorias)}
+        # Código -1 (valor ausente) continua -1 graças ao elemento extra no final
+        mapa = np.array([posicao[r] for r in rotulos_unicos] + [-1], dtype=np.int32)
+        return pd.Series(
+            pd.Categorical.from_codes(mapa[codigos], categories=categorias),
+            index=getattr(valores, "index", None),
+            name=getattr(valores, "name", None),
+        )
+
+
+classificador_categoria = ClassificadorPalavrasChave(REGRAS_CATEGORIA, CATEGORIA_PADRAO)
+classificador_nivel2 = ClassificadorPalavrasChave(REGRAS_NIVEL2, NIVEL2_PADRAO)
+
+
+# Função para determinar a categoria de serviço com base no nome da oficina
+def get_service_category(office_name):
+    return classificador_categoria(office_name)
+
+
+# Função para determinar o serviço nível 2 com base no nome da oficina
+def get_service_level2(office_name):
+    return classificador_nivel2(office_name)
+
+
+def adicionar_classificacao(df, coluna_origem):
+    """Adiciona as colunas categóricas ``categoria_servico`` e ``servico_nivel2`` a partir de uma coluna de texto"""
+    df["categoria_servico"] = classificador_categoria.classificar(df[coluna_origem])
+    df["servico_nivel2"] = classificador_nivel2.classificar(df[coluna_origem])
+    return df
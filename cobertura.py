@@ -0,0 +1,126 @@
+"""Anéis de cobertura pré-calculados por oficina, para consultas de raio sem varredura.
+
+O raio do app anda em passos de ``PASSO_KM`` até ``RAIO_MAXIMO_KM``, então
+basta saber, para cada oficina, quantos clientes caem em cada anel de
+``PASSO_KM``. ``construir_aneis`` faz uma única busca de raio máximo por
+oficina no índice espacial dos clientes e guarda as contagens acumuladas por
+anel e por grupo de clientes (combinação de segmento, categoria e serviço
+nível 2 presente nos dados): "clientes a até r km", as contagens por
+segmento ou serviço e a curva de cobertura inteira saem por indexação, sem
+recalcular distâncias.
+
+A lista ordenada de clientes de cada oficina não é guardada: com 1 milhão
+de clientes e 10 mil oficinas ela teria bilhões de entradas, enquanto as
+contagens crescem só com oficinas x anéis x grupos.
+
+Memória: o array denso tem ``oficinas x (raio_maximo_km / passo_km + 1) x
+grupos`` contagens, com os anéis limitados aos raios do slider (41 com
+0,5 km até 20 km) e contagens em uint16 enquanto os clientes cabem nele.
+Com 300 oficinas e 14 grupos (dados atuais) são ~0,3 MB; na escala de 1m
+do benchmark.py (10 mil oficinas, ~60 grupos) são ~100 MB em uint32, e a
+construção (uma busca de 20 km por oficina) passa a ser o ponto caro. Para
+um raio máximo menor, passe ``raio_maximo_km`` para encolher os anéis.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from motor import RAIO_MAXIMO_KM
+
+PASSO_KM = 0.5
+
+# Dimensões dos clientes que formam os grupos, na ordem dos filtros do app
+DIMENSOES_GRUPO = ("segmento", "nivel_1_servico", "nivel_2_servico")
+
+# Tolerância para raios no passo da grade (p. ex. 3 * 0.5 calculado em ponto flutuante)
+_TOLERANCIA_ANEL = 1e-9
+
+
+@dataclass(frozen=True)
+class AneisCobertura:
+    """Clientes acumulados por oficina, anel e grupo: ``acumulado[o, k, g]`` conta os
+    clientes do grupo ``g`` a até ``k * passo_km`` km da oficina ``o``"""
+
+    ids: pd.Index
+    passo_km: float
+    grupos: pd.DataFrame
+    acumulado: np.ndarray
+
+    @property
+    def raios_km(self):
+        return np.arange(self.acumulado.shape[1]) * self.passo_km
+
+    def selecao_grupos(self, segmentos=(), categorias=(), servicos_nivel2=()):
+        """Máscara dos grupos que passam nos filtros (seleção vazia não filtra, como em ``motor.filtrar``)"""
+        selecao = np.ones(len(self.grupos), dtype=bool)
+        for dimensao, valores in zip(DIMENSOES_GRUPO, (segmentos, categorias, servicos_nivel2)):
+            if valores:
+                selecao &= self.grupos[dimensao].isin(valores).to_numpy()
+        return selecao
+
+    def anel(self, raio_km):
+        """Índice do anel de um raio; raios fora do passo da grade caem no anel de baixo"""
+        anel = int(np.floor(raio_km / self.passo_km + _TOLERANCIA_ANEL))
+        if anel < 0 or anel >= self.acumulado.shape[1]:
+            raise ValueError(f"Raio {raio_km} km fora dos anéis calculados (0 a {self.raios_km[-1]:g} km)")
+        return anel
+
+    def _linhas(self, ids_oficinas):
+        linhas = self.ids.get_indexer(ids_oficinas)
+        if (linhas < 0).any():
+            raise ValueError("Oficinas sem anéis de cobertura calculados: " + ", ".join(map(str, np.asarray(ids_oficinas)[linhas < 0])))
+        return linhas
+
+    def contagens(self, ids_oficinas, raio_km, grupos=None):
+        """Clientes (dos grupos selecionados) a até ``raio_km`` de cada oficina"""
+        fatia = self.acumulado[self._linhas(ids_oficinas), self.anel(raio_km)]
+        if grupos is not None:
+            fatia = fatia[:, grupos]
+        return pd.Series(fatia.sum(axis=1), index=pd.Index(ids_oficinas, name="id_oficina"), name="clientes")
+
+    def por_grupo(self, id_oficina, raio_km):
+        """Clientes a até ``raio_km`` da oficina em cada grupo (para somar por segmento ou serviço)"""
+        linha = self._linhas([id_oficina])[0]
+        return self.grupos.assign(clientes=self.acumulado[linha, self.anel(raio_km)])
+
+    def curvas(self, ids_oficinas, grupos=None):
+        """Curva de cobertura: clientes (dos grupos selecionados) por raio (linhas) e oficina (colunas)"""
+        acumulado = self.acumulado[self._linhas(ids_oficinas)]
+        if grupos is not None:
+            acumulado = acumulado[:, :, grupos]
+        return pd.DataFrame(
+            acumulado.sum(axis=2).T,
+            index=pd.Index(self.raios_km, name="raio_km"),
+            columns=pd.Index(ids_oficinas, name="id_oficina"),
+        )
+
+
+def construir_aneis(base, raio_maximo_km=RAIO_MAXIMO_KM, passo_km=PASSO_KM):
+    """Anéis de cobertura de todas as oficinas da ``motor.BaseSimulacao``.
+
+    Custo: uma busca de ``raio_maximo_km`` por oficina no índice dos clientes.
+    """
+    clientes = base.clientes
+    codigos, grupos = pd.MultiIndex.from_frame(clientes[list(DIMENSOES_GRUPO)].astype(str)).factorize()
+    grupos = grupos.to_frame(index=False, name=list(DIMENSOES_GRUPO))
+    n_aneis = int(round(raio_maximo_km / passo_km)) + 1
+    n_grupos = len(grupos)
+
+    latitudes = base.oficinas["latitude"].to_numpy(dtype=np.float64)
+    longitudes = base.oficinas["longitude"].to_numpy(dtype=np.float64)
+    tipo = np.uint16 if len(clientes) <= np.iinfo(np.uint16).max else np.uint32
+    acumulado = np.zeros((len(base.oficinas), n_aneis, n_grupos), dtype=tipo)
+    for linha, (lat, lon) in enumerate(zip(latitudes, longitudes)):
+        posicoes, distancias = base.indice_clientes.no_raio(lat, lon, raio_maximo_km)
+        # Anel k: clientes com distância em ((k - 1) * passo, k * passo]
+        aneis = np.minimum(np.ceil(distancias / passo_km - _TOLERANCIA_ANEL).astype(np.int64), n_aneis - 1)
+        contagens = np.bincount(aneis * n_grupos + codigos[posicoes], minlength=n_aneis * n_grupos)
+        acumulado[linha] = np.cumsum(contagens.reshape(n_aneis, n_grupos), axis=0)
+    return AneisCobertura(ids=pd.Index(base.oficinas.index), passo_km=passo_km, grupos=grupos, acumulado=acumulado)
+
+
+def contagens_por_raio(distancias_ordenadas, raios):
+    """Quantos pontos de uma lista de distâncias já ordenada ficam a até cada raio (busca binária)"""
+    return np.searchsorted(distancias_ordenadas, raios, side="right")
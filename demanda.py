@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+# Visitas por ano para cada frequência de demanda do cadastro de clientes
+VISITAS_POR_ANO = {
+    "Semanal": 52.0,
+    "Quinzenal": 26.0,
+    "Mensal": 12.0,
+    "Bimestral": 6.0,
+    "Trimestral": 4.0,
+    "Quadrimestral": 3.0,
+    "Semestral": 2.0,
+    "Anual": 1.0,
+}
+
+# Clientes sem frequência informada contam como uma visita por ano
+VISITAS_PADRAO = 1.0
+
+
+def visitas_por_ano(frequencias):
+    """Visitas anuais por cliente, resolvidas uma vez por frequência distinta"""
+    codigos, unicos = pd.factorize(frequencias)
+    desconhecidas = [valor for valor in unicos if str(valor).strip().capitalize() not in VISITAS_POR_ANO]
+    if desconhecidas:
+        raise ValueError(f"Frequências sem número de visitas em VISITAS_POR_ANO: {', '.join(map(str, desconhecidas))}")
+    visitas = [VISITAS_POR_ANO[str(valor).strip().capitalize()] for valor in unicos] + [VISITAS_PADRAO]
+    return np.asarray(visitas, dtype=np.float64)[codigos]
+
+
+def adicionar_demanda(clientes_df):
+    """Adiciona ``visitas_ano`` e ``receita_anual`` (valor estimado x visitas por ano) aos clientes"""
+    clientes_df["visitas_ano"] = visitas_por_ano(clientes_df["frequencia_demanda"]).astype(np.float32)
+    valor = clientes_df["valor_estimado_servico"].to_numpy(dtype=np.float64, na_value=0.0)
+    clientes_df["receita_anual"] = valor * clientes_df["visitas_ano"].to_numpy(dtype=np.float64)
+    return clientes_df
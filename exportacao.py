@@ -0,0 +1,95 @@
+"""Exportação dos resultados em CSV ou Parquet, gravada em lotes de linhas.
+
+``DataFrame.to_csv()`` monta o arquivo inteiro como texto e a codificação
+cria outra cópia em bytes; aqui cada lote de ``LINHAS_POR_LOTE`` linhas é
+convertido e gravado direto no arquivo de destino (CSV) ou vira um row
+group do Parquet, com as colunas tipadas (distâncias em float, categóricas
+como dicionário). ``exportar_zip`` grava várias tabelas (p. ex. as de cada
+cenário do lote) num único zip, consumindo um iterável: com um gerador, só
+as tabelas do cenário corrente ficam em memória.
+"""
+
+import io
+import zipfile
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+LINHAS_POR_LOTE = 100_000
+FORMATOS = ("csv", "parquet")
+TIPOS_MIME = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet", "zip": "application/zip"}
+
+
+def distancias_tipadas(distancias):
+    """Distâncias (ou tempos) em float32, com NaN no lugar de infinito (cliente sem oficina compatível)"""
+    valores = np.asarray(distancias, dtype=np.float32)
+    return np.where(np.isfinite(valores), valores, np.float32(np.nan))
+
+
+def _lotes(n_linhas, linhas_por_lote):
+    """Fatias de linhas de cada lote (ao menos uma, para gravar o cabeçalho de tabelas vazias)"""
+    for inicio in range(0, max(n_linhas, 1), linhas_por_lote):
+        yield slice(inicio, inicio + linhas_por_lote)
+
+
+def escrever_csv(df, arquivo, linhas_por_lote=LINHAS_POR_LOTE):
+    """Grava ``df`` como CSV UTF-8 no arquivo binário aberto, um lote por vez"""
+    for lote in _lotes(len(df), linhas_por_lote):
+        arquivo.write(df.iloc[lote].to_csv(index=False, header=lote.start == 0).encode("utf-8"))
+
+
+def escrever_parquet(df, arquivo, linhas_por_lote=LINHAS_POR_LOTE):
+    """Grava ``df`` como Parquet no arquivo binário aberto, um row group por lote"""
+    esquema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(arquivo, esquema) as escritor:
+        for lote in _lotes(len(df), linhas_por_lote):
+            escritor.write_table(pa.Table.from_pandas(df.iloc[lote], schema=esquema, preserve_index=False))
+
+
+def escrever(df, arquivo, formato, linhas_por_lote=LINHAS_POR_LOTE):
+    if formato == "csv":
+        escrever_csv(df, arquivo, linhas_por_lote)
+    elif formato == "parquet":
+        escrever_parquet(df, arquivo, linhas_por_lote)
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {formato!r} (use {' ou '.join(FORMATOS)})")
+
+
+def gravar(df, destino, formato, linhas_por_lote=LINHAS_POR_LOTE):
+    """Grava ``df`` no caminho ``destino``; retorna o caminho"""
+    with open(destino, "wb") as arquivo:
+        escrever(df, arquivo, formato, linhas_por_lote)
+    return destino
+
+
+def arquivo_exportacao(df, formato, linhas_por_lote=LINHAS_POR_LOTE):
+    """``io.BytesIO`` (já no início) com ``df`` exportado, para o botão de download do app.
+
+    O Streamlit lê o arquivo inteiro em bytes para servir o download, então o
+    buffer fica em memória; os lotes evitam só as cópias intermediárias.
+    """
+    arquivo = io.BytesIO()
+    escrever(df, arquivo, formato, linhas_por_lote)
+    arquivo.seek(0)
+    return arquivo
+
+
+def exportar_zip(destino, tabelas, formato, linhas_por_lote=LINHAS_POR_LOTE):
+    """Grava as tabelas de um iterável de ``(nome, df)`` como ``nome.formato`` dentro do zip ``destino``.
+
+    O iterável é consumido uma tabela por vez. CSVs são comprimidos com
+    deflate; Parquet, que já é comprimido por coluna, é guardado sem nova
+    compressão. ``destino`` pode ser um caminho ou um arquivo binário aberto.
+    Nomes repetidos geram ``ValueError`` (o zip teria duas entradas iguais).
+    """
+    compressao = zipfile.ZIP_DEFLATED if formato == "csv" else zipfile.ZIP_STORED
+    gravados = set()
+    with zipfile.ZipFile(destino, "w", compression=compressao) as pacote:
+        for nome, df in tabelas:
+            if nome in gravados:
+                raise ValueError(f"Tabela repetida na exportação: {nome!r}")
+            gravados.add(nome)
+            with pacote.open(f"{nome}.{formato}", "w", force_zip64=True) as arquivo:
+                escrever(df, arquivo, formato, linhas_por_lote)
+    return destino
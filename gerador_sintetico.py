@@ -0,0 +1,242 @@
+"""Gerador de dados sintéticos de clientes e oficinas em qualquer escala.
+
+Uso: ``python gerador_sintetico.py --clientes 1000000 --oficinas 10000 --saida dados_1m [--semente 42]``
+
+Grava ``clientes_com_segmento.csv`` e ``oficinas_com_segmento.csv`` com o
+esquema lido pelo app e pelo ``motor`` (a pasta gerada serve direto como
+``--dados`` do simulador_cli.py; ``armazenamento.py`` converte para Feather).
+
+Cada linha é um bootstrap suavizado dos arquivos de referência: sorteia-se
+uma linha real e copiam-se os atributos categóricos (região, serviço,
+frequência, veículo; bairro, zona, segmento e serviços das oficinas), o que
+preserva as proporções e as combinações entre eles; as coordenadas recebem
+um ruído gaussiano com a largura de banda de Scott do seu grupo (``regiao``
+dos clientes, ``bairro`` das oficinas), o que reproduz a concentração
+espacial sem repetir pontos, e o valor do serviço é sorteado da distribuição
+empírica do tipo de serviço (inversa da função de distribuição, interpolada).
+Zona e bairro dos clientes vêm da oficina de referência mais próxima. O
+segmento vem da linha sorteada quando a referência tem os clientes com
+segmento (``clientes_com_segmento.csv``, ligados por ``id_cliente``); sem
+ele, é sorteado entre os segmentos atendidos pela oficina de referência mais
+próxima, o que mantém a estrutura de segmento por região das oficinas.
+
+Os arquivos gerados têm os nomes lidos pelo app, os mesmos da referência,
+então a saída não pode ser o diretório de referência.
+
+As linhas são geradas e gravadas em lotes, cada um com um gerador derivado
+da semente e do número do lote, então a memória não cresce com o tamanho
+pedido e a mesma semente (com o mesmo tamanho de lote) gera o mesmo arquivo.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from classificacao import classificador_categoria, classificador_nivel2
+from indice_espacial import IndiceGrade
+from mascaras import separar_itens
+
+ARQUIVO_CLIENTES_REFERENCIA = "clientes_f_real_12k.csv"
+ARQUIVO_OFICINAS_REFERENCIA = "oficinas_com_segmento.csv"
+# Clientes com segmento, quando existir, dão o segmento de cada cliente de referência
+ARQUIVO_SEGMENTOS_REFERENCIA = "clientes_com_segmento.csv"
+
+ARQUIVO_CLIENTES = "clientes_com_segmento.csv"
+ARQUIVO_OFICINAS = "oficinas_com_segmento.csv"
+
+COLUNAS_CLIENTES = [
+    "id_cliente", "endereco_cliente", "regiao", "latitude", "longitude", "tipo_servico_demandado", "frequencia_demanda",
+    "valor_estimado_servico", "veiculo", "ano_veiculo", "segmento", "zona", "bairro", "nivel_1_servico", "nivel_2_servico",
+]
+COLUNAS_OFICINAS = ["nome_oficina", "latitude", "longitude", "regiao", "servicos_realizados", "zona", "bairro", "segmento"]
+
+TAMANHO_LOTE = 100_000
+
+# Largura de banda mínima (graus, ~200 m) para grupos com um único ponto de referência
+LARGURA_MINIMA_GRAUS = 0.002
+
+# Identificadores das tabelas na derivação das sementes dos lotes
+_TABELA_OFICINAS, _TABELA_CLIENTES = 0, 1
+
+_NUMERO_ENDERECO = re.compile(r"^(.*?),\s*\d+\s*-\s*")
+
+
+def _larguras_banda(df, coluna_grupo):
+    """Largura de banda de Scott (2D) de latitude e longitude por grupo, alinhada às linhas"""
+    grupos = df.groupby(coluna_grupo, observed=True)
+    desvios = grupos[["latitude", "longitude"]].transform("std").fillna(0.0)
+    tamanhos = grupos["latitude"].transform("size").to_numpy(dtype=np.float64)
+    fator = tamanhos ** (-1.0 / 6.0)
+    larguras = desvios.to_numpy() * fator[:, None]
+    return np.maximum(larguras, LARGURA_MINIMA_GRAUS)
+
+
+class Referencia:
+    """Dados de referência e as estatísticas usadas no bootstrap suavizado"""
+
+    def __init__(self, diretorio):
+        self.diretorio = os.path.abspath(diretorio)
+        self.clientes = pd.read_csv(os.path.join(diretorio, ARQUIVO_CLIENTES_REFERENCIA))
+        self.oficinas = pd.read_csv(os.path.join(diretorio, ARQUIVO_OFICINAS_REFERENCIA))
+
+        self.largura_clientes = _larguras_banda(self.clientes, "regiao")
+        self.largura_oficinas = _larguras_banda(self.oficinas, "bairro")
+
+        # Valores de serviço ordenados por tipo de serviço (distribuição empírica)
+        self.codigo_servico, servicos = pd.factorize(self.clientes["tipo_servico_demandado"])
+        valores = self.clientes["valor_estimado_servico"].to_numpy(dtype=np.float64)
+        self.valores_servico = [np.sort(valores[self.codigo_servico == i]) for i in range(len(servicos))]
+
+        # Rua (sem número) de cada endereço, para montar endereços novos
+        self.ruas = self.clientes["endereco_cliente"].str.extract(_NUMERO_ENDERECO, expand=False).fillna("Rua Sem Nome").to_numpy()
+
+        # Segmento de cada cliente de referência (vazio quando não há o arquivo ou o id)
+        self.segmento_clientes = np.full(len(self.clientes), None, dtype=object)
+        caminho_segmentos = os.path.join(diretorio, ARQUIVO_SEGMENTOS_REFERENCIA)
+        if os.path.exists(caminho_segmentos):
+            segmentos = pd.read_csv(caminho_segmentos, usecols=["id_cliente", "segmento"]).drop_duplicates("id_cliente")
+            self.segmento_clientes = self.clientes["id_cliente"].map(segmentos.set_index("id_cliente")["segmento"]).to_numpy(dtype=object)
+
+        # Segmentos atendidos por oficina de referência, em colunas (completadas com o primeiro)
+        itens = [separar_itens(segmento) if isinstance(segmento, str) else [] for segmento in self.oficinas["segmento"]]
+        itens = [lista or ["Não Especificado"] for lista in itens]
+        self.n_segmentos_oficinas = np.array([len(lista) for lista in itens])
+        self.segmentos_oficinas = np.array(
+            [lista + lista[:1] * (self.n_segmentos_oficinas.max() - len(lista)) for lista in itens], dtype=object
+        )
+
+        self.marcas = self.oficinas["nome_oficina"].str.split("_").str[0].to_numpy()
+        self.indice_oficinas = IndiceGrade(self.oficinas["latitude"], self.oficinas["longitude"], tamanho_celula_km=2.0)
+
+
+def _gerador(semente, tabela, lote):
+    return np.random.default_rng(np.random.SeedSequence(semente, spawn_key=(tabela, lote)))
+
+
+def gerar_oficinas(referencia, n, inicio, gerador):
+    """Lote de ``n`` oficinas numeradas a partir de ``inicio``"""
+    ref = referencia.oficinas
+    linhas = gerador.integers(0, len(ref), n)
+    coordenadas = ref[["latitude", "longitude"]].to_numpy()[linhas] + gerador.normal(size=(n, 2)) * referencia.largura_oficinas[linhas]
+    segmentos = ref["segmento"].to_numpy()[linhas]
+    sufixos = pd.Series(segmentos).str.replace(r"\s*,\s*", "_", regex=True).to_numpy()
+    numeros = np.arange(inicio + 1, inicio + n + 1).astype(str)
+    return pd.DataFrame({
+        "nome_oficina": referencia.marcas[linhas].astype(object) + "_" + numeros + "_" + sufixos.astype(object),
+        "latitude": coordenadas[:, 0],
+        "longitude": coordenadas[:, 1],
+        "regiao": ref["regiao"].to_numpy()[linhas],
+        "servicos_realizados": ref["servicos_realizados"].to_numpy()[linhas],
+        "zona": ref["zona"].to_numpy()[linhas],
+        "bairro": ref["bairro"].to_numpy()[linhas],
+        "segmento": segmentos,
+    }, columns=COLUNAS_OFICINAS)
+
+
+def gerar_clientes(referencia, n, inicio, gerador):
+    """Lote de ``n`` clientes com ``id_cliente`` a partir de ``inicio + 1``"""
+    ref = referencia.clientes
+    linhas = gerador.integers(0, len(ref), n)
+    coordenadas = ref[["latitude", "longitude"]].to_numpy()[linhas] + gerador.normal(size=(n, 2)) * referencia.largura_clientes[linhas]
+    quantis = gerador.random(n)
+    codigos = referencia.codigo_servico[linhas]
+    valores = np.empty(n)
+    for codigo, ordenados in enumerate(referencia.valores_servico):
+        selecao = codigos == codigo
+        valores[selecao] = np.interp(quantis[selecao], np.linspace(0.0, 1.0, len(ordenados)), ordenados)
+    regioes = ref["regiao"].to_numpy()[linhas]
+    numeros = gerador.integers(10, 4000, n).astype(str)
+    enderecos = referencia.ruas[linhas].astype(object) + ", " + numeros + " - " + regioes.astype(object) + ", São Paulo - SP"
+
+    # Zona e bairro da oficina de referência mais próxima
+    mais_proxima, _ = referencia.indice_oficinas.k_mais_proximos(coordenadas[:, 0], coordenadas[:, 1], k=1)
+    mais_proxima = mais_proxima[:, 0]
+
+    # Segmento da linha sorteada ou, sem ele, um dos segmentos da oficina de referência mais próxima
+    sorteio = (gerador.random(n) * referencia.n_segmentos_oficinas[mais_proxima]).astype(np.int64)
+    segmentos = referencia.segmento_clientes[linhas]
+    sem_segmento = pd.isna(segmentos)
+    segmentos[sem_segmento] = referencia.segmentos_oficinas[mais_proxima, sorteio][sem_segmento]
+
+    servicos = pd.Series(ref["tipo_servico_demandado"].to_numpy()[linhas])
+    return pd.DataFrame({
+        "id_cliente": np.arange(inicio + 1, inicio + n + 1),
+        "endereco_cliente": enderecos,
+        "regiao": regioes,
+        "latitude": coordenadas[:, 0],
+        "longitude": coordenadas[:, 1],
+        "tipo_servico_demandado": servicos.to_numpy(),
+        "frequencia_demanda": ref["frequencia_demanda"].to_numpy()[linhas],
+        "valor_estimado_servico": np.round(valores, 2),
+        "veiculo": ref["veiculo"].to_numpy()[linhas],
+        "ano_veiculo": ref["ano_veiculo"].to_numpy()[linhas],
+        "segmento": segmentos,
+        "zona": referencia.oficinas["zona"].to_numpy()[mais_proxima],
+        "bairro": referencia.oficinas["bairro"].to_numpy()[mais_proxima],
+        "nivel_1_servico": np.asarray(classificador_categoria.classificar(servicos)),
+        "nivel_2_servico": np.asarray(classificador_nivel2.classificar(servicos)),
+    }, columns=COLUNAS_CLIENTES)
+
+
+def gravar_em_lotes(caminho, gerar, referencia, total, semente, tabela, tamanho_lote=TAMANHO_LOTE):
+    """Gera ``total`` linhas em lotes e grava cada lote no CSV assim que fica pronto"""
+    with open(caminho, "w", encoding="utf-8", newline="") as arquivo:
+        for lote, inicio in enumerate(range(0, total, tamanho_lote)):
+            n = min(tamanho_lote, total - inicio)
+            gerar(referencia, n, inicio, _gerador(semente, tabela, lote)).to_csv(arquivo, header=lote == 0, index=False)
+        if total == 0:
+            arquivo.write(",".join(COLUNAS_CLIENTES if tabela == _TABELA_CLIENTES else COLUNAS_OFICINAS) + "\n")
+    return caminho
+
+
+def gerar_dados(saida, n_clientes, n_oficinas, semente=0, referencia=None, tamanho_lote=TAMANHO_LOTE):
+    """Grava clientes e oficinas sintéticos em ``saida``; retorna os caminhos gravados.
+
+    ``ValueError`` quando ``saida`` é o diretório de referência (os arquivos
+    gerados substituiriam os dados reais).
+    """
+    if referencia is None:
+        referencia = Referencia(os.path.dirname(os.path.abspath(__file__)))
+    if os.path.realpath(saida) == os.path.realpath(referencia.diretorio):
+        raise ValueError(f"A saída {saida} é o diretório de referência: os CSVs gerados substituiriam os dados reais")
+    os.makedirs(saida, exist_ok=True)
+    return (
+        gravar_em_lotes(os.path.join(saida, ARQUIVO_CLIENTES), gerar_clientes, referencia, n_clientes, semente, _TABELA_CLIENTES, tamanho_lote),
+        gravar_em_lotes(os.path.join(saida, ARQUIVO_OFICINAS), gerar_oficinas, referencia, n_oficinas, semente, _TABELA_OFICINAS, tamanho_lote),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera clientes e oficinas sintéticos com o esquema e a distribuição dos dados reais.")
+    parser.add_argument("--clientes", type=int, default=1_000_000)
+    parser.add_argument("--oficinas", type=int, default=10_000)
+    parser.add_argument("--saida", required=True, help="diretório de saída")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--referencia", default=os.path.dirname(os.path.abspath(__file__)), help="diretório com os CSVs de referência")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas por lote gravado")
+    args = parser.parse_args(argv)
+    if args.clientes < 0 or args.oficinas < 0 or args.lote <= 0:
+        parser.error("--clientes e --oficinas não podem ser negativos e --lote deve ser positivo")
+
+    inicio = time.perf_counter()
+    try:
+        referencia = Referencia(args.referencia)
+    except (OSError, KeyError) as erro:
+        parser.error(f"referência inválida em {args.referencia}: {erro}")
+    try:
+        caminhos = gerar_dados(args.saida, args.clientes, args.oficinas, args.semente, referencia, args.lote)
+    except ValueError as erro:
+        parser.error(str(erro))
+    for caminho in caminhos:
+        print(f"-> {caminho}")
+    print(f"{args.clientes} clientes e {args.oficinas} oficinas em {time.perf_counter() - inicio:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
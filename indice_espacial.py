@@ -0,0 +1,136 @@
+import numpy as np
+
+from distancias import distancia_km
+
+# Quilômetros por grau de latitude (valor mínimo no WGS-84, usado como limite conservador)
+KM_POR_GRAU_LAT = 110.574
+# Quilômetros por grau de longitude no equador
+KM_POR_GRAU_LON_EQUADOR = 111.320
+
+
+class IndiceGrade:
+    """Índice espacial em grade regular de latitude/longitude.
+
+    Os pontos são ordenados pelo id da célula (linha-major), de modo que cada
+    faixa de células de uma mesma linha é um intervalo contíguo do array
+    ordenado e pode ser localizada com ``searchsorted``. Consultas de raio e de
+    vizinhos mais próximos só calculam distâncias para os pontos das células
+    candidatas, em vez de varrer o conjunto inteiro.
+    """
+
+    def __init__(self, latitudes, longitudes, tamanho_celula_km=1.0, metodo="haversine"):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.metodo = metodo
+        self.tamanho_celula_km = tamanho_celula_km
+
+        if len(self.latitudes) == 0:
+            self.lat0 = self.lon0 = 0.0
+            lat_max_abs = 0.0
+        else:
+            self.lat0 = self.latitudes.min()
+            self.lon0 = self.longitudes.min()
+            lat_max_abs = np.abs(self.latitudes).max()
+
+        # Tamanho das células em graus; a largura em longitude usa a maior
+        # latitude absoluta para que nenhuma célula tenha menos que o tamanho pedido
+        self.passo_lat = tamanho_celula_km / KM_POR_GRAU_LAT
+        self.passo_lon = tamanho_celula_km / (KM_POR_GRAU_LON_EQUADOR * np.cos(np.radians(min(lat_max_abs, 89.0))))
+
+        linhas, colunas = self._celula(self.latitudes, self.longitudes)
+        self.n_linhas = int(linhas.max()) + 1 if len(linhas) else 1
+        self.n_colunas = int(colunas.max()) + 1 if len(colunas) else 1
+
+        celulas = linhas * self.n_colunas + colunas
+        self._ordem = np.argsort(celulas, kind="stable")
+        self._celulas_ordenadas = celulas[self._ordem]
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def _celula(self, latitudes, longitudes):
+        linhas = np.floor((np.asarray(latitudes) - self.lat0) / self.passo_lat).astype(np.int64)
+        colunas = np.floor((np.asarray(longitudes) - self.lon0) / self.passo_lon).astype(np.int64)
+        return linhas, colunas
+
+    def _candidatos(self, linha_min, linha_max, coluna_min, coluna_max):
+        """Posições dos pontos nas células do retângulo [linha_min, linha_max] x [coluna_min, coluna_max]"""
+        linha_min, linha_max = max(linha_min, 0), min(linha_max, self.n_linhas - 1)
+        coluna_min, coluna_max = max(coluna_min, 0), min(coluna_max, self.n_colunas - 1)
+        if linha_min > linha_max or coluna_min > coluna_max:
+            return np.empty(0, dtype=np.int64)
+
+        linhas = np.arange(linha_min, linha_max + 1, dtype=np.int64)
+        inicios = np.searchsorted(self._celulas_ordenadas, linhas * self.n_colunas + coluna_min, side="left")
+        fins = np.searchsorted(self._celulas_ordenadas, linhas * self.n_colunas + coluna_max, side="right")
+        fatias = [self._ordem[i:f] for i, f in zip(inicios, fins) if f > i]
+        if not fatias:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(fatias)
+
+    def no_raio(self, lat, lon, raio_km):
+        """Posições e distâncias (km) dos pontos a até ``raio_km`` de (lat, lon)"""
+        margem_lat = raio_km / KM_POR_GRAU_LAT
+        cos_lat = np.cos(np.radians(min(abs(lat) + margem_lat, 89.0)))
+        margem_lon = raio_km / (KM_POR_GRAU_LON_EQUADOR * cos_lat)
+
+        linha_min, coluna_min = self._celula(lat - margem_lat, lon - margem_lon)
+        linha_max, coluna_max = self._celula(lat + margem_lat, lon + margem_lon)
+        candidatos = self._candidatos(int(linha_min), int(linha_max), int(coluna_min), int(coluna_max))
+
+        distancias = distancia_km(self.latitudes[candidatos], self.longitudes[candidatos], lat, lon, self.metodo)
+        dentro = distancias <= raio_km
+        return candidatos[dentro], distancias[dentro]
+
+    def k_mais_proximos(self, latitudes, longitudes, k=1):
+        """Os ``k`` pontos mais próximos de cada coordenada consultada.
+
+        Retorna ``(posicoes, distancias)`` com formato ``(n_consultas, k)``,
+        ordenados por distância. Quando o índice tem menos de ``k`` pontos as
+        colunas excedentes recebem posição -1 e distância infinita.
+        """
+        latitudes = np.atleast_1d(np.asarray(latitudes, dtype=np.float64))
+        longitudes = np.atleast_1d(np.asarray(longitudes, dtype=np.float64))
+        n = len(latitudes)
+        posicoes = np.full((n, k), -1, dtype=np.int64)
+        distancias = np.full((n, k), np.inf)
+        if n == 0 or len(self) == 0:
+            return posicoes, distancias
+
+        # Agrupa as consultas por célula para buscar candidatos uma vez por célula
+        linhas, colunas = self._celula(latitudes, longitudes)
+        linhas = np.clip(linhas, 0, self.n_linhas - 1)
+        colunas = np.clip(colunas, 0, self.n_colunas - 1)
+        celulas = linhas * self.n_colunas + colunas
+        ordem = np.argsort(celulas, kind="stable")
+        celulas_unicas, inicios = np.unique(celulas[ordem], return_index=True)
+        fins = np.append(inicios[1:], n)
+
+        anel_maximo = max(self.n_linhas, self.n_colunas)
+        k_efetivo = min(k, len(self))
+        for celula, inicio, fim in zip(celulas_unicas, inicios, fins):
+            consultas = ordem[inicio:fim]
+            linha, coluna = divmod(int(celula), self.n_colunas)
+
+            # Expande anéis de células até que o k-ésimo vizinho esteja garantidamente
+            # dentro do quadrado (pontos fora dele estão a pelo menos anel * célula km)
+            anel = 0
+            while True:
+                candidatos = self._candidatos(linha - anel, linha + anel, coluna - anel, coluna + anel)
+                if len(candidatos) >= k_efetivo:
+                    d = distancia_km(
+                        latitudes[consultas][:, None], longitudes[consultas][:, None],
+                        self.latitudes[candidatos][None, :], self.longitudes[candidatos][None, :],
+                        self.metodo,
+                    )
+                    parte = np.argpartition(d, k_efetivo - 1, axis=1)[:, :k_efetivo]
+                    d_parte = np.take_along_axis(d, parte, axis=1)
+                    if anel >= anel_maximo or d_parte.max() <= anel * self.tamanho_celula_km:
+                        break
+                anel += 1
+
+            ordem_parte = np.argsort(d_parte, axis=1)
+            posicoes[consultas, :k_efetivo] = candidatos[np.take_along_axis(parte, ordem_parte, axis=1)]
+            distancias[consultas, :k_efetivo] = np.take_along_axis(d_parte, ordem_parte, axis=1)
+
+        return posicoes, distancias
@@ -0,0 +1,122 @@
+"""Medição de tempo, linhas e memória por etapa de uma execução do script.
+
+Cada execução cria um ``Medidor``; as etapas são envolvidas com o gerenciador
+de contexto ``medidor.etapa(nome, linhas_entrada)`` (ou ``iniciar``/``concluir``
+quando o trecho é longo demais para um bloco ``with``) e ganham um registro
+com tempo de parede, linhas de entrada e saída e variação da memória
+residente do processo. Os registros aparecem no painel de desempenho do app
+e, com ``configurar_log``, são gravados como JSON lines (um objeto por
+etapa, com o id da execução e o contexto, p. ex. os filtros ativos) para
+análise posterior.
+"""
+
+import functools
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Variável de ambiente com o caminho do log JSON lines (sem ela, nada é gravado)
+VARIAVEL_LOG = "SIMULADOR_LOG_DESEMPENHO"
+
+logger = logging.getLogger("simulador.desempenho")
+
+try:
+    _PAGINA_MB = os.sysconf("SC_PAGE_SIZE") / 2**20
+except (AttributeError, ValueError, OSError):
+    _PAGINA_MB = None
+
+
+def memoria_residente_mb():
+    """Memória residente atual do processo (MB), lida de /proc; ``None`` quando indisponível"""
+    if _PAGINA_MB is None:
+        return None
+    try:
+        with open("/proc/self/statm") as arquivo:
+            return int(arquivo.read().split()[1]) * _PAGINA_MB
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def configurar_log(caminho=None):
+    """Grava os registros de etapa em ``caminho`` (ou no da variável VARIAVEL_LOG) como JSON lines.
+
+    Pode ser chamada a cada execução do script: o arquivo só recebe um handler.
+    """
+    caminho = caminho or os.environ.get(VARIAVEL_LOG)
+    if not caminho:
+        return None
+    caminho = os.path.abspath(caminho)
+    if not any(getattr(handler, "baseFilename", None) == caminho for handler in logger.handlers):
+        handler = logging.FileHandler(caminho, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return caminho
+
+
+class Medidor:
+    """Registros das etapas de uma execução, com o contexto comum a todos"""
+
+    def __init__(self, contexto=None):
+        self.execucao = uuid.uuid4().hex[:12]
+        self.contexto = dict(contexto or {})
+        self.registros = []
+
+    def iniciar(self, nome, linhas_entrada=None):
+        """Abre o registro de uma etapa; feche com ``concluir``"""
+        return {
+            "etapa": nome,
+            "linhas_entrada": linhas_entrada,
+            "linhas_saida": None,
+            "_inicio": time.perf_counter(),
+            "_memoria": memoria_residente_mb(),
+        }
+
+    def concluir(self, registro, linhas_saida=None):
+        """Fecha o registro: tempo, linhas de saída e variação da memória; grava no log"""
+        segundos = time.perf_counter() - registro.pop("_inicio")
+        memoria_inicial = registro.pop("_memoria")
+        memoria = memoria_residente_mb()
+        if linhas_saida is not None:
+            registro["linhas_saida"] = linhas_saida
+        registro["segundos"] = segundos
+        registro["memoria_mb"] = memoria
+        registro["memoria_delta_mb"] = None if memoria is None or memoria_inicial is None else memoria - memoria_inicial
+        self.registros.append(registro)
+        if logger.handlers:
+            logger.info(json.dumps(
+                {"execucao": self.execucao, "momento": time.time(), **registro, "contexto": self.contexto},
+                ensure_ascii=False,
+                default=str,
+            ))
+        return registro
+
+    @contextmanager
+    def etapa(self, nome, linhas_entrada=None):
+        """Mede o bloco ``with``; o registro devolvido aceita ``linhas_saida`` dentro do bloco"""
+        registro = self.iniciar(nome, linhas_entrada)
+        try:
+            yield registro
+        finally:
+            self.concluir(registro)
+
+    def medir(self, nome):
+        """Decorador: mede cada chamada da função como a etapa ``nome``"""
+        def decorador(funcao):
+            @functools.wraps(funcao)
+            def medida(*args, **kwargs):
+                with self.etapa(nome):
+                    return funcao(*args, **kwargs)
+            return medida
+        return decorador
+
+    def tabela(self):
+        """Registros como DataFrame (uma linha por etapa, na ordem de execução)"""
+        colunas = ["etapa", "segundos", "linhas_entrada", "linhas_saida", "memoria_delta_mb", "memoria_mb"]
+        return pd.DataFrame(self.registros, columns=colunas)
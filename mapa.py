@@ -0,0 +1,98 @@
+import numpy as np
+from branca.element import MacroElement
+from folium.plugins import FastMarkerCluster, HeatMap
+from jinja2 import Template
+
+# Grades de densidade por faixa de zoom: (zoom mínimo, zoom máximo, célula em graus).
+# A célula acompanha o raio do heatmap (15 px): ~1,1 km até o zoom 11, ~330 m e ~110 m acima
+NIVEIS_DENSIDADE = ((0, 11, 0.01), (12, 13, 0.003), (14, 18, 0.001))
+
+# Casas decimais enviadas ao navegador (~1 m), bem menos que os 17 dígitos do float
+CASAS_DECIMAIS = 5
+
+
+def binar_pontos(latitudes, longitudes, celula_graus):
+    """Agrupa pontos em uma grade regular: uma linha [lat, lon, peso] por célula ocupada,
+    posicionada no centro de massa dos pontos da célula"""
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    if len(latitudes) == 0:
+        return np.empty((0, 3))
+    celulas = np.stack([np.floor(latitudes / celula_graus), np.floor(longitudes / celula_graus)], axis=1)
+    _, inverso = np.unique(celulas, axis=0, return_inverse=True)
+    inverso = inverso.ravel()
+    pesos = np.bincount(inverso)
+    lat_media = np.bincount(inverso, weights=latitudes) / pesos
+    lon_media = np.bincount(inverso, weights=longitudes) / pesos
+    return np.column_stack([lat_media.round(CASAS_DECIMAIS), lon_media.round(CASAS_DECIMAIS), pesos])
+
+
+def camadas_densidade(latitudes, longitudes, niveis=NIVEIS_DENSIDADE):
+    """Pontos pré-agregados para cada faixa de zoom: lista de (zoom_min, zoom_max, pontos)"""
+    return [(zoom_min, zoom_max, binar_pontos(latitudes, longitudes, celula)) for zoom_min, zoom_max, celula in niveis]
+
+
+class CamadasPorZoom(MacroElement):
+    """Mostra no mapa apenas a camada da faixa de zoom atual (as demais ficam fora do mapa)"""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var mapa = {{ this._parent.get_name() }};
+            var niveis = [
+                {%- for camada, zoom_min, zoom_max in this.niveis %}
+                [{{ camada.get_name() }}, {{ zoom_min }}, {{ zoom_max }}],
+                {%- endfor %}
+            ];
+            function atualizar() {
+                var zoom = mapa.getZoom();
+                niveis.forEach(function(nivel) {
+                    var visivel = zoom >= nivel[1] && zoom <= nivel[2];
+                    if (visivel && !mapa.hasLayer(nivel[0])) { mapa.addLayer(nivel[0]); }
+                    if (!visivel && mapa.hasLayer(nivel[0])) { mapa.removeLayer(nivel[0]); }
+                });
+            }
+            mapa.on("zoomend", atualizar);
+            atualizar();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, niveis):
+        super().__init__()
+        self._name = "CamadasPorZoom"
+        self.niveis = niveis
+
+
+def adicionar_densidade(mapa, camadas, **opcoes_heatmap):
+    """Adiciona um HeatMap ponderado por faixa de zoom a partir de ``camadas_densidade``"""
+    niveis = []
+    for zoom_min, zoom_max, pontos in camadas:
+        if len(pontos) == 0:
+            continue
+        camada = HeatMap(pontos.tolist(), control=False, **opcoes_heatmap)
+        camada.add_to(mapa)
+        niveis.append((camada, zoom_min, zoom_max))
+    if niveis:
+        CamadasPorZoom(niveis).add_to(mapa)
+
+
+# Marcador de oficina criado no navegador a partir de [lat, lon, rótulo, cor]
+_CALLBACK_OFICINA = """
+function (linha) {
+    var icone = L.AwesomeMarkers.icon({icon: "wrench", prefix: "fa", markerColor: linha[3]});
+    return L.marker(new L.LatLng(linha[0], linha[1]), {icon: icone}).bindPopup(linha[2]);
+}
+"""
+
+
+def adicionar_oficinas_agrupadas(mapa, oficinas_df, rotulo, cores):
+    """Adiciona oficinas como um FastMarkerCluster: só os dados vão no HTML, os
+    marcadores são criados e agrupados no navegador"""
+    if oficinas_df.empty:
+        return
+    dados = [
+        [round(float(lat), CASAS_DECIMAIS), round(float(lon), CASAS_DECIMAIS), f"{rotulo}: {nome}", cor]
+        for lat, lon, nome, cor in zip(oficinas_df["latitude"], oficinas_df["longitude"], oficinas_df["nome_oficina"], cores)
+    ]
+    FastMarkerCluster(dados, callback=_CALLBACK_OFICINA, control=False).add_to(mapa)
@@ -0,0 +1,106 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Segmentos aparecem como "Meoo, GF" na coluna segmento e como "Meoo_GF" no nome das oficinas
+SEPARADOR_ITENS = re.compile(r"\s*[,_]\s*")
+
+# Um bit por valor em um int64
+MAXIMO_ITENS = 63
+
+
+def separar_itens(texto):
+    """Itens de um texto com separadores vírgula ou sublinhado ("Meoo, GF" -> ["Meoo", "GF"])"""
+    return [item for item in SEPARADOR_ITENS.split(texto) if item]
+
+
+def itens_listas(serie):
+    """Itens de uma coluna de listas (do Arrow ou Python) achatados: ``(linhas, itens)``, sem listas por linha"""
+    listas = pa.array(serie, type=pa.list_(pa.string()))
+    if isinstance(listas, pa.ChunkedArray):
+        listas = listas.combine_chunks()
+    return pc.list_parent_indices(listas).to_numpy(), pc.list_flatten(listas).to_numpy(zero_copy_only=False)
+
+
+class CodificadorBits:
+    """Vocabulário fixo em que cada valor ocupa um bit de uma máscara int64.
+
+    Conjuntos de valores (segmentos atendidos, serviços realizados) viram uma
+    máscara por linha, e filtros/compatibilidade passam a ser um AND bit a bit
+    vetorizado em vez de separar e comparar textos linha a linha.
+    """
+
+    def __init__(self, valores):
+        self.valores = tuple(sorted(set(valores)))
+        if len(self.valores) > MAXIMO_ITENS:
+            raise ValueError(f"Vocabulário com {len(self.valores)} valores excede o limite de {MAXIMO_ITENS} bits")
+        self._bit = {valor: np.int64(1) << np.int64(i) for i, valor in enumerate(self.valores)}
+
+    def mascara(self, valores):
+        """Máscara com os bits dos valores informados (valores fora do vocabulário são ignorados)"""
+        mascara = np.int64(0)
+        for valor in valores:
+            mascara |= self._bit.get(valor, np.int64(0))
+        return mascara
+
+    def codificar(self, serie, separar=None):
+        """Máscara por linha, calculada uma vez por valor distinto da Series.
+
+        Cada elemento pode ser um valor único, uma lista de valores ou, com
+        ``separar``, um texto a ser dividido em valores.
+        """
+        codigos, unicos = pd.factorize(serie)
+        mascaras = []
+        for valor in unicos:
+            if separar is not None:
+                valor = separar(valor)
+            elif isinstance(valor, str):
+                valor = [valor]
+            mascaras.append(self.mascara(valor))
+        mascaras.append(np.int64(0))  # código -1 (ausente) -> máscara vazia
+        return np.asarray(mascaras, dtype=np.int64)[codigos]
+
+    def codificar_listas(self, serie):
+        """Máscara por linha de uma coluna de listas de valores (ver ``itens_listas``)"""
+        linhas, itens = itens_listas(serie)
+        codigos, unicos = pd.factorize(itens)
+        bits = np.asarray([self._bit.get(valor, np.int64(0)) for valor in unicos] + [np.int64(0)], dtype=np.int64)
+        mascaras = np.zeros(len(serie), dtype=np.int64)
+        np.bitwise_or.at(mascaras, linhas, bits[codigos])
+        return mascaras
+
+    def decodificar(self, mascara):
+        """Valores presentes em uma máscara"""
+        return [valor for valor, bit in self._bit.items() if mascara & bit]
+
+
+def codificadores_dados(clientes_df, oficinas_df):
+    """Codificadores de segmento e de serviço com o vocabulário de clientes e oficinas"""
+    segmentos = set(clientes_df["segmento"].unique())
+    for texto in oficinas_df["segmento"].unique():
+        segmentos.update(separar_itens(texto))
+
+    servicos = set(clientes_df["tipo_servico_demandado"].unique())
+    if "servicos_realizados" in oficinas_df:
+        servicos.update(itens_listas(oficinas_df["servicos_realizados"])[1])
+
+    return {"segmento": CodificadorBits(segmentos), "servico": CodificadorBits(servicos)}
+
+
+def adicionar_mascaras(clientes_df, oficinas_df, codificadores):
+    """Adiciona as colunas de máscara de segmento e de serviço a clientes e oficinas"""
+    segmento, servico = codificadores["segmento"], codificadores["servico"]
+    clientes_df["mascara_segmento"] = segmento.codificar(clientes_df["segmento"])
+    clientes_df["mascara_servico"] = servico.codificar(clientes_df["tipo_servico_demandado"])
+    oficinas_df["mascara_segmento"] = segmento.codificar(oficinas_df["segmento"], separar=separar_itens)
+    if "servicos_realizados" in oficinas_df:
+        oficinas_df["mascara_servicos"] = servico.codificar_listas(oficinas_df["servicos_realizados"])
+    return clientes_df, oficinas_df
+
+
+def filtrar_mascara(mascaras, selecao):
+    """Máscara booleana das linhas com algum bit em comum com ``selecao``"""
+    return (np.asarray(mascaras, dtype=np.int64) & np.int64(selecao)) != 0
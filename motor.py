@@ -0,0 +1,550 @@
+"""Motor de simulação sem interface: filtros, raio, atribuição e agregação.
+
+As funções recebem DataFrames/arrays e parâmetros simples e devolvem
+posições ou DataFrames, sem estado global nem widgets; o app Streamlit e o
+``simulador_cli.py`` usam as mesmas funções. ``simular`` avalia um
+``Cenario`` completo sobre uma ``BaseSimulacao`` carregada uma vez.
+"""
+
+import os
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+
+from agregacao import (
+    ATENDIMENTO_CONCORRENTES,
+    ATENDIMENTO_NENHUM,
+    ATENDIMENTO_PRINCIPAIS,
+    ATENDIMENTOS,
+    classificar_atendimento,
+    construir_cubo,
+)
+from armazenamento import carregar_tabela
+from atribuicao import MatrizCapacidades, atribuir_oficina_mais_proxima, construir_matriz_capacidades, participacao_huff
+from classificacao import adicionar_classificacao
+from demanda import adicionar_demanda
+from distancias import distancia_km
+from indice_espacial import IndiceGrade
+from mascaras import adicionar_mascaras, codificadores_dados, filtrar_mascara
+from rede_viaria import (
+    DIRETORIO_CACHE,
+    RedeViaria,
+    adicionar_ancoras,
+    atribuir_oficina_mais_rapida,
+    carregar_grafo,
+    no_tempo_de_oficinas,
+)
+
+ARQUIVO_CLIENTES = "clientes_com_segmento.csv"
+ARQUIVO_OFICINAS = "oficinas_com_segmento.csv"
+# Grafo da rede viária opcional (ver rede_viaria.py), procurado ao lado dos dados
+ARQUIVO_GRAFO = "rede_viaria.npz"
+
+# Método usado nos filtros de raio ("haversine" ou "elipsoidal", ver distancias.py)
+METODO_DISTANCIA = "elipsoidal"
+
+# Limite do raio de busca; a etapa de distâncias do app já guarda tudo até ele
+RAIO_MAXIMO_KM = 20.0
+RAIO_PADRAO_KM = 5.0
+
+# Colunas de clientes e oficinas levadas para os resultados
+COLUNAS_CLIENTES = [
+    "segmento", "zona", "bairro", "latitude", "longitude", "tipo_servico_demandado", "categoria_servico", "servico_nivel2",
+    "frequencia_demanda", "valor_estimado_servico", "receita_anual",
+]
+COLUNAS_OFICINAS = ["nome_oficina", "segmento", "zona", "bairro", "latitude", "longitude", "categoria_servico", "servico_nivel2"]
+
+# Modelos de atribuição: oficina compatível mais próxima (100% do cliente) ou
+# participação de Huff (demanda dividida por atratividade / distância^beta)
+MODELO_MAIS_PROXIMA = "mais_proxima"
+MODELO_HUFF = "huff"
+MODELOS = (MODELO_MAIS_PROXIMA, MODELO_HUFF)
+BETA_PADRAO = 2.0
+RAIO_TRUNCAMENTO_PADRAO_KM = 10.0
+# Coluna opcional do cadastro de oficinas com a atratividade do modelo de Huff (1 quando ausente)
+COLUNA_ATRATIVIDADE = "atratividade"
+
+PAPEL_PRINCIPAL = "Principal"
+PAPEL_CONCORRENTE = "Concorrente"
+
+
+def carregar_dados(diretorio, arquivo_clientes=ARQUIVO_CLIENTES, arquivo_oficinas=ARQUIVO_OFICINAS):
+    """Clientes e oficinas com classificação de serviço e máscaras de bits, e os codificadores usados"""
+    clientes_df = carregar_tabela(os.path.join(diretorio, arquivo_clientes))
+    oficinas_df = carregar_tabela(os.path.join(diretorio, arquivo_oficinas))
+
+    # Categoria de serviço e serviço nível 2 classificados uma vez por valor distinto,
+    # a partir do nome da oficina e do serviço demandado pelo cliente
+    adicionar_classificacao(oficinas_df, "nome_oficina")
+    adicionar_classificacao(clientes_df, "tipo_servico_demandado")
+
+    # Segmentos e serviços como máscaras de bits para filtros e compatibilidade vetorizados
+    codificadores = codificadores_dados(clientes_df, oficinas_df)
+    adicionar_mascaras(clientes_df, oficinas_df, codificadores)
+
+    # Visitas por ano e receita anual esperada por cliente (ver demanda.py), usadas no resumo e nos totais
+    faltando = [coluna for coluna in ("frequencia_demanda", "valor_estimado_servico") if coluna not in clientes_df]
+    if faltando:
+        raise ValueError(f"Colunas de demanda ausentes em {arquivo_clientes}: {', '.join(faltando)}")
+    adicionar_demanda(clientes_df)
+    return clientes_df, oficinas_df, codificadores
+
+
+def construir_indices(clientes_df, oficinas_df, metodo=METODO_DISTANCIA):
+    """Índices espaciais de clientes (células de 1 km) e de oficinas (células de 2 km)"""
+    indice_clientes = IndiceGrade(clientes_df["latitude"], clientes_df["longitude"], tamanho_celula_km=1.0, metodo=metodo)
+    indice_oficinas = IndiceGrade(oficinas_df["latitude"], oficinas_df["longitude"], tamanho_celula_km=2.0, metodo=metodo)
+    return indice_clientes, indice_oficinas
+
+
+@dataclass(frozen=True)
+class BaseSimulacao:
+    """Dados, índices e matriz de capacidades compartilhados por todos os cenários"""
+
+    clientes: pd.DataFrame
+    oficinas: pd.DataFrame
+    codificadores: dict
+    indice_clientes: IndiceGrade
+    indice_oficinas: IndiceGrade
+    capacidades: MatrizCapacidades
+    metodo: str = METODO_DISTANCIA
+    rede: RedeViaria = None
+    tempos_oficinas: object = None
+
+
+def carregar_rede(arquivo_grafo, clientes_df, oficinas_df, diretorio_cache=None):
+    """Rede viária com clientes e oficinas ancorados nos nós e os tempos até as oficinas (em cache no disco)"""
+    if diretorio_cache is None:
+        diretorio_cache = os.path.join(os.path.dirname(os.path.abspath(arquivo_grafo)), DIRETORIO_CACHE)
+    rede = RedeViaria(carregar_grafo(arquivo_grafo), diretorio_cache)
+    adicionar_ancoras(clientes_df, rede)
+    adicionar_ancoras(oficinas_df, rede)
+    return rede, rede.tempos_oficinas(oficinas_df)
+
+
+def carregar_base(diretorio, metodo=METODO_DISTANCIA, arquivo_clientes=ARQUIVO_CLIENTES, arquivo_oficinas=ARQUIVO_OFICINAS,
+                  arquivo_grafo=None, diretorio_cache=None):
+    """Carrega os dados e monta índices e capacidades uma única vez (e a rede viária, com ``arquivo_grafo``)"""
+    clientes_df, oficinas_df, codificadores = carregar_dados(diretorio, arquivo_clientes, arquivo_oficinas)
+    indice_clientes, indice_oficinas = construir_indices(clientes_df, oficinas_df, metodo)
+    rede = tempos_oficinas = None
+    if arquivo_grafo is not None:
+        rede, tempos_oficinas = carregar_rede(arquivo_grafo, clientes_df, oficinas_df, diretorio_cache)
+    return BaseSimulacao(
+        clientes=clientes_df,
+        oficinas=oficinas_df,
+        codificadores=codificadores,
+        indice_clientes=indice_clientes,
+        indice_oficinas=indice_oficinas,
+        capacidades=construir_matriz_capacidades(oficinas_df),
+        metodo=metodo,
+        rede=rede,
+        tempos_oficinas=tempos_oficinas,
+    )
+
+
+def congelar_base(base):
+    """Marca como somente leitura os arrays NumPy dos índices, das capacidades e da rede da base.
+
+    Para a base compartilhada entre sessões do app: uma escrita acidental
+    nesses arrays vira erro em vez de alterar os dados de todas as sessões.
+    Os DataFrames ficam protegidos pelo copy-on-write do pandas (sempre ativo
+    a partir do pandas 3, o mínimo em requirements.txt): seleções e colunas
+    novas em objetos derivados de ``base.clientes``/``base.oficinas`` não
+    alteram a base, desde que ninguém atribua colunas nela própria.
+    """
+    estruturas = [base.indice_clientes, base.indice_oficinas, base.capacidades, base.tempos_oficinas]
+    if base.rede is not None:
+        estruturas += [base.rede.grafo, base.rede.indice]
+    for estrutura in estruturas:
+        for valor in vars(estrutura).values() if estrutura is not None else ():
+            if isinstance(valor, np.ndarray):
+                valor.flags.writeable = False
+    return base
+
+
+# Filtros: cada etapa recebe e devolve posições (iloc) de clientes e oficinas
+
+def filtrar_segmento_zona(clientes_df, oficinas_df, codificadores, segmentos=(), zonas=()):
+    """Posições de clientes e oficinas após os filtros de segmento e zona, e os bairros disponíveis"""
+    mascara_clientes = np.ones(len(clientes_df), dtype=bool)
+    mascara_oficinas = np.ones(len(oficinas_df), dtype=bool)
+
+    # Filtro por segmento (AND entre a máscara da linha e a máscara dos segmentos selecionados)
+    if segmentos:
+        selecao = codificadores["segmento"].mascara(segmentos)
+        mascara_clientes &= filtrar_mascara(clientes_df["mascara_segmento"], selecao)
+        mascara_oficinas &= filtrar_mascara(oficinas_df["mascara_segmento"], selecao)
+
+    if zonas:
+        mascara_clientes &= clientes_df["zona"].isin(zonas).to_numpy()
+        mascara_oficinas &= oficinas_df["zona"].isin(zonas).to_numpy()
+
+    bairros_disponiveis = sorted(clientes_df["bairro"][mascara_clientes].unique().tolist())
+    return np.flatnonzero(mascara_clientes), np.flatnonzero(mascara_oficinas), bairros_disponiveis
+
+
+def filtrar_bairros(clientes_df, oficinas_df, posicoes_clientes, posicoes_oficinas, bairros=()):
+    if bairros:
+        posicoes_clientes = posicoes_clientes[clientes_df["bairro"].iloc[posicoes_clientes].isin(bairros).to_numpy()]
+        posicoes_oficinas = posicoes_oficinas[oficinas_df["bairro"].iloc[posicoes_oficinas].isin(bairros).to_numpy()]
+    return posicoes_clientes, posicoes_oficinas
+
+
+def filtrar_servicos(clientes_df, oficinas_df, posicoes_clientes, posicoes_oficinas, categorias=(), servicos_nivel2=()):
+    if categorias:
+        posicoes_clientes = posicoes_clientes[clientes_df["nivel_1_servico"].iloc[posicoes_clientes].isin(categorias).to_numpy()]
+        posicoes_oficinas = posicoes_oficinas[oficinas_df["categoria_servico"].iloc[posicoes_oficinas].isin(categorias).to_numpy()]
+    if servicos_nivel2:
+        posicoes_clientes = posicoes_clientes[clientes_df["nivel_2_servico"].iloc[posicoes_clientes].isin(servicos_nivel2).to_numpy()]
+        posicoes_oficinas = posicoes_oficinas[oficinas_df["servico_nivel2"].iloc[posicoes_oficinas].isin(servicos_nivel2).to_numpy()]
+    return posicoes_clientes, posicoes_oficinas
+
+
+def filtrar(clientes_df, oficinas_df, codificadores, segmentos=(), zonas=(), bairros=(), categorias=(), servicos_nivel2=()):
+    """Todas as etapas de filtro em sequência: posições de clientes e oficinas"""
+    posicoes_clientes, posicoes_oficinas, _ = filtrar_segmento_zona(clientes_df, oficinas_df, codificadores, segmentos, zonas)
+    posicoes_clientes, posicoes_oficinas = filtrar_bairros(clientes_df, oficinas_df, posicoes_clientes, posicoes_oficinas, bairros)
+    return filtrar_servicos(clientes_df, oficinas_df, posicoes_clientes, posicoes_oficinas, categorias, servicos_nivel2)
+
+
+# Raio
+
+def centroide(oficinas_df):
+    """Centro (média de latitude e longitude) de um conjunto de oficinas"""
+    return oficinas_df["latitude"].mean(), oficinas_df["longitude"].mean()
+
+
+def distancias_ordenadas(indice, posicoes_filtradas, centro, raio_km=RAIO_MAXIMO_KM):
+    """Posições filtradas a até ``raio_km`` do centro, ordenadas por distância, e as distâncias"""
+    candidatos, distancias = indice.no_raio(centro[0], centro[1], raio_km)
+    manter = np.isin(candidatos, posicoes_filtradas)
+    ordem = np.argsort(distancias[manter], kind="stable")
+    return candidatos[manter][ordem], distancias[manter][ordem]
+
+
+def tempos_ordenados(rede, df, posicoes_filtradas, centro, limite_minutos):
+    """Como ``distancias_ordenadas``, em minutos pela rede viária (requer as colunas de ``adicionar_ancoras``)"""
+    tempos_nos = rede.tempos_ate_ponto(centro[0], centro[1])
+    posicoes_filtradas = np.asarray(posicoes_filtradas, dtype=np.int64)
+    minutos = (
+        tempos_nos[df["no_rede"].to_numpy()[posicoes_filtradas]].astype(np.float64)
+        + df["acesso_rede_min"].to_numpy(dtype=np.float64)[posicoes_filtradas]
+    )
+    manter = minutos <= limite_minutos
+    ordem = np.argsort(minutos[manter], kind="stable")
+    return posicoes_filtradas[manter][ordem], minutos[manter][ordem]
+
+
+def posicoes_no_raio(posicoes_ordenadas, distancias_ordenadas, raio):
+    """Posições a até ``raio`` km (na ordem original dos dados) por busca binária nas distâncias ordenadas"""
+    return np.sort(posicoes_ordenadas[:np.searchsorted(distancias_ordenadas, raio, side="right")])
+
+
+# Atribuição
+
+def atribuir_clientes(clientes_df, capacidades, ids_principais, ids_concorrentes, metodo=METODO_DISTANCIA, pesos=None,
+                      tempos_oficinas=None):
+    """Oficina compatível mais próxima entre principais e concorrentes ativos.
+
+    Retorna ``(ids_oficina, distancia_km, atendimento, totais)``: o id (índice
+    do cadastro) da oficina atribuída, -1 quando nenhuma é compatível, a
+    distância até ela, o rótulo de atendimento (Principais/Concorrentes/Nenhuma)
+    e, com ``pesos``, a Series com o total atribuído a cada oficina candidata
+    (índice = id), somado na mesma passada da atribuição (``None`` sem
+    ``pesos``). Com
+    ``tempos_oficinas`` (rede viária) a oficina escolhida é a de menor tempo
+    de viagem e a distância vem em minutos.
+    """
+    ids_principais = list(ids_principais)
+    ids_concorrentes = list(ids_concorrentes)
+    # Oficinas candidatas: principais primeiro, depois os concorrentes ativos (empates ficam com as principais)
+    candidatas = capacidades.linhas(capacidades.posicoes(ids_principais + ids_concorrentes))
+    if tempos_oficinas is not None:
+        resultado = atribuir_oficina_mais_rapida(
+            clientes_df, clientes_df["categoria_servico"], clientes_df["servico_nivel2"], candidatas, tempos_oficinas, pesos=pesos
+        )
+    else:
+        resultado = atribuir_oficina_mais_proxima(
+            clientes_df,
+            clientes_df["categoria_servico"],
+            clientes_df["servico_nivel2"],
+            candidatas,
+            metodo=metodo,
+            pesos=pesos,
+        )
+    posicao, distancia, totais = resultado
+    ids_oficina = np.where(posicao >= 0, candidatas.ids[posicao], -1)
+    atendimento = classificar_atendimento(ids_oficina, ids_principais, ids_concorrentes)
+    if totais is not None:
+        totais = pd.Series(totais, index=candidatas.ids)
+    return ids_oficina, distancia, atendimento, totais
+
+
+def atratividade_oficinas(oficinas_df, atratividade=()):
+    """Atratividade de cada oficina (índice = id) para o modelo de Huff.
+
+    Vem da coluna ``COLUNA_ATRATIVIDADE`` do cadastro, quando existe (1 nas
+    oficinas sem valor e em todas sem a coluna); ``atratividade`` (pares ou
+    dicionário nome da oficina -> valor) substitui o valor das oficinas citadas.
+    """
+    if COLUNA_ATRATIVIDADE in oficinas_df:
+        valores = oficinas_df[COLUNA_ATRATIVIDADE].astype(np.float64).fillna(1.0)
+    else:
+        valores = pd.Series(1.0, index=oficinas_df.index)
+    valores = valores.rename(COLUNA_ATRATIVIDADE)
+    for nome, valor in dict(atratividade).items():
+        selecao = (oficinas_df["nome_oficina"] == nome).to_numpy()
+        if not selecao.any():
+            raise ValueError(f"Atratividade de oficina fora do cadastro: {nome!r}")
+        valores[selecao] = float(valor)
+    if not (valores > 0).all():
+        raise ValueError("A atratividade das oficinas precisa ser positiva")
+    return valores
+
+
+def participacao_clientes(clientes_df, capacidades, ids_principais, ids_concorrentes, beta=BETA_PADRAO,
+                          raio_truncamento_km=RAIO_TRUNCAMENTO_PADRAO_KM, metodo=METODO_DISTANCIA, pesos=None,
+                          atratividade=None):
+    """Participação de Huff entre principais e concorrentes ativos.
+
+    Retorna ``(parcela_principais, parcela_concorrentes, clientes_por_oficina,
+    pesos_por_oficina)``: a fração da demanda de cada cliente que fica com as
+    principais e com os concorrentes (o restante não tem oficina no raio de
+    truncamento) e os totais esperados por oficina candidata (índice = id),
+    em clientes e em ``pesos`` (1 por cliente quando omitido). ``atratividade``
+    é uma Series por id de oficina (ver ``atratividade_oficinas``); sem ela
+    todas as oficinas valem 1.
+    """
+    ids_principais = list(ids_principais)
+    candidatas = capacidades.linhas(capacidades.posicoes(ids_principais + list(ids_concorrentes)))
+    linhas, colunas, participacoes = participacao_huff(
+        clientes_df,
+        clientes_df["categoria_servico"],
+        clientes_df["servico_nivel2"],
+        candidatas,
+        beta=beta,
+        raio_truncamento_km=raio_truncamento_km,
+        atratividade=None if atratividade is None else atratividade.reindex(candidatas.ids, fill_value=1.0).to_numpy(),
+        metodo=metodo,
+    )
+    n = len(clientes_df)
+    pesos = np.ones(n) if pesos is None else np.asarray(pesos, dtype=np.float64)
+    e_principal = colunas < len(ids_principais)
+    parcela_principais = np.bincount(linhas, weights=participacoes * e_principal, minlength=n)
+    parcela_concorrentes = np.bincount(linhas, weights=participacoes * ~e_principal, minlength=n)
+    clientes_por_oficina = np.bincount(colunas, weights=participacoes, minlength=len(candidatas))
+    pesos_por_oficina = np.bincount(colunas, weights=participacoes * pesos[linhas], minlength=len(candidatas))
+    return (
+        parcela_principais,
+        parcela_concorrentes,
+        pd.Series(clientes_por_oficina, index=candidatas.ids),
+        pd.Series(pesos_por_oficina, index=candidatas.ids),
+    )
+
+
+def cubo_participacao(clientes_df, parcela_principais, parcela_concorrentes, no_raio_concorrente=None):
+    """Cubo com os clientes esperados por atendimento: cada cliente entra uma vez por
+    atendimento, com a sua parcela como peso"""
+    n = len(clientes_df)
+    parcela_nenhuma = np.clip(1.0 - parcela_principais - parcela_concorrentes, 0.0, 1.0)
+    if no_raio_concorrente is None:
+        no_raio_concorrente = np.zeros(n, dtype=bool)
+    return construir_cubo(
+        clientes_df.iloc[np.tile(np.arange(n), len(ATENDIMENTOS))],
+        pd.Categorical(np.repeat(ATENDIMENTOS, n), categories=ATENDIMENTOS),
+        np.tile(no_raio_concorrente, len(ATENDIMENTOS)),
+        pesos=np.concatenate([parcela_principais, parcela_concorrentes, parcela_nenhuma]),
+    )
+
+
+def no_raio_de_concorrentes(clientes_df, concorrentes_df, raio_km, metodo=METODO_DISTANCIA, tamanho_bloco=16384):
+    """Máscara dos clientes a até ``raio_km`` de algum concorrente (matriz cliente x concorrente por bloco)"""
+    no_raio = np.zeros(len(clientes_df), dtype=bool)
+    if no_raio.size == 0 or concorrentes_df.empty:
+        return no_raio
+    latitudes = clientes_df["latitude"].to_numpy()
+    longitudes = clientes_df["longitude"].to_numpy()
+    lat_concorrentes = concorrentes_df["latitude"].to_numpy()[None, :]
+    lon_concorrentes = concorrentes_df["longitude"].to_numpy()[None, :]
+    for inicio in range(0, len(no_raio), tamanho_bloco):
+        bloco = slice(inicio, inicio + tamanho_bloco)
+        distancias = distancia_km(latitudes[bloco, None], longitudes[bloco, None], lat_concorrentes, lon_concorrentes, metodo)
+        no_raio[bloco] = (distancias <= raio_km).any(axis=1)
+    return no_raio
+
+
+# Cenários
+
+@dataclass(frozen=True)
+class Cenario:
+    """Parâmetros de uma simulação (os mesmos controles da barra lateral do app).
+
+    Seleções vazias não filtram. ``concorrentes`` lista os nomes dos
+    concorrentes ativos; ``None`` considera ativos todos os concorrentes no raio.
+    ``modelo`` escolhe a atribuição (um de ``MODELOS``); ``beta``,
+    ``raio_truncamento_km`` e ``atratividade`` (pares nome da oficina ->
+    atratividade, sobre a coluna do cadastro; ver ``atratividade_oficinas``)
+    só valem para o modelo de Huff. Com
+    ``raio_minutos`` o raio, o raio dos concorrentes e a atribuição usam o
+    tempo de viagem pela rede viária da base (só no modelo mais próxima) e
+    ``raio_km`` é ignorado.
+    """
+
+    nome: str
+    oficinas_principais: tuple
+    raio_km: float = RAIO_PADRAO_KM
+    segmentos: tuple = ()
+    zonas: tuple = ()
+    bairros: tuple = ()
+    categorias: tuple = ()
+    servicos_nivel2: tuple = ()
+    concorrentes: tuple = None
+    modelo: str = MODELO_MAIS_PROXIMA
+    beta: float = BETA_PADRAO
+    raio_truncamento_km: float = RAIO_TRUNCAMENTO_PADRAO_KM
+    atratividade: tuple = ()
+    raio_minutos: float = None
+
+    def __post_init__(self):
+        if self.modelo not in MODELOS:
+            raise ValueError(f"Modelo de atribuição {self.modelo!r} inválido: use {', '.join(MODELOS)}")
+        if self.raio_minutos is not None and self.modelo != MODELO_MAIS_PROXIMA:
+            raise ValueError("raio_minutos (rede viária) só vale para o modelo mais_proxima")
+
+    @property
+    def filtros(self):
+        return (self.segmentos, self.zonas, self.bairros, self.categorias, self.servicos_nivel2)
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Cria um cenário a partir de um dicionário (JSON/YAML); listas viram tuplas e a
+        ``atratividade`` (objeto nome -> valor) vira pares ordenados"""
+        campos = {campo.name for campo in fields(cls)}
+        desconhecidos = set(dados) - campos
+        if desconhecidos:
+            raise ValueError(f"Campos desconhecidos no cenário: {', '.join(sorted(desconhecidos))}")
+        valores = {}
+        for chave, valor in dados.items():
+            if chave == "atratividade" and isinstance(valor, dict):
+                valor = tuple(sorted((nome, float(atratividade)) for nome, atratividade in valor.items()))
+            elif isinstance(valor, str) and chave not in ("nome", "modelo"):
+                valor = (valor,)
+            elif isinstance(valor, (list, tuple)):
+                valor = tuple(valor)
+            valores[chave] = valor
+        for chave in ("raio_km", "beta", "raio_truncamento_km", "raio_minutos"):
+            if valores.get(chave) is not None:
+                valores[chave] = float(valores[chave])
+        return cls(**valores)
+
+
+@dataclass(frozen=True)
+class ResultadoCenario:
+    """Resultado de ``simular``: resumo com as métricas e as tabelas de clientes, oficinas e cubo"""
+
+    cenario: Cenario
+    resumo: dict
+    clientes: pd.DataFrame
+    oficinas: pd.DataFrame
+    cubo: pd.DataFrame
+
+
+def simular(base, cenario):
+    """Avalia um cenário: filtros, raio ao redor do centroide das principais, atribuição e cubo"""
+    clientes_df, oficinas_df = base.clientes, base.oficinas
+    posicoes_clientes, posicoes_oficinas = filtrar(clientes_df, oficinas_df, base.codificadores, *cenario.filtros)
+
+    principais_df = oficinas_df[oficinas_df["nome_oficina"].isin(cenario.oficinas_principais)]
+    if principais_df.empty:
+        raise ValueError(f"Cenário {cenario.nome!r}: nenhuma oficina principal encontrada no cadastro")
+
+    centro = centroide(principais_df)
+    por_tempo = cenario.raio_minutos is not None
+    if por_tempo:
+        if base.rede is None:
+            raise ValueError(f"Cenário {cenario.nome!r}: raio_minutos requer a rede viária (carregar_base com arquivo_grafo)")
+        raio = cenario.raio_minutos
+        posicoes_clientes_raio = posicoes_no_raio(*tempos_ordenados(base.rede, clientes_df, posicoes_clientes, centro, raio), raio)
+        posicoes_oficinas_raio = posicoes_no_raio(*tempos_ordenados(base.rede, oficinas_df, posicoes_oficinas, centro, raio), raio)
+    else:
+        posicoes_clientes_raio = posicoes_no_raio(*distancias_ordenadas(base.indice_clientes, posicoes_clientes, centro, cenario.raio_km), cenario.raio_km)
+        posicoes_oficinas_raio = posicoes_no_raio(*distancias_ordenadas(base.indice_oficinas, posicoes_oficinas, centro, cenario.raio_km), cenario.raio_km)
+
+    clientes_no_raio = clientes_df.iloc[posicoes_clientes_raio]
+    concorrentes_no_raio = oficinas_df.iloc[posicoes_oficinas_raio]
+    concorrentes_no_raio = concorrentes_no_raio[~concorrentes_no_raio["nome_oficina"].isin(cenario.oficinas_principais)]
+    if cenario.concorrentes is None:
+        concorrentes_ativos = concorrentes_no_raio
+    else:
+        concorrentes_ativos = concorrentes_no_raio[concorrentes_no_raio["nome_oficina"].isin(cenario.concorrentes)]
+
+    # Receita anual esperada somada por oficina na própria atribuição
+    receita = clientes_no_raio["receita_anual"].to_numpy(dtype=np.float64)
+    if por_tempo:
+        no_raio_concorrente = no_tempo_de_oficinas(clientes_no_raio, concorrentes_ativos.index, base.tempos_oficinas, cenario.raio_minutos)
+    else:
+        no_raio_concorrente = no_raio_de_concorrentes(clientes_no_raio, concorrentes_ativos, cenario.raio_km, base.metodo)
+    clientes = clientes_no_raio[[c for c in COLUNAS_CLIENTES if c in clientes_no_raio]].copy()
+
+    if cenario.modelo == MODELO_HUFF:
+        parcela_principais, parcela_concorrentes, clientes_por_oficina, receita_por_oficina = participacao_clientes(
+            clientes_no_raio, base.capacidades, principais_df.index, concorrentes_ativos.index,
+            cenario.beta, cenario.raio_truncamento_km, base.metodo, pesos=receita,
+            atratividade=atratividade_oficinas(oficinas_df, cenario.atratividade),
+        )
+        clientes["parcela_principais"] = parcela_principais
+        clientes["parcela_concorrentes"] = parcela_concorrentes
+        cubo = cubo_participacao(clientes_no_raio, parcela_principais, parcela_concorrentes, no_raio_concorrente)
+        contar = float
+    else:
+        ids_oficina, distancia, atendimento, receita_por_oficina = atribuir_clientes(
+            clientes_no_raio, base.capacidades, principais_df.index, concorrentes_ativos.index, base.metodo, pesos=receita,
+            tempos_oficinas=base.tempos_oficinas if por_tempo else None,
+        )
+        clientes["oficina_mais_proxima"] = ids_oficina
+        clientes["nome_oficina_mais_proxima"] = oficinas_df["nome_oficina"].reindex(ids_oficina).fillna(ATENDIMENTO_NENHUM).to_numpy()
+        clientes["tempo_oficina_mais_proxima_min" if por_tempo else "distancia_oficina_mais_proxima"] = distancia
+        clientes["atendimento"] = atendimento
+        parcela_principais = np.asarray(atendimento == ATENDIMENTO_PRINCIPAIS, dtype=np.float64)
+        parcela_concorrentes = np.asarray(atendimento == ATENDIMENTO_CONCORRENTES, dtype=np.float64)
+        clientes_por_oficina = pd.Series(ids_oficina[ids_oficina >= 0]).value_counts()
+        cubo = construir_cubo(clientes_no_raio, atendimento, no_raio_concorrente)
+        contar = int
+    clientes["no_raio_concorrente"] = no_raio_concorrente
+
+    oficinas = pd.concat([principais_df, concorrentes_no_raio])
+    oficinas = oficinas[[c for c in COLUNAS_OFICINAS if c in oficinas]].copy()
+    oficinas["papel"] = [PAPEL_PRINCIPAL] * len(principais_df) + [PAPEL_CONCORRENTE] * len(concorrentes_no_raio)
+    oficinas["ativa"] = oficinas.index.isin(principais_df.index) | oficinas.index.isin(concorrentes_ativos.index)
+    oficinas["clientes_atendidos"] = clientes_por_oficina.reindex(oficinas.index, fill_value=0).to_numpy()
+    oficinas["receita_capturada"] = receita_por_oficina.reindex(oficinas.index, fill_value=0.0).to_numpy()
+
+    clientes_principais = contar(parcela_principais.sum())
+    clientes_concorrentes = contar(parcela_concorrentes.sum())
+    resumo = {
+        "cenario": cenario.nome,
+        # Em cenários por tempo de viagem o raio em km não se aplica
+        "raio_km": float("nan") if por_tempo else cenario.raio_km,
+        "raio_minutos": cenario.raio_minutos,
+        "oficinas_principais": len(principais_df),
+        "centroide_lat": float(centro[0]),
+        "centroide_lon": float(centro[1]),
+        "clientes_filtro": len(posicoes_clientes),
+        "oficinas_filtro": len(posicoes_oficinas),
+        "clientes_raio": len(posicoes_clientes_raio),
+        "oficinas_raio": len(posicoes_oficinas_raio),
+        "concorrentes_raio": len(concorrentes_no_raio),
+        "concorrentes_ativos": len(concorrentes_ativos),
+        "modelo": cenario.modelo,
+        "clientes_principais": clientes_principais,
+        "clientes_concorrentes": clientes_concorrentes,
+        "clientes_sem_oficina": len(clientes) - clientes_principais - clientes_concorrentes,
+        "clientes_no_raio_concorrente": int(no_raio_concorrente.sum()),
+        "participacao_principais": clientes_principais / len(clientes) if len(clientes) else 0.0,
+        "receita_raio": float(receita.sum()),
+        "receita_principais": float(receita @ parcela_principais),
+        "receita_concorrentes": float(receita @ parcela_concorrentes),
+    }
+    return ResultadoCenario(cenario=cenario, resumo=resumo, clientes=clientes, oficinas=oficinas, cubo=cubo)
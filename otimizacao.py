@@ -0,0 +1,201 @@
+"""Seleção das k oficinas principais (ou novos locais) que maximizam a demanda capturada.
+
+Com os concorrentes fixos, a regra de atribuição do app (oficina compatível
+mais próxima, empates com as principais) diz que um cliente fica com as
+principais quando alguma delas é compatível e está a uma distância menor ou
+igual à do concorrente compatível mais próximo. Essa distância-limite é
+calculada uma vez por cliente; cada candidata passa a ser o conjunto de
+clientes que ela capturaria e o problema vira uma cobertura ponderada
+(submodular), resolvida pelo guloso preguiçoso: os ganhos ficam em um heap
+como limites superiores e só a candidata do topo é reavaliada, contra a
+máscara de clientes já capturados, que cada local escolhido atualiza em
+O(clientes).
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+import motor
+from atribuicao import atribuir_oficina_mais_proxima, construir_matriz_capacidades
+from classificacao import adicionar_classificacao
+from distancias import distancia_km
+from indice_espacial import IndiceGrade
+from mascaras import separar_itens
+
+OBJETIVOS = ("clientes", "valor_estimado_servico", "receita_anual")
+
+
+def pesos_objetivo(clientes_df, objetivo="clientes"):
+    """Peso de cada cliente na função objetivo (1 por cliente ou o valor de uma coluna)"""
+    if objetivo == "clientes":
+        return np.ones(len(clientes_df))
+    if objetivo not in clientes_df:
+        raise ValueError(f"Objetivo {objetivo!r} inválido: use {', '.join(OBJETIVOS)} ou uma coluna numérica de clientes")
+    return clientes_df[objetivo].to_numpy(dtype=np.float64, na_value=0.0)
+
+
+def preparar_candidatas(candidatas_df, codificadores):
+    """MatrizCapacidades de locais candidatos (``nome_oficina``, ``latitude``, ``longitude``, ``segmento``).
+
+    Categoria e serviço nível 2 vêm das colunas, quando informadas, ou são
+    classificados pelo nome, como no cadastro de oficinas.
+    """
+    candidatas_df = candidatas_df.reset_index(drop=True)
+    classificadas = adicionar_classificacao(candidatas_df[["nome_oficina"]].copy(), "nome_oficina")
+    for coluna in ("categoria_servico", "servico_nivel2"):
+        if coluna in candidatas_df:
+            candidatas_df[coluna] = candidatas_df[coluna].astype(object).fillna(classificadas[coluna].astype(object))
+        else:
+            candidatas_df[coluna] = classificadas[coluna]
+    candidatas_df["mascara_segmento"] = codificadores["segmento"].codificar(candidatas_df["segmento"].astype(str), separar=separar_itens)
+    return candidatas_df, construir_matriz_capacidades(candidatas_df.drop(columns=["mascara_servicos"], errors="ignore"))
+
+
+def limiar_concorrencia(clientes_df, concorrentes, metodo="haversine"):
+    """Distância de cada cliente ao concorrente compatível mais próximo (infinita quando não há)"""
+    if len(concorrentes) == 0:
+        return np.full(len(clientes_df), np.inf)
+    _, distancia, _ = atribuir_oficina_mais_proxima(
+        clientes_df, clientes_df["categoria_servico"], clientes_df["servico_nivel2"], concorrentes, metodo=metodo
+    )
+    return distancia
+
+
+def coberturas(clientes_df, candidatas, limiar, metodo="haversine", distancia_maxima_km=None):
+    """Posições dos clientes que cada candidata capturaria sozinha contra os concorrentes.
+
+    Só os clientes compatíveis (máscara de segmento e categoria ou nível 2)
+    têm a distância calculada; com ``distancia_maxima_km`` a busca usa um
+    índice em grade e clientes mais distantes não contam.
+    """
+    n = len(clientes_df)
+    latitudes = clientes_df["latitude"].to_numpy(dtype=np.float64)
+    longitudes = clientes_df["longitude"].to_numpy(dtype=np.float64)
+    segmento = clientes_df["mascara_segmento"].to_numpy(dtype=np.int64)
+    categoria = pd.Index(candidatas.categorias).get_indexer(pd.Index(clientes_df["categoria_servico"]))
+    nivel2 = pd.Index(candidatas.niveis2).get_indexer(pd.Index(clientes_df["servico_nivel2"]))
+
+    limite = np.asarray(limiar, dtype=np.float64)
+    indice = None
+    if distancia_maxima_km is not None:
+        limite = np.minimum(limite, distancia_maxima_km)
+        indice = IndiceGrade(latitudes, longitudes, tamanho_celula_km=1.0, metodo=metodo)
+    todas = np.arange(n)
+
+    resultado = []
+    for j in range(len(candidatas)):
+        lat, lon = candidatas.latitudes[j], candidatas.longitudes[j]
+        posicoes = todas if indice is None else indice.no_raio(lat, lon, distancia_maxima_km)[0]
+        compativel = ((segmento[posicoes] & candidatas.mascara_segmento[j]) != 0) & (
+            ((categoria[posicoes] == candidatas.codigo_categoria[j]) & (categoria[posicoes] >= 0))
+            | ((nivel2[posicoes] == candidatas.codigo_nivel2[j]) & (nivel2[posicoes] >= 0))
+        )
+        posicoes = posicoes[compativel]
+        distancias = distancia_km(latitudes[posicoes], longitudes[posicoes], lat, lon, metodo)
+        resultado.append(posicoes[distancias <= limite[posicoes]])
+    return resultado
+
+
+def selecionar_locais(cobertura, pesos, k):
+    """Guloso preguiçoso sobre as coberturas: lista de (candidata, ganho) e máscara de clientes capturados.
+
+    Cada entrada do heap guarda o ganho calculado e quantos locais estavam
+    escolhidos nesse momento; como o ganho só diminui, uma entrada atual no
+    topo é a melhor escolha sem reavaliar as demais. Empates ficam com a
+    candidata de menor posição.
+    """
+    pesos = np.asarray(pesos, dtype=np.float64)
+    capturado = np.zeros(len(pesos), dtype=bool)
+    heap = [(-pesos[clientes].sum(), j, 0) for j, clientes in enumerate(cobertura)]
+    heapq.heapify(heap)
+
+    selecao = []
+    while heap and len(selecao) < k:
+        ganho_negativo, j, calculado_com = heapq.heappop(heap)
+        if calculado_com == len(selecao):
+            if ganho_negativo >= 0:
+                break
+            selecao.append((j, -ganho_negativo))
+            capturado[cobertura[j]] = True
+        else:
+            clientes = cobertura[j]
+            ganho = pesos[clientes[~capturado[clientes]]].sum()
+            heapq.heappush(heap, (-ganho, j, len(selecao)))
+    return selecao, capturado
+
+
+def otimizar_locais(clientes_df, candidatas, concorrentes, k, pesos=None, metodo="haversine", distancia_maxima_km=None):
+    """Escolhe até ``k`` candidatas (MatrizCapacidades) que maximizam o peso capturado.
+
+    Retorna a tabela da seleção, na ordem de escolha (``id`` da candidata,
+    ganho marginal, total acumulado e cobertura isolada), e a máscara dos
+    clientes capturados pelo conjunto escolhido.
+    """
+    if pesos is None:
+        pesos = np.ones(len(clientes_df))
+    limiar = limiar_concorrencia(clientes_df, concorrentes, metodo)
+    cobertura = coberturas(clientes_df, candidatas, limiar, metodo, distancia_maxima_km)
+    selecao, capturado = selecionar_locais(cobertura, pesos, k)
+
+    escolhidas = np.array([j for j, _ in selecao], dtype=np.int64)
+    ganhos = np.array([ganho for _, ganho in selecao], dtype=np.float64)
+    tabela = pd.DataFrame({
+        "passo": np.arange(1, len(selecao) + 1),
+        "id": candidatas.ids[escolhidas],
+        "latitude": candidatas.latitudes[escolhidas],
+        "longitude": candidatas.longitudes[escolhidas],
+        "ganho": ganhos,
+        "acumulado": np.cumsum(ganhos),
+        "cobertura_isolada": [float(np.asarray(pesos)[cobertura[j]].sum()) for j in escolhidas],
+    })
+    return tabela, capturado
+
+
+def otimizar_cenario(base, k, objetivo="clientes", candidatas=(), novas_candidatas=None, concorrentes=None,
+                     distancia_maxima_km=None, **filtros):
+    """Otimização sobre os dados carregados em ``motor.BaseSimulacao``.
+
+    ``candidatas`` são nomes de oficinas do cadastro e ``novas_candidatas``
+    um DataFrame (ou lista de dicionários) de locais novos. ``concorrentes``
+    são nomes de oficinas fixas; ``None`` usa todas as oficinas filtradas que
+    não são candidatas. ``filtros`` são os campos de filtro de ``motor.Cenario``
+    (segmentos, zonas, bairros, categorias, servicos_nivel2) aplicados a
+    clientes e oficinas.
+    """
+    posicoes_clientes, posicoes_oficinas = motor.filtrar(base.clientes, base.oficinas, base.codificadores, **filtros)
+    clientes_df = base.clientes.iloc[posicoes_clientes]
+
+    nomes_candidatas = list(candidatas or ())
+    partes = [base.oficinas[base.oficinas["nome_oficina"].isin(nomes_candidatas)]]
+    if novas_candidatas is not None and len(novas_candidatas):
+        partes.append(pd.DataFrame(novas_candidatas))
+    candidatas_df = pd.concat(partes, ignore_index=True)
+    if candidatas_df.empty:
+        raise ValueError("Nenhuma candidata: informe nomes do cadastro em candidatas ou locais em novas_candidatas")
+    # Categoria e serviço nível 2 informados (cadastro ou novos locais) seguem para a classificação
+    colunas = ["nome_oficina", "latitude", "longitude", "segmento"]
+    colunas += [coluna for coluna in ("categoria_servico", "servico_nivel2") if coluna in candidatas_df]
+    candidatas_df, matriz_candidatas = preparar_candidatas(candidatas_df[colunas], base.codificadores)
+
+    oficinas_filtradas = base.oficinas.iloc[posicoes_oficinas]
+    if concorrentes is None:
+        concorrentes_df = oficinas_filtradas[~oficinas_filtradas["nome_oficina"].isin(candidatas_df["nome_oficina"])]
+    else:
+        concorrentes_df = base.oficinas[base.oficinas["nome_oficina"].isin(concorrentes)]
+    matriz_concorrentes = base.capacidades.linhas(base.capacidades.posicoes(concorrentes_df.index))
+
+    tabela, capturado = otimizar_locais(
+        clientes_df,
+        matriz_candidatas,
+        matriz_concorrentes,
+        k,
+        pesos=pesos_objetivo(clientes_df, objetivo),
+        metodo=base.metodo,
+        distancia_maxima_km=distancia_maxima_km,
+    )
+    tabela.insert(1, "nome_oficina", candidatas_df["nome_oficina"].to_numpy()[tabela["id"].to_numpy()])
+    tabela["objetivo"] = objetivo
+    tabela["concorrentes"] = len(concorrentes_df)
+    return tabela.drop(columns="id"), capturado
@@ -0,0 +1,346 @@
+"""Tempo de viagem pela rede viária, a partir de um grafo local (sem acesso à rede).
+
+O grafo é um ``.npz`` com os arrays ``latitude`` e ``longitude`` dos nós e
+``origem``, ``destino`` e ``minutos`` das arestas dirigidas, ou um extrato do
+OpenStreetMap (``.pbf``/``.osm``, requer o pacote ``osmium``) convertido por
+``ler_osm``. Pontos (clientes, oficinas, centroide) são ancorados no nó mais
+próximo pelo índice em grade, com um trecho de acesso em linha reta a
+VELOCIDADE_ACESSO_KMH.
+
+Os tempos de todos os nós até cada oficina saem de um Dijkstra por oficina
+sobre o grafo reverso (``scipy.sparse.csgraph`` quando instalado, em lotes
+de fontes, ou uma implementação com ``heapq``), limitados a
+TEMPO_MAXIMO_MIN, e ficam em cache no disco em um ``.npy`` aberto por
+memory-map, com nome derivado do hash do grafo e dos nós das oficinas. A
+atribuição e o raio em minutos passam a ser consultas nessa matriz, sem
+caminho mínimo por cliente.
+"""
+
+import hashlib
+import heapq
+import os
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from atribuicao import perfis_compativeis
+from distancias import distancia_km
+from indice_espacial import IndiceGrade
+
+# Limite dos caminhos mínimos: nós mais distantes ficam com tempo infinito
+TEMPO_MAXIMO_MIN = 60.0
+
+# Velocidade do trecho entre o ponto e o nó mais próximo da rede
+VELOCIDADE_ACESSO_KMH = 20.0
+
+# Velocidade por tipo de via (tag ``highway`` do OSM) usada na conversão do extrato
+VELOCIDADES_OSM_KMH = {
+    "motorway": 80.0, "motorway_link": 50.0,
+    "trunk": 60.0, "trunk_link": 40.0,
+    "primary": 45.0, "primary_link": 30.0,
+    "secondary": 35.0, "secondary_link": 25.0,
+    "tertiary": 30.0, "tertiary_link": 20.0,
+    "unclassified": 25.0, "residential": 20.0, "living_street": 10.0, "service": 15.0,
+}
+
+# Subdiretório (ao lado do grafo) com as matrizes de tempos em cache
+DIRETORIO_CACHE = ".cache_rede"
+
+# Fontes por chamada do Dijkstra do scipy (limita a matriz float64 intermediária)
+LOTE_FONTES = 32
+
+# Menor peso de aresta: o scipy ignora entradas nulas da matriz esparsa
+MINUTOS_MINIMOS = 1e-6
+
+
+@dataclass(frozen=True)
+class GrafoViario:
+    """Grafo dirigido da rede viária: coordenadas dos nós e arestas com tempo em minutos"""
+
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    origem: np.ndarray
+    destino: np.ndarray
+    minutos: np.ndarray
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    @cached_property
+    def assinatura(self):
+        """Hash SHA-1 do conteúdo do grafo (chave do cache de tempos)"""
+        resumo = hashlib.sha1()
+        for array in (self.latitudes, self.longitudes, self.origem, self.destino, self.minutos):
+            resumo.update(np.ascontiguousarray(array).tobytes())
+        return resumo.hexdigest()
+
+
+def criar_grafo(latitudes, longitudes, origem, destino, minutos):
+    """GrafoViario com laços removidos e, entre arestas paralelas, só a mais rápida"""
+    origem = np.asarray(origem, dtype=np.int64)
+    destino = np.asarray(destino, dtype=np.int64)
+    minutos = np.maximum(np.asarray(minutos, dtype=np.float64), MINUTOS_MINIMOS)
+    manter = origem != destino
+    origem, destino, minutos = origem[manter], destino[manter], minutos[manter]
+
+    ordem = np.lexsort((minutos, destino, origem))
+    origem, destino, minutos = origem[ordem], destino[ordem], minutos[ordem]
+    primeira = np.ones(len(origem), dtype=bool)
+    primeira[1:] = (origem[1:] != origem[:-1]) | (destino[1:] != destino[:-1])
+    return GrafoViario(
+        latitudes=np.asarray(latitudes, dtype=np.float64),
+        longitudes=np.asarray(longitudes, dtype=np.float64),
+        origem=origem[primeira],
+        destino=destino[primeira],
+        minutos=minutos[primeira],
+    )
+
+
+def ler_osm(caminho, velocidades_kmh=VELOCIDADES_OSM_KMH):
+    """Converte um extrato do OSM (``.pbf``/``.osm``) em GrafoViario, com tempos pelas velocidades por tipo de via"""
+    try:
+        import osmium
+    except ImportError:
+        raise ValueError("Leitura de extratos OSM requer o pacote osmium (pip install osmium); use um grafo .npz") from None
+
+    class _Vias(osmium.SimpleHandler):
+        def __init__(self):
+            super().__init__()
+            self.posicoes = {}
+            self.latitudes, self.longitudes = [], []
+            self.origem, self.destino, self.velocidade = [], [], []
+
+        def _posicao(self, no):
+            posicao = self.posicoes.get(no.ref)
+            if posicao is None:
+                posicao = self.posicoes[no.ref] = len(self.latitudes)
+                self.latitudes.append(no.location.lat)
+                self.longitudes.append(no.location.lon)
+            return posicao
+
+        def way(self, via):
+            velocidade = velocidades_kmh.get(via.tags.get("highway"))
+            if velocidade is None or len(via.nodes) < 2:
+                return
+            sentido = via.tags.get("oneway", "yes" if via.tags.get("highway") == "motorway" else "no")
+            nos = [self._posicao(no) for no in via.nodes if no.location.valid()]
+            pares = list(zip(nos[:-1], nos[1:]))
+            if sentido == "-1":
+                pares = [(b, a) for a, b in pares]
+            elif sentido not in ("yes", "true", "1"):
+                pares += [(b, a) for a, b in pares]
+            for a, b in pares:
+                self.origem.append(a)
+                self.destino.append(b)
+                self.velocidade.append(velocidade)
+
+    vias = _Vias()
+    vias.apply_file(caminho, locations=True)
+    latitudes = np.asarray(vias.latitudes, dtype=np.float64)
+    longitudes = np.asarray(vias.longitudes, dtype=np.float64)
+    origem = np.asarray(vias.origem, dtype=np.int64)
+    destino = np.asarray(vias.destino, dtype=np.int64)
+    km = distancia_km(latitudes[origem], longitudes[origem], latitudes[destino], longitudes[destino])
+    return criar_grafo(latitudes, longitudes, origem, destino, km / np.asarray(vias.velocidade) * 60.0)
+
+
+def salvar_grafo(grafo, caminho):
+    np.savez(caminho, latitude=grafo.latitudes, longitude=grafo.longitudes,
+             origem=grafo.origem, destino=grafo.destino, minutos=grafo.minutos)
+
+
+def carregar_grafo(caminho):
+    """Lê o grafo de um ``.npz`` (ver ``salvar_grafo``) ou de um extrato OSM"""
+    if caminho.endswith((".pbf", ".osm")):
+        return ler_osm(caminho)
+    with np.load(caminho) as dados:
+        return criar_grafo(dados["latitude"], dados["longitude"], dados["origem"], dados["destino"], dados["minutos"])
+
+
+def _dijkstra_heapq(inicio, vizinhos, pesos, fonte, limite):
+    """Tempos mínimos a partir de ``fonte`` sobre listas de adjacência (CSR), até ``limite``"""
+    tempos = {fonte: 0.0}
+    heap = [(0.0, fonte)]
+    fechados = set()
+    while heap:
+        tempo, no = heapq.heappop(heap)
+        if no in fechados:
+            continue
+        fechados.add(no)
+        for i in range(inicio[no], inicio[no + 1]):
+            vizinho = vizinhos[i]
+            novo = tempo + pesos[i]
+            if novo <= limite and novo < tempos.get(vizinho, np.inf):
+                tempos[vizinho] = novo
+                heapq.heappush(heap, (novo, vizinho))
+    return tempos
+
+
+def tempos_ate_nos(grafo, fontes, limite=TEMPO_MAXIMO_MIN, saida=None):
+    """Matriz (fontes x nós) com o tempo mínimo de cada nó até cada fonte (infinito além de ``limite``).
+
+    Os caminhos são calculados sobre o grafo reverso, ou seja, no sentido
+    nó -> fonte (cliente indo até a oficina). ``saida`` pode ser um array
+    float32 já alocado (p. ex. um memory-map) para receber o resultado.
+    """
+    fontes = np.asarray(fontes, dtype=np.int64)
+    n = len(grafo)
+    if saida is None:
+        saida = np.empty((len(fontes), n), dtype=np.float32)
+    try:
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import dijkstra
+    except ImportError:
+        dijkstra = None
+
+    if dijkstra is not None:
+        reverso = csr_matrix((grafo.minutos, (grafo.destino, grafo.origem)), shape=(n, n))
+        for inicio in range(0, len(fontes), LOTE_FONTES):
+            lote = fontes[inicio:inicio + LOTE_FONTES]
+            saida[inicio:inicio + len(lote)] = dijkstra(reverso, directed=True, indices=lote, limit=limite)
+        return saida
+
+    # Sem scipy: Dijkstra com heap binário sobre a adjacência reversa em CSR
+    ordem = np.argsort(grafo.destino, kind="stable")
+    inicio_no = np.searchsorted(grafo.destino[ordem], np.arange(n + 1)).tolist()
+    vizinhos = grafo.origem[ordem].tolist()
+    pesos = grafo.minutos[ordem].tolist()
+    for i, fonte in enumerate(fontes.tolist()):
+        tempos = _dijkstra_heapq(inicio_no, vizinhos, pesos, fonte, limite)
+        linha = np.full(n, np.inf, dtype=np.float32)
+        linha[list(tempos)] = list(tempos.values())
+        saida[i] = linha
+    return saida
+
+
+@dataclass(frozen=True)
+class TemposOficinas:
+    """Tempos (min) de cada nó da rede até cada oficina do cadastro, com o acesso da oficina.
+
+    ``tempos`` tem uma linha por nó de oficina distinto (``linhas`` aponta a
+    linha de cada oficina, na ordem de ``ids``) e costuma ser um memory-map
+    somente leitura do cache.
+    """
+
+    ids: pd.Index
+    linhas: np.ndarray
+    acesso: np.ndarray
+    tempos: np.ndarray
+
+    def submatriz(self, ids_oficinas, nos):
+        """Tempos (oficinas x nós) das oficinas com os ids informados até os nós dados"""
+        posicoes = self.ids.get_indexer(ids_oficinas)
+        if (posicoes < 0).any():
+            raise ValueError("Oficinas sem tempos calculados na rede viária: " + ", ".join(map(str, np.asarray(ids_oficinas)[posicoes < 0])))
+        return self.tempos[np.ix_(self.linhas[posicoes], np.asarray(nos, dtype=np.int64))] + self.acesso[posicoes, None]
+
+
+class RedeViaria:
+    """Grafo, índice espacial dos nós e cache de tempos em disco"""
+
+    def __init__(self, grafo, diretorio_cache=None, limite_minutos=TEMPO_MAXIMO_MIN, velocidade_acesso_kmh=VELOCIDADE_ACESSO_KMH):
+        self.grafo = grafo
+        self.diretorio_cache = diretorio_cache
+        self.limite_minutos = limite_minutos
+        self.velocidade_acesso_kmh = velocidade_acesso_kmh
+        self.indice = IndiceGrade(grafo.latitudes, grafo.longitudes, tamanho_celula_km=0.5)
+
+    def ancorar(self, latitudes, longitudes):
+        """Nó mais próximo de cada ponto e o tempo (min) do trecho de acesso até ele"""
+        posicoes, distancias = self.indice.k_mais_proximos(latitudes, longitudes, k=1)
+        return posicoes[:, 0], distancias[:, 0] / self.velocidade_acesso_kmh * 60.0
+
+    def tempos_ate(self, nos):
+        """Tempos de todos os nós até cada nó de ``nos`` (lidos do cache ou calculados e gravados)"""
+        nos = np.asarray(nos, dtype=np.int64)
+        if self.diretorio_cache is None:
+            return tempos_ate_nos(self.grafo, nos, self.limite_minutos)
+
+        chave = hashlib.sha1(nos.tobytes() + np.float64(self.limite_minutos).tobytes()).hexdigest()
+        destino = os.path.join(self.diretorio_cache, f"tempos_{self.grafo.assinatura[:16]}_{chave[:16]}.npy")
+        if not os.path.exists(destino):
+            os.makedirs(self.diretorio_cache, exist_ok=True)
+            temporario = f"{destino}.{os.getpid()}.tmp"
+            saida = np.lib.format.open_memmap(temporario, mode="w+", dtype=np.float32, shape=(len(nos), len(self.grafo)))
+            tempos_ate_nos(self.grafo, nos, self.limite_minutos, saida)
+            saida.flush()
+            del saida
+            os.replace(temporario, destino)
+        return np.load(destino, mmap_mode="r")
+
+    def tempos_ate_ponto(self, lat, lon):
+        """Tempo (min) de cada nó até o ponto, incluindo o acesso do ponto (sem cache)"""
+        no, acesso = self.ancorar([lat], [lon])
+        return tempos_ate_nos(self.grafo, no, self.limite_minutos)[0] + np.float32(acesso[0])
+
+    def tempos_oficinas(self, oficinas_df):
+        """TemposOficinas do cadastro (requer as colunas de ``adicionar_ancoras``)"""
+        nos, linhas = np.unique(oficinas_df["no_rede"].to_numpy(dtype=np.int64), return_inverse=True)
+        return TemposOficinas(
+            ids=pd.Index(oficinas_df.index),
+            linhas=linhas.ravel(),
+            acesso=oficinas_df["acesso_rede_min"].to_numpy(dtype=np.float32),
+            tempos=self.tempos_ate(nos),
+        )
+
+
+def adicionar_ancoras(df, rede):
+    """Adiciona ``no_rede`` (nó mais próximo) e ``acesso_rede_min`` (tempo até ele) ao DataFrame"""
+    nos, acesso = rede.ancorar(df["latitude"].to_numpy(), df["longitude"].to_numpy())
+    df["no_rede"] = nos
+    df["acesso_rede_min"] = acesso.astype(np.float32)
+    return df
+
+
+def atribuir_oficina_mais_rapida(clientes_df, categorias_clientes, niveis2_clientes, capacidades, tempos_oficinas,
+                                 tamanho_bloco=4096, pesos=None):
+    """Oficina compatível com o menor tempo de viagem, com a mesma interface de
+    ``atribuicao.atribuir_oficina_mais_proxima``.
+
+    Retorna ``(posicao, minutos, totais)``, com os totais de ``pesos`` por
+    oficina de ``capacidades`` (``None`` sem ``pesos``). Clientes sem oficina compatível alcançável dentro do
+    limite dos caminhos ficam com posição -1 e tempo infinito. Empates ficam
+    com a oficina que aparece primeiro em ``capacidades``.
+    """
+    n = len(clientes_df)
+    posicao = np.full(n, -1, dtype=np.int64)
+    minutos = np.full(n, np.inf)
+    totais = np.zeros(len(capacidades))
+    if n == 0 or len(capacidades) == 0:
+        return posicao, minutos, None if pesos is None else totais
+    if pesos is not None:
+        pesos = np.asarray(pesos, dtype=np.float64)
+
+    nos = clientes_df["no_rede"].to_numpy(dtype=np.int64)
+    acesso = clientes_df["acesso_rede_min"].to_numpy(dtype=np.float64)
+    for clientes_perfil, colunas in perfis_compativeis(clientes_df, categorias_clientes, niveis2_clientes, capacidades):
+        ids = capacidades.ids[colunas]
+        for inicio in range(0, len(clientes_perfil), tamanho_bloco):
+            bloco = clientes_perfil[inicio:inicio + tamanho_bloco]
+            tempos = tempos_oficinas.submatriz(ids, nos[bloco])
+            melhor = np.argmin(tempos, axis=0)
+            melhor_tempo = tempos[melhor, np.arange(len(bloco))]
+            alcancavel = np.isfinite(melhor_tempo)
+            bloco, melhor = bloco[alcancavel], melhor[alcancavel]
+            posicao[bloco] = colunas[melhor]
+            minutos[bloco] = melhor_tempo[alcancavel] + acesso[bloco]
+            if pesos is not None:
+                totais += np.bincount(colunas[melhor], weights=pesos[bloco], minlength=len(capacidades))
+
+    return posicao, minutos, None if pesos is None else totais
+
+
+def no_tempo_de_oficinas(clientes_df, ids_oficinas, tempos_oficinas, limite_minutos, tamanho_bloco=4096):
+    """Máscara dos clientes a até ``limite_minutos`` de viagem de alguma das oficinas"""
+    no_tempo = np.zeros(len(clientes_df), dtype=bool)
+    if no_tempo.size == 0 or len(ids_oficinas) == 0:
+        return no_tempo
+    nos = clientes_df["no_rede"].to_numpy(dtype=np.int64)
+    acesso = clientes_df["acesso_rede_min"].to_numpy(dtype=np.float64)
+    for inicio in range(0, len(no_tempo), tamanho_bloco):
+        bloco = slice(inicio, inicio + tamanho_bloco)
+        tempos = tempos_oficinas.submatriz(ids_oficinas, nos[bloco]).min(axis=0) + acesso[bloco]
+        no_tempo[bloco] = tempos <= limite_minutos
+    return no_tempo
@@ -0,0 +1,128 @@
+"""Simulação de Monte Carlo da demanda atendida por oficina.
+
+A atribuição cliente -> oficina é calculada uma vez (``motor.simular``) e só
+a demanda é sorteada: em cada réplica o número de serviços de cada cliente
+no horizonte é Poisson com média ``visitas_ano * horizonte_dias / 365`` e o
+valor de cada serviço é Gama com média ``valor_estimado_servico`` e
+coeficiente de variação ``ruido_valor``. Como a soma de N valores Gama
+independentes com a mesma escala é uma Gama de forma N vezes maior, a
+receita de um cliente na réplica sai de um único sorteio, sem laço por
+serviço. Cada lote de réplicas é uma matriz réplica x cliente sorteada de
+uma vez pelo ``numpy.random.Generator`` com semente; os clientes ficam
+ordenados por oficina e as cargas saem de ``np.add.reduceat`` nas colunas.
+"""
+
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from demanda import visitas_por_ano
+
+REPLICACOES_PADRAO = 1000
+HORIZONTE_PADRAO_DIAS = 365.0
+# Coeficiente de variação do valor de cada serviço em torno do valor estimado
+RUIDO_VALOR_PADRAO = 0.25
+NIVEL_CONFIANCA_PADRAO = 0.95
+
+# Réplicas sorteadas por vez (limita a matriz réplica x cliente em memória)
+TAMANHO_LOTE = 128
+
+
+@dataclass(frozen=True)
+class ResultadoMonteCarlo:
+    """Cargas sorteadas (réplica x oficina) e o resumo por oficina com intervalos"""
+
+    ids: np.ndarray
+    servicos: np.ndarray
+    receita: np.ndarray
+    resumo: pd.DataFrame
+
+
+def _resumir(ids, servicos, receita, esperado_servicos, esperado_receita, nivel_confianca):
+    """Média, intervalo de confiança da média (normal) e faixa entre quantis de cada oficina"""
+    z = NormalDist().inv_cdf(0.5 + nivel_confianca / 2)
+    quantis = [(1 - nivel_confianca) / 2, (1 + nivel_confianca) / 2]
+    colunas = {}
+    for nome, amostras, esperado in (("servicos", servicos, esperado_servicos), ("receita", receita, esperado_receita)):
+        media = amostras.mean(axis=0)
+        erro = z * amostras.std(axis=0, ddof=1) / np.sqrt(len(amostras)) if len(amostras) > 1 else np.zeros_like(media)
+        inferior, superior = np.quantile(amostras, quantis, axis=0)
+        colunas[f"{nome}_esperado"] = esperado
+        colunas[f"{nome}_media"] = media
+        colunas[f"{nome}_ic_inf"] = media - erro
+        colunas[f"{nome}_ic_sup"] = media + erro
+        colunas[f"{nome}_faixa_inf"] = inferior
+        colunas[f"{nome}_faixa_sup"] = superior
+    return pd.DataFrame(colunas, index=pd.Index(ids, name="id_oficina"))
+
+
+def simular_demanda(ids_oficina, visitas_ano, valores, replicacoes=REPLICACOES_PADRAO, horizonte_dias=HORIZONTE_PADRAO_DIAS,
+                    ruido_valor=RUIDO_VALOR_PADRAO, semente=None, nivel_confianca=NIVEL_CONFIANCA_PADRAO,
+                    tamanho_lote=TAMANHO_LOTE):
+    """Monte Carlo dos serviços e da receita de cada oficina no horizonte.
+
+    ``ids_oficina`` é a oficina atribuída a cada cliente (-1 sem oficina, fora
+    da simulação), ``visitas_ano`` e ``valores`` as visitas por ano e o valor
+    estimado por serviço de cada cliente. Retorna um ResultadoMonteCarlo com
+    as amostras (réplica x oficina, oficinas na ordem crescente de id) e o
+    resumo: valor esperado analítico, média das réplicas com o intervalo de
+    confiança da média e a faixa entre os quantis de ``nivel_confianca``
+    (a variação da carga de uma réplica, útil para dimensionar capacidade).
+    """
+    ids_oficina = np.asarray(ids_oficina)
+    atendidos = np.flatnonzero(ids_oficina >= 0)
+    ids, grupo = np.unique(ids_oficina[atendidos], return_inverse=True)
+    ordem = np.argsort(grupo, kind="stable")
+    clientes = atendidos[ordem]
+    inicios = np.searchsorted(grupo[ordem], np.arange(len(ids)))
+
+    taxa = np.asarray(visitas_ano, dtype=np.float64)[clientes] * horizonte_dias / 365.0
+    valor = np.nan_to_num(np.asarray(valores, dtype=np.float64)[clientes])
+    forma = 1.0 / ruido_valor ** 2 if ruido_valor > 0 else None
+
+    gerador = np.random.default_rng(semente)
+    servicos = np.zeros((replicacoes, len(ids)))
+    receita = np.zeros((replicacoes, len(ids)))
+    if len(ids):
+        for inicio in range(0, replicacoes, tamanho_lote):
+            lote = slice(inicio, min(inicio + tamanho_lote, replicacoes))
+            contagens = gerador.poisson(taxa, size=(lote.stop - lote.start, len(clientes)))
+            if forma is None:
+                receita_clientes = contagens * valor
+            else:
+                # Soma de N serviços com valor Gama(forma, valor / forma) = Gama(N * forma, valor / forma)
+                receita_clientes = gerador.gamma(contagens * forma) * (valor / forma)
+            servicos[lote] = np.add.reduceat(contagens, inicios, axis=1)
+            receita[lote] = np.add.reduceat(receita_clientes, inicios, axis=1)
+
+    esperado_servicos = np.add.reduceat(taxa, inicios) if len(ids) else np.zeros(0)
+    esperado_receita = np.add.reduceat(taxa * valor, inicios) if len(ids) else np.zeros(0)
+    resumo = _resumir(ids, servicos, receita, esperado_servicos, esperado_receita, nivel_confianca)
+    return ResultadoMonteCarlo(ids=ids, servicos=servicos, receita=receita, resumo=resumo)
+
+
+def simular_demanda_clientes(clientes_df, ids_oficina, **parametros):
+    """``simular_demanda`` com visitas e valores lidos das colunas dos clientes"""
+    if "visitas_ano" in clientes_df:
+        visitas = clientes_df["visitas_ano"].to_numpy(dtype=np.float64)
+    else:
+        visitas = visitas_por_ano(clientes_df["frequencia_demanda"])
+    valores = clientes_df["valor_estimado_servico"].to_numpy(dtype=np.float64, na_value=0.0)
+    return simular_demanda(ids_oficina, visitas, valores, **parametros)
+
+
+def simular_cenario_demanda(resultado, **parametros):
+    """Monte Carlo sobre a atribuição de um ``motor.ResultadoCenario`` (modelo da oficina mais próxima).
+
+    O resumo ganha nome e papel de cada oficina do cenário.
+    """
+    clientes = resultado.clientes
+    if "oficina_mais_proxima" not in clientes:
+        raise ValueError(f"Cenário {resultado.cenario.nome!r}: a simulação de demanda requer o modelo da oficina mais próxima")
+    monte_carlo = simular_demanda_clientes(clientes, clientes["oficina_mais_proxima"].to_numpy(), **parametros)
+    oficinas = resultado.oficinas.reindex(monte_carlo.resumo.index)
+    monte_carlo.resumo.insert(0, "nome_oficina", oficinas["nome_oficina"].to_numpy())
+    monte_carlo.resumo.insert(1, "papel", oficinas["papel"].to_numpy())
+    return monte_carlo
@@ -0,0 +1,228 @@
+"""Avaliação em lote de cenários, sem navegador.
+
+Uso: ``python simulador_cli.py cenarios.json --saida resultados [--formato parquet|csv] [--detalhes]``
+
+O arquivo de cenários (JSON ou, com PyYAML instalado, YAML) é uma lista de
+cenários ou um objeto ``{"padrao": {...}, "cenarios": [...]}``, em que
+``padrao`` traz valores comuns a todos. Cada cenário usa os campos de
+``motor.Cenario``, por exemplo::
+
+    {"nome": "centro_5km", "oficinas_principais": ["Medeiros Oficina_1_Meoo_GF"],
+     "raio_km": 5, "segmentos": ["Meoo"], "concorrentes": null}
+
+Com ``"modelo": "huff"`` (e, opcionalmente, ``beta``, ``raio_truncamento_km`` e
+``atratividade``, um objeto nome da oficina -> atratividade)
+a demanda de cada cliente é dividida entre as oficinas compatíveis pelo
+modelo gravitacional de Huff, e as contagens passam a ser esperadas.
+
+Com ``--grafo`` (grafo local da rede viária, ver rede_viaria.py) cenários
+com ``"raio_minutos"`` usam o tempo de viagem no raio e na atribuição; os
+tempos até as oficinas ficam em cache ao lado do grafo.
+
+Com ``--replicacoes N`` cada cenário (modelo mais próxima) ganha um Monte
+Carlo da demanda sobre a sua atribuição (simulacao.py), gravado na tabela
+``demanda`` com a carga esperada e os intervalos por oficina.
+
+São gravados ``resumo`` (uma linha por cenário) e ``cubos`` (contagens por
+atendimento e dimensões) e, com ``--detalhes``, ``clientes`` e ``oficinas``,
+todos com a coluna ``cenario``. Com ``--zip arquivo.zip`` as tabelas de cada
+cenário vão para ``<cenario>/<tabela>`` dentro de um único zip, gravadas
+assim que o cenário é simulado (sem acumular os detalhes de todos em
+memória), e o ``resumo`` fecha o arquivo.
+
+Um objeto ``{"grade": {...}}`` ativa a varredura (varredura.py): cada campo
+traz uma lista de valores (``oficinas_principais`` e ``segmentos`` como
+listas de listas, ``concorrentes`` com ``null`` para todos no raio), todas
+as combinações são avaliadas em paralelo (``--processos``) e é gravada a
+tabela ``varredura`` ordenada pelos clientes capturados (ou, com
+``--ordenar-por receita_principais``, pela receita anual).
+
+Um objeto ``{"otimizacao": {"k": 5, "objetivo": "valor_estimado_servico",
+"candidatas": [...], ...}}`` escolhe os k locais que maximizam a demanda
+capturada (argumentos de ``otimizacao.otimizar_cenario``) e grava a tabela
+``otimizacao`` na ordem de escolha.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import exportacao
+from motor import METODO_DISTANCIA, MODELO_MAIS_PROXIMA, RAIO_PADRAO_KM, Cenario, carregar_base, simular
+from otimizacao import otimizar_cenario
+from simulacao import simular_cenario_demanda
+from varredura import CRITERIOS_ORDENACAO, expandir_grade, varrer
+
+
+def ler_arquivo(caminho):
+    """Conteúdo de um arquivo JSON ou YAML"""
+    with open(caminho, encoding="utf-8") as arquivo:
+        if caminho.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Leitura de YAML requer o pacote PyYAML (pip install pyyaml); use JSON") from None
+            return yaml.safe_load(arquivo)
+        return json.load(arquivo)
+
+
+def ler_cenarios(conteudo, origem=""):
+    """Lista de ``Cenario`` a partir do conteúdo lido (lista ou objeto com ``padrao``/``cenarios``)"""
+    padrao = {}
+    if isinstance(conteudo, dict):
+        padrao = conteudo.get("padrao") or {}
+        conteudo = conteudo.get("cenarios")
+    if not isinstance(conteudo, list) or not conteudo:
+        raise ValueError(f"{origem}: esperada uma lista de cenários não vazia")
+
+    cenarios = [Cenario.de_dict({"nome": f"cenario_{i + 1}", **padrao, **dados}) for i, dados in enumerate(conteudo)]
+    nomes = [cenario.nome for cenario in cenarios]
+    repetidos = sorted({nome for nome in nomes if nomes.count(nome) > 1})
+    if repetidos:
+        raise ValueError(f"{origem}: nomes de cenário repetidos: {', '.join(repetidos)}")
+    return cenarios
+
+
+def ler_grade(grade, origem=""):
+    """Cenários da varredura a partir de ``{"oficinas_principais": [[...], ...], "raio_km": [...], ...}``"""
+    if not grade.get("oficinas_principais"):
+        raise ValueError(f"{origem}: a grade precisa de ao menos um conjunto em oficinas_principais")
+    return expandir_grade(
+        grade["oficinas_principais"],
+        grade.get("raio_km") or (RAIO_PADRAO_KM,),
+        grade.get("segmentos") or ((),),
+        grade.get("concorrentes") or (None,),
+    )
+
+
+def gravar(df, diretorio, nome, formato):
+    """Grava a tabela em ``diretorio/nome.formato`` (o diretório é criado só quando algo é gravado nele)"""
+    os.makedirs(diretorio, exist_ok=True)
+    return exportacao.gravar(df, os.path.join(diretorio, f"{nome}.{formato}"), formato)
+
+
+def com_cenario(df, nome):
+    """Tabela com a coluna ``cenario`` na frente (e o id da linha, quando houver, como coluna)"""
+    df = df.reset_index(drop=df.index.name is None)
+    df.insert(0, "cenario", nome)
+    return df
+
+
+def tabela_resumo(resumos):
+    """Resumos como DataFrame; colunas só com inteiros ficam ``Int64`` (vazias nas linhas de erro, sem virar float)"""
+    def inteiro(valor):
+        return isinstance(valor, (int, np.integer)) and not isinstance(valor, bool)
+
+    colunas = {coluna for resumo in resumos for coluna in resumo}
+    inteiras = [coluna for coluna in colunas if all(inteiro(resumo[coluna]) for resumo in resumos if coluna in resumo)]
+    return pd.DataFrame(resumos).astype({coluna: "Int64" for coluna in inteiras})
+
+
+def avaliar(base, cenarios, args, resumos):
+    """Simula os cenários um a um e gera ``(nome, tabelas)`` de cada um; os resumos vão para ``resumos``"""
+    for cenario in cenarios:
+        inicio = time.perf_counter()
+        try:
+            resultado = simular(base, cenario)
+        except ValueError as erro:
+            # Um cenário inválido não interrompe o lote: fica registrado no resumo
+            resumos.append({"cenario": cenario.nome, "erro": str(erro)})
+            print(f"[erro] {erro}", file=sys.stderr)
+            continue
+        tabelas = {"cubos": com_cenario(resultado.cubo, cenario.nome)}
+        if args.replicacoes and cenario.modelo == MODELO_MAIS_PROXIMA:
+            monte_carlo = simular_cenario_demanda(resultado, replicacoes=args.replicacoes, semente=args.semente)
+            tabelas["demanda"] = com_cenario(monte_carlo.resumo, cenario.nome)
+        resumos.append({**resultado.resumo, "segundos": round(time.perf_counter() - inicio, 4)})
+        if args.detalhes:
+            tabelas["clientes"] = com_cenario(resultado.clientes.rename_axis("id_linha"), cenario.nome)
+            tabelas["oficinas"] = com_cenario(resultado.oficinas.rename_axis("id_oficina"), cenario.nome)
+        print(f"{cenario.nome}: {resultado.resumo['clientes_principais']:g} de {resultado.resumo['clientes_raio']} clientes com as principais")
+        yield cenario.nome, tabelas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Avalia cenários do simulador em lote e grava os resultados.")
+    parser.add_argument("cenarios", help="arquivo JSON ou YAML com os cenários")
+    parser.add_argument("--saida", default="resultados", help="diretório de saída (padrão: resultados)")
+    parser.add_argument("--formato", choices=exportacao.FORMATOS, default="parquet")
+    parser.add_argument("--zip", default=None, help="grava as tabelas de todos os cenários neste arquivo zip")
+    parser.add_argument("--dados", default=os.path.dirname(os.path.abspath(__file__)), help="diretório dos CSVs/Feather")
+    parser.add_argument("--metodo", choices=("haversine", "elipsoidal"), default=METODO_DISTANCIA)
+    parser.add_argument("--grafo", default=None, help="grafo da rede viária (.npz ou extrato OSM) para cenários com raio_minutos")
+    parser.add_argument("--detalhes", action="store_true", help="grava também clientes e oficinas de cada cenário")
+    parser.add_argument("--replicacoes", type=int, default=None, help="réplicas do Monte Carlo de demanda por cenário")
+    parser.add_argument("--semente", type=int, default=None, help="semente do Monte Carlo (resultados reprodutíveis)")
+    parser.add_argument("--processos", type=int, default=None, help="processos da varredura (padrão: um por CPU)")
+    parser.add_argument("--ordenar-por", choices=CRITERIOS_ORDENACAO, default=CRITERIOS_ORDENACAO[0], help="critério do ranking da varredura")
+    args = parser.parse_args(argv)
+
+    try:
+        conteudo = ler_arquivo(args.cenarios)
+        otimizacao = conteudo.get("otimizacao") if isinstance(conteudo, dict) else None
+        if otimizacao is not None:
+            cenarios, modo_varredura = [], False
+        elif isinstance(conteudo, dict) and "grade" in conteudo:
+            cenarios, modo_varredura = ler_grade(conteudo["grade"], args.cenarios), True
+        else:
+            cenarios, modo_varredura = ler_cenarios(conteudo, args.cenarios), False
+    except (OSError, ValueError, TypeError) as erro:
+        parser.error(str(erro))
+
+    inicio = time.perf_counter()
+    base = carregar_base(args.dados, metodo=args.metodo, arquivo_grafo=args.grafo)
+    print(f"Base carregada: {len(base.clientes)} clientes, {len(base.oficinas)} oficinas ({time.perf_counter() - inicio:.1f} s)")
+
+    if otimizacao is not None:
+        inicio = time.perf_counter()
+        try:
+            selecao, _ = otimizar_cenario(base, **otimizacao)
+        except (TypeError, ValueError) as erro:
+            parser.error(f"otimizacao: {erro}")
+        print(f"Otimização: {len(selecao)} locais em {time.perf_counter() - inicio:.1f} s")
+        print(selecao[["passo", "nome_oficina", "ganho", "acumulado"]].to_string(index=False))
+        print(f"-> {gravar(selecao, args.saida, 'otimizacao', args.formato)}")
+        return 0
+
+    if modo_varredura:
+        inicio = time.perf_counter()
+        try:
+            ranking = varrer(base, cenarios, processos=args.processos, ordenar_por=args.ordenar_por)
+        except ValueError as erro:
+            parser.error(str(erro))
+        print(f"Varredura: {len(cenarios)} cenários em {time.perf_counter() - inicio:.1f} s")
+        print(f"-> {gravar(ranking, args.saida, 'varredura', args.formato)}")
+        return 0
+
+    resumos = []
+    if args.zip:
+        def entradas():
+            for nome_cenario, tabelas in avaliar(base, cenarios, args, resumos):
+                for nome, tabela in tabelas.items():
+                    yield f"{nome_cenario}/{nome}", tabela
+            yield "resumo", tabela_resumo(resumos)
+
+        print(f"-> {exportacao.exportar_zip(args.zip, entradas(), args.formato)}")
+    else:
+        acumuladas = {"cubos": [], "clientes": [], "oficinas": [], "demanda": []}
+        for _, tabelas in avaliar(base, cenarios, args, resumos):
+            for nome, tabela in tabelas.items():
+                acumuladas[nome].append(tabela)
+        for nome, tabela in {"resumo": tabela_resumo(resumos), **acumuladas}.items():
+            if isinstance(tabela, list):
+                if not tabela:
+                    continue
+                tabela = pd.concat(tabela, ignore_index=True)
+            print(f"-> {gravar(tabela, args.saida, nome, args.formato)}")
+
+    falhas = sum("erro" in resumo for resumo in resumos)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""Base sintética pequena e com semente, gerada uma vez por sessão de testes."""
+
+import os
+import sys
+
+import pytest
+
+# Os módulos do simulador ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import motor  # noqa: E402
+from gerador_sintetico import gerar_dados  # noqa: E402
+
+N_CLIENTES = 3000
+N_OFICINAS = 80
+SEMENTE = 7
+
+
+@pytest.fixture(scope="session")
+def diretorio_dados(tmp_path_factory):
+    diretorio = str(tmp_path_factory.mktemp("dados"))
+    gerar_dados(diretorio, N_CLIENTES, N_OFICINAS, semente=SEMENTE)
+    return diretorio
+
+
+@pytest.fixture(scope="session")
+def base(diretorio_dados):
+    return motor.carregar_base(diretorio_dados)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregacao import (
+    ATENDIMENTO_CONCORRENTES, ATENDIMENTO_NENHUM, ATENDIMENTO_PRINCIPAIS, classificar_atendimento, construir_cubo,
+    distribuicao, distribuicao_por_atendimento, fatiar,
+)
+
+
+@pytest.fixture(scope="module")
+def dados(base):
+    clientes = base.clientes.iloc[:2000]
+    rng = np.random.default_rng(3)
+    ids = base.oficinas.index.to_numpy()
+    # Alguns clientes sem oficina (-1), como na atribuição sem oficina compatível
+    ids_oficina = np.where(rng.random(len(clientes)) < 0.1, -1, rng.choice(ids, len(clientes)))
+    atendimento = classificar_atendimento(ids_oficina, ids[:5], ids[5:40])
+    no_raio = rng.random(len(clientes)) < 0.4
+    return clientes, ids_oficina, atendimento, no_raio
+
+
+def test_classificar_atendimento(base, dados):
+    _, ids_oficina, atendimento, _ = dados
+    ids = base.oficinas.index.to_numpy()
+    esperado = np.where(np.isin(ids_oficina, ids[:5]), ATENDIMENTO_PRINCIPAIS,
+                        np.where(np.isin(ids_oficina, ids[5:40]), ATENDIMENTO_CONCORRENTES, ATENDIMENTO_NENHUM))
+    np.testing.assert_array_equal(np.asarray(atendimento), esperado)
+
+
+@pytest.mark.parametrize("dimensao", ["segmento", "categoria_servico", "servico_nivel2"])
+def test_distribuicao_igual_value_counts(dados, dimensao):
+    clientes, _, atendimento, no_raio = dados
+    cubo = construir_cubo(clientes, atendimento, no_raio)
+    assert cubo["clientes"].sum() == len(clientes)
+
+    for obtido, valores in (
+        (distribuicao(cubo, dimensao), clientes[dimensao]),
+        (distribuicao(cubo, dimensao, no_raio_concorrente=True), clientes[dimensao][no_raio]),
+    ):
+        # Empates podem sair em outra ordem que a do value_counts; as contagens e a ordem decrescente não
+        assert obtido.to_dict() == valores.astype(str).value_counts().to_dict()
+        assert obtido.is_monotonic_decreasing
+
+
+@pytest.mark.parametrize("dimensao", ["segmento", "servico_nivel2"])
+def test_distribuicao_por_atendimento_igual_crosstab(dados, dimensao):
+    clientes, _, atendimento, no_raio = dados
+    cubo = construir_cubo(clientes, atendimento, no_raio)
+    atendimento = pd.Series(np.asarray(atendimento), index=clientes.index)
+    dentro = atendimento.isin([ATENDIMENTO_PRINCIPAIS, ATENDIMENTO_CONCORRENTES])
+    esperado = pd.crosstab(clientes[dimensao].astype(str)[dentro], atendimento[dentro])
+    esperado = esperado.reindex(columns=[ATENDIMENTO_PRINCIPAIS, ATENDIMENTO_CONCORRENTES], fill_value=0)
+    obtido = distribuicao_por_atendimento(cubo, dimensao)
+    np.testing.assert_array_equal(obtido.index, esperado.index)
+    np.testing.assert_array_equal(obtido.to_numpy(), esperado.to_numpy())
+
+
+def test_cubo_ponderado(dados):
+    clientes, _, atendimento, no_raio = dados
+    pesos = np.random.default_rng(5).random(len(clientes))
+    cubo = construir_cubo(clientes, atendimento, no_raio, pesos=pesos)
+    assert cubo["clientes"].sum() == pytest.approx(pesos.sum())
+
+    fatia = fatiar(cubo, atendimento=ATENDIMENTO_PRINCIPAIS, segmento=list(cubo["segmento"].unique()[:2]))
+    mascara = (np.asarray(atendimento) == ATENDIMENTO_PRINCIPAIS) & clientes["segmento"].astype(str).isin(cubo["segmento"].unique()[:2]).to_numpy()
+    assert fatia["clientes"].sum() == pytest.approx(pesos[mascara].sum())
+
+    # Somas ponderadas saem arredondadas a uma casa decimal
+    esperado = pd.Series(pesos, index=clientes.index).groupby(clientes["segmento"].astype(str)).sum()
+    obtido = distribuicao(cubo, "segmento")
+    np.testing.assert_allclose(obtido.to_numpy(), esperado.reindex(obtido.index).round(1).to_numpy())
+    assert obtido.is_monotonic_decreasing
@@ -0,0 +1,49 @@
+import ast
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import motor
+from armazenamento import caminho_feather, carregar_tabela, converter_csv
+
+
+def test_feather_igual_ao_csv_tipado(tmp_path, diretorio_dados):
+    for arquivo in (motor.ARQUIVO_CLIENTES, motor.ARQUIVO_OFICINAS):
+        shutil.copy(f"{diretorio_dados}/{arquivo}", tmp_path / arquivo)
+    do_csv = motor.carregar_dados(str(tmp_path))
+    for arquivo in (motor.ARQUIVO_CLIENTES, motor.ARQUIVO_OFICINAS):
+        assert converter_csv(str(tmp_path / arquivo)) == caminho_feather(str(tmp_path / arquivo))
+    do_feather = motor.carregar_dados(str(tmp_path))
+
+    for csv, feather in zip(do_csv[:2], do_feather[:2]):
+        pd.testing.assert_frame_equal(csv, feather)
+    clientes, oficinas, _ = do_feather
+    assert clientes["latitude"].dtype == np.float32 and isinstance(clientes["segmento"].dtype, pd.CategoricalDtype)
+    # Serviços realizados continuam como listas do Arrow, sem uma lista Python por linha
+    assert isinstance(oficinas["servicos_realizados"].dtype, pd.ArrowDtype)
+
+
+def test_mascara_de_servicos_igual_as_listas(diretorio_dados, base):
+    textos = pd.read_csv(f"{diretorio_dados}/{motor.ARQUIVO_OFICINAS}")["servicos_realizados"]
+    codificador = base.codificadores["servico"]
+    esperadas = [codificador.mascara(ast.literal_eval(texto)) for texto in textos]
+    np.testing.assert_array_equal(base.oficinas["mascara_servicos"], esperadas)
+    assert (base.oficinas["mascara_servicos"] != 0).all()
+
+
+def test_lista_vazia_ou_ausente_tem_mascara_vazia(base):
+    listas = pd.Series([["Freios", "Freios"], [], None, ["Serviço desconhecido"]], dtype=object)
+    mascaras = base.codificadores["servico"].codificar_listas(listas)
+    np.testing.assert_array_equal(mascaras, [base.codificadores["servico"].mascara(["Freios"]), 0, 0, 0])
+
+
+def test_feather_desatualizado_cai_no_csv(tmp_path, diretorio_dados):
+    caminho = str(tmp_path / motor.ARQUIVO_OFICINAS)
+    shutil.copy(f"{diretorio_dados}/{motor.ARQUIVO_OFICINAS}", caminho)
+    converter_csv(caminho)
+    pd.read_csv(caminho).iloc[:5].to_csv(caminho, index=False)
+    instante = os.path.getmtime(caminho_feather(caminho)) + 10
+    os.utime(caminho, (instante, instante))
+    assert len(carregar_tabela(caminho)) == 5
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from atribuicao import atribuir_oficina_mais_proxima
+from distancias import distancia_km
+from mascaras import separar_itens
+
+
+def compativel(cliente, oficina):
+    """Regra do app original: a oficina atende o segmento do cliente e a categoria ou o serviço nível 2"""
+    return cliente["segmento"] in separar_itens(oficina["segmento"]) and (
+        oficina["categoria_servico"] == cliente["categoria_servico"] or oficina["servico_nivel2"] == cliente["servico_nivel2"]
+    )
+
+
+def mais_proxima_por_cliente(clientes, oficinas, metodo):
+    """Referência: laço por cliente sobre as oficinas na ordem dada (empates ficam com a primeira)"""
+    posicoes, distancias = [], []
+    for _, cliente in clientes.iterrows():
+        melhor, menor = -1, np.inf
+        for posicao, (_, oficina) in enumerate(oficinas.iterrows()):
+            if not compativel(cliente, oficina):
+                continue
+            d = distancia_km(cliente["latitude"], cliente["longitude"], oficina["latitude"], oficina["longitude"], metodo)
+            if d < menor:
+                melhor, menor = posicao, d
+        posicoes.append(melhor)
+        distancias.append(menor)
+    return np.array(posicoes), np.array(distancias)
+
+
+@pytest.fixture(scope="module")
+def caso(base):
+    clientes = base.clientes.iloc[:400]
+    capacidades = base.capacidades.linhas(np.arange(0, len(base.oficinas), 3))
+    oficinas = base.oficinas.loc[capacidades.ids]
+    return clientes, capacidades, oficinas
+
+
+@pytest.mark.parametrize("metodo", ["haversine", "elipsoidal"])
+def test_igual_ao_laco_por_cliente(caso, metodo):
+    clientes, capacidades, oficinas = caso
+    posicao, distancia, totais = atribuir_oficina_mais_proxima(
+        clientes, clientes["categoria_servico"], clientes["servico_nivel2"], capacidades, metodo=metodo, tamanho_bloco=64
+    )
+    esperada_posicao, esperada_distancia = mais_proxima_por_cliente(clientes, oficinas, metodo)
+    assert (esperada_posicao >= 0).any() and (esperada_posicao < 0).any()
+    np.testing.assert_array_equal(posicao, esperada_posicao)
+    np.testing.assert_allclose(distancia, esperada_distancia)
+    assert totais is None
+
+
+def test_totais_por_oficina(caso):
+    clientes, capacidades, _ = caso
+    pesos = clientes["receita_anual"].to_numpy(dtype=np.float64)
+    posicao, _, totais = atribuir_oficina_mais_proxima(
+        clientes, clientes["categoria_servico"], clientes["servico_nivel2"], capacidades, pesos=pesos
+    )
+    atribuidos = posicao >= 0
+    np.testing.assert_allclose(totais, np.bincount(posicao[atribuidos], weights=pesos[atribuidos], minlength=len(capacidades)))
@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+
+import benchmark
+
+
+def test_regressoes_respeitam_tolerancia_e_pisos():
+    base = {"12k/raio": {"segundos": 1.0, "pico_mb": 10.0}, "12k/mapa": {"segundos": 0.01, "pico_mb": 0.5}}
+    resultados = {
+        "12k/raio": {"segundos": 1.3, "pico_mb": 12.0},
+        # Piora relativa grande, mas abaixo dos pisos absolutos
+        "12k/mapa": {"segundos": 0.05, "pico_mb": 1.4},
+        "100k/raio": {"segundos": 99.0, "pico_mb": 99.0},
+    }
+    assert benchmark.regressoes(resultados, base) == [("12k/raio", "segundos", 1.3, 1.0)]
+    assert benchmark.regressoes(resultados, base, tolerancia=0.5) == []
+
+
+@pytest.fixture
+def dados_12k(diretorio_dados, tmp_path):
+    """Diretório de dados do benchmark apontando para os dados já gerados da sessão"""
+    os.symlink(diretorio_dados, tmp_path / "12k")
+    return str(tmp_path)
+
+
+def test_medir_escala(dados_12k):
+    resultados = benchmark.medir_escala(os.path.join(dados_12k, "12k"), repeticoes=1)
+    assert list(resultados) == list(benchmark.ETAPAS)
+    assert all(medidas["segundos"] >= 0 and medidas["pico_mb"] >= 0 for medidas in resultados.values())
+
+
+def test_main_grava_base_e_detecta_regressao(dados_12k, tmp_path, monkeypatch):
+    arquivo_base = tmp_path / "base.json"
+    argumentos = ["--escalas", "12k", "--repeticoes", "1", "--dados", dados_12k, "--base", str(arquivo_base)]
+    assert benchmark.main(argumentos + ["--gravar-base"]) == 0
+    base = json.loads(arquivo_base.read_text(encoding="utf-8"))
+    assert sorted(base) == sorted(f"12k/{etapa}" for etapa in benchmark.ETAPAS)
+
+    # Base em que a carga dos dados não leva tempo: com piso zero a execução falha
+    base["12k/carregar"]["segundos"] = 0.0
+    arquivo_base.write_text(json.dumps(base), encoding="utf-8")
+    monkeypatch.setattr(benchmark, "PISO_SEGUNDOS", 0.0)
+    assert benchmark.main(argumentos) == 1
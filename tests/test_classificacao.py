@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classificacao import (
+    CATEGORIA_PADRAO, NIVEL2_PADRAO, REGRAS_CATEGORIA, REGRAS_NIVEL2, adicionar_classificacao, classificador_categoria,
+    classificador_nivel2,
+)
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cadeia_if(texto, regras, padrao):
+    """A cadeia de if/elif original: a primeira regra com alguma palavra-chave no texto vence"""
+    texto = texto.lower()
+    for rotulo, palavras in regras:
+        if any(palavra in texto for palavra in palavras):
+            return rotulo
+    return padrao
+
+
+def textos():
+    """Nomes reais, serviços demandados e combinações de palavras-chave (inclusive sobrepostas)"""
+    nomes = pd.read_csv(os.path.join(RAIZ, "oficinas_real_nomes.csv"))["nome_oficina"].tolist()
+    servicos = pd.read_csv(os.path.join(RAIZ, "clientes_f_real_12k.csv"), usecols=["tipo_servico_demandado"])["tipo_servico_demandado"].unique().tolist()
+    palavras = [palavra for regras in (REGRAS_CATEGORIA, REGRAS_NIVEL2) for _, lista in regras for palavra in lista]
+    rng = np.random.default_rng(0)
+    combinadas = [" ".join(rng.choice(palavras, 3)) for _ in range(300)] + ["SOMOTOR", "Auto Eletrica e Freio", "ar-condicionadO"]
+    return nomes + servicos + combinadas + ["", "Oficina do Zé"]
+
+
+@pytest.mark.parametrize("classificador, regras, padrao", [
+    (classificador_categoria, REGRAS_CATEGORIA, CATEGORIA_PADRAO),
+    (classificador_nivel2, REGRAS_NIVEL2, NIVEL2_PADRAO),
+])
+def test_igual_a_cadeia_if(classificador, regras, padrao):
+    lista = textos()
+    esperado = [cadeia_if(texto, regras, padrao) for texto in lista]
+    assert [classificador(texto) for texto in lista] == esperado
+    classificados = classificador.classificar(pd.Series(lista * 2))
+    assert classificados.astype(str).tolist() == esperado * 2
+    assert set(classificados.cat.categories) == set(esperado)
+
+
+def test_classificar_preserva_indice_e_ausentes():
+    serie = pd.Series(["Pintura", None, "Troca de Oleo"], index=[10, 20, 30], name="tipo")
+    df = adicionar_classificacao(pd.DataFrame({"tipo": serie}), "tipo")
+    assert df["categoria_servico"].tolist()[0] == "Funilaria e Pintura" and pd.isna(df["categoria_servico"].iloc[1])
+    assert df["servico_nivel2"].iloc[2] == "Troca de Óleo"
+    assert list(df.index) == [10, 20, 30]
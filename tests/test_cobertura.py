@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from cobertura import construir_aneis
+from distancias import distancia_km
+
+
+@pytest.fixture(scope="module")
+def aneis(base):
+    return construir_aneis(base)
+
+
+@pytest.mark.parametrize("raio_km", [0.5, 1.0, 3.5, 12.0, 20.0])
+def test_contagens_iguais_forca_bruta(base, aneis, raio_km):
+    clientes = base.clientes
+    segmento = str(clientes["segmento"].iloc[0])
+    grupos = aneis.selecao_grupos(segmentos=(segmento,))
+    do_segmento = (clientes["segmento"].astype(str) == segmento).to_numpy()
+    ids = base.oficinas.index[:15]
+    contagens = aneis.contagens(ids, raio_km)
+    contagens_segmento = aneis.contagens(ids, raio_km, grupos)
+    for id_oficina in ids:
+        oficina = base.oficinas.loc[id_oficina]
+        d = distancia_km(oficina["latitude"], oficina["longitude"], clientes["latitude"].to_numpy(np.float64),
+                         clientes["longitude"].to_numpy(np.float64), base.metodo)
+        assert contagens[id_oficina] == (d <= raio_km).sum()
+        assert contagens_segmento[id_oficina] == ((d <= raio_km) & do_segmento).sum()
+
+
+def test_curva_crescente_e_igual_as_contagens(base, aneis):
+    ids = base.oficinas.index[:3]
+    curvas = aneis.curvas(ids)
+    assert (np.diff(curvas.to_numpy(), axis=0) >= 0).all()
+    assert (curvas.loc[5.0] == aneis.contagens(ids, 5.0)).all()
+
+
+def test_raio_fora_dos_aneis(aneis, base):
+    with pytest.raises(ValueError):
+        aneis.contagens(base.oficinas.index[:1], 25.0)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import motor
+from demanda import VISITAS_POR_ANO, adicionar_demanda, visitas_por_ano
+
+
+def test_visitas_por_frequencia():
+    frequencias = pd.Series(["Mensal", "semanal ", "Anual", None, "Mensal"], dtype="category")
+    np.testing.assert_array_equal(visitas_por_ano(frequencias), [12.0, 52.0, 1.0, 1.0, 12.0])
+    with pytest.raises(ValueError, match="Diária"):
+        visitas_por_ano(pd.Series(["Mensal", "Diária"]))
+
+
+def test_receita_anual_e_valor_vezes_visitas(base):
+    clientes = base.clientes
+    visitas = clientes["frequencia_demanda"].astype(str).map(VISITAS_POR_ANO).to_numpy(dtype=np.float64)
+    np.testing.assert_allclose(clientes["receita_anual"], clientes["valor_estimado_servico"].fillna(0.0) * visitas)
+    sem_valor = adicionar_demanda(pd.DataFrame({"frequencia_demanda": ["Mensal"], "valor_estimado_servico": [np.nan]}))
+    assert sem_valor["receita_anual"].iloc[0] == 0.0
+
+
+def test_carregar_dados_exige_colunas_de_demanda(tmp_path, diretorio_dados):
+    clientes = pd.read_csv(f"{diretorio_dados}/{motor.ARQUIVO_CLIENTES}").drop(columns="frequencia_demanda")
+    clientes.to_csv(tmp_path / motor.ARQUIVO_CLIENTES, index=False)
+    pd.read_csv(f"{diretorio_dados}/{motor.ARQUIVO_OFICINAS}").to_csv(tmp_path / motor.ARQUIVO_OFICINAS, index=False)
+    with pytest.raises(ValueError, match="frequencia_demanda"):
+        motor.carregar_dados(str(tmp_path))
+
+
+def test_receita_por_oficina_soma_a_do_resumo(base):
+    oficinas = base.oficinas[base.oficinas["categoria_servico"] == "Outros Serviços"]
+    principais = tuple(oficinas["nome_oficina"].iloc[:2])
+    resultado = motor.simular(base, motor.Cenario(nome="receita", oficinas_principais=principais, raio_km=8.0))
+    resumo, clientes, por_oficina = resultado.resumo, resultado.clientes, resultado.oficinas
+    assert resumo["receita_raio"] == pytest.approx(clientes["receita_anual"].sum())
+    principal = (por_oficina["papel"] == motor.PAPEL_PRINCIPAL).to_numpy()
+    assert resumo["receita_principais"] == pytest.approx(por_oficina["receita_capturada"][principal].sum())
+    assert resumo["receita_concorrentes"] == pytest.approx(por_oficina["receita_capturada"][~principal].sum())
+    # Receita, não contagem de clientes
+    assert resumo["receita_principais"] != resumo["clientes_principais"]
+
+
+def test_atribuir_clientes_retorna_sempre_quatro_valores(base):
+    clientes = base.clientes.iloc[:200]
+    ids = base.oficinas.index
+    sem_pesos = motor.atribuir_clientes(clientes, base.capacidades, ids[:2], ids[2:], base.metodo)
+    com_pesos = motor.atribuir_clientes(clientes, base.capacidades, ids[:2], ids[2:], base.metodo,
+                                        pesos=clientes["receita_anual"].to_numpy())
+    assert len(sem_pesos) == len(com_pesos) == 4 and sem_pesos[3] is None
+    np.testing.assert_array_equal(sem_pesos[0], com_pesos[0])
+    atribuidos = com_pesos[0] >= 0
+    assert com_pesos[3].sum() == pytest.approx(clientes["receita_anual"].to_numpy()[atribuidos].sum())
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from distancias import distancia_km
+
+# Pares (origem, destino, km) com a distância geodésica do WGS-84 (geopy.distance.geodesic)
+PARES_GEODESICOS = [
+    ((-23.5505, -46.6333), (-23.5614, -46.6559), 2.604125),  # Sé -> Av. Paulista
+    ((-23.5505, -46.6333), (-23.6273, -46.6566), 8.832016),  # Sé -> Congonhas
+    ((-23.5505, -46.6333), (-22.9068, -43.1729), 361.260861),  # São Paulo -> Rio de Janeiro
+    ((0.0, 0.0), (0.0, 1.0), 111.319491),  # 1 grau de longitude no equador
+]
+
+
+@pytest.mark.parametrize("origem, destino, km", PARES_GEODESICOS)
+def test_elipsoidal_erro_abaixo_de_1m(origem, destino, km):
+    assert distancia_km(*origem, *destino, metodo="elipsoidal") == pytest.approx(km, abs=1e-3)
+
+
+@pytest.mark.parametrize("origem, destino, km", PARES_GEODESICOS)
+def test_haversine_erro_relativo_abaixo_de_0_5_porcento(origem, destino, km):
+    assert distancia_km(*origem, *destino, metodo="haversine") == pytest.approx(km, rel=5e-3)
+
+
+@pytest.mark.parametrize("metodo", ["haversine", "elipsoidal"])
+def test_pontos_coincidentes(metodo):
+    assert distancia_km(-23.55, -46.63, -23.55, -46.63, metodo=metodo) == 0.0
+
+
+@pytest.mark.parametrize("metodo", ["haversine", "elipsoidal"])
+def test_broadcasting_igual_ao_calculo_par_a_par(metodo):
+    gerador = np.random.default_rng(0)
+    lat_a, lon_a = -23.5 + gerador.normal(0, 0.1, 20), -46.6 + gerador.normal(0, 0.1, 20)
+    lat_b, lon_b = -23.5 + gerador.normal(0, 0.1, 7), -46.6 + gerador.normal(0, 0.1, 7)
+    matriz = distancia_km(lat_a[:, None], lon_a[:, None], lat_b[None, :], lon_b[None, :], metodo=metodo)
+    assert matriz.shape == (20, 7)
+    for i in range(20):
+        for j in range(7):
+            assert matriz[i, j] == distancia_km(lat_a[i], lon_a[i], lat_b[j], lon_b[j], metodo=metodo)
+
+
+@pytest.mark.parametrize("metodo, tolerancia_relativa, tolerancia_km", [("haversine", 5e-3, 0.0), ("elipsoidal", 0.0, 1e-3)])
+def test_contra_geopy_em_sao_paulo(metodo, tolerancia_relativa, tolerancia_km):
+    geodesic = pytest.importorskip("geopy.distance").geodesic
+    gerador = np.random.default_rng(1)
+    pontos = np.column_stack([-23.55 + gerador.normal(0, 0.15, (200, 2)), -46.63 + gerador.normal(0, 0.15, (200, 2))])
+    calculadas = distancia_km(pontos[:, 0], pontos[:, 2], pontos[:, 1], pontos[:, 3], metodo=metodo)
+    referencia = [geodesic((p[0], p[2]), (p[1], p[3])).km for p in pontos]
+    np.testing.assert_allclose(calculadas, referencia, rtol=tolerancia_relativa, atol=tolerancia_km)
+
+
+def test_metodo_desconhecido():
+    with pytest.raises(ValueError):
+        distancia_km(0, 0, 1, 1, metodo="manhattan")
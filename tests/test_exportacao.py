@@ -0,0 +1,70 @@
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import exportacao
+
+
+@pytest.fixture
+def tabela():
+    n = 250
+    return pd.DataFrame({
+        "id_cliente": np.arange(n),
+        "segmento": pd.Categorical(np.where(np.arange(n) % 3 == 0, "Leve", "Pesado")),
+        "distancia_km": exportacao.distancias_tipadas(np.where(np.arange(n) % 7 == 0, np.inf, np.arange(n) / 10)),
+    })
+
+
+def ler(conteudo, formato):
+    if formato == "csv":
+        return pd.read_csv(io.BytesIO(conteudo))
+    return pd.read_parquet(io.BytesIO(conteudo))
+
+
+@pytest.mark.parametrize("formato", exportacao.FORMATOS)
+def test_download_aceito_pelo_streamlit(tabela, formato):
+    download = pytest.importorskip("streamlit.runtime.download_data_util")
+    conteudo, _ = download.convert_data_to_bytes_and_infer_mime(
+        exportacao.arquivo_exportacao(tabela, formato, linhas_por_lote=64), unsupported_error=TypeError("tipo não suportado")
+    )
+    lida = ler(conteudo, formato)
+    assert len(lida) == len(tabela)
+    np.testing.assert_array_equal(lida["id_cliente"], tabela["id_cliente"])
+
+
+@pytest.mark.parametrize("formato", exportacao.FORMATOS)
+def test_ida_e_volta_em_lotes(tmp_path, tabela, formato):
+    caminho = exportacao.gravar(tabela, str(tmp_path / f"tabela.{formato}"), formato, linhas_por_lote=64)
+    with open(caminho, "rb") as arquivo:
+        lida = ler(arquivo.read(), formato)
+    np.testing.assert_array_equal(lida["id_cliente"], tabela["id_cliente"])
+    np.testing.assert_array_equal(lida["segmento"].astype(str), tabela["segmento"].astype(str))
+    np.testing.assert_allclose(lida["distancia_km"], tabela["distancia_km"], equal_nan=True)
+    if formato == "parquet":
+        assert isinstance(lida["segmento"].dtype, pd.CategoricalDtype)
+
+
+def test_tabela_vazia_mantem_cabecalho(tabela):
+    lida = ler(exportacao.arquivo_exportacao(tabela.iloc[:0], "csv").getvalue(), "csv")
+    assert list(lida.columns) == list(tabela.columns) and lida.empty
+
+
+@pytest.mark.parametrize("formato", exportacao.FORMATOS)
+def test_zip_com_varias_tabelas(tabela, formato):
+    destino = exportacao.exportar_zip(io.BytesIO(), [("a/clientes", tabela), ("b/clientes", tabela.iloc[:10])], formato)
+    with zipfile.ZipFile(destino) as pacote:
+        assert pacote.namelist() == [f"a/clientes.{formato}", f"b/clientes.{formato}"]
+        assert len(ler(pacote.read(f"b/clientes.{formato}"), formato)) == 10
+
+
+def test_zip_recusa_nomes_repetidos(tabela):
+    with pytest.raises(ValueError, match="repetida"):
+        exportacao.exportar_zip(io.BytesIO(), [("a/clientes", tabela), ("a/clientes", tabela)], "csv")
+
+
+def test_formato_desconhecido():
+    with pytest.raises(ValueError, match="Formato"):
+        exportacao.arquivo_exportacao(pd.DataFrame({"a": [1]}), "xlsx")
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import motor
+from distancias import distancia_km
+from mascaras import separar_itens
+
+
+def filtrar_direto(clientes, oficinas, segmentos=(), zonas=(), bairros=(), categorias=(), servicos_nivel2=()):
+    """Máscaras booleanas com os filtros do app aplicados de uma vez, comparando textos"""
+    mascara_clientes = np.ones(len(clientes), dtype=bool)
+    mascara_oficinas = np.ones(len(oficinas), dtype=bool)
+    if segmentos:
+        mascara_clientes &= clientes["segmento"].isin(segmentos).to_numpy()
+        mascara_oficinas &= np.array([bool(set(separar_itens(s)) & set(segmentos)) for s in oficinas["segmento"]])
+    for valores, coluna_clientes, coluna_oficinas in (
+        (zonas, "zona", "zona"), (bairros, "bairro", "bairro"),
+        (categorias, "nivel_1_servico", "categoria_servico"), (servicos_nivel2, "nivel_2_servico", "servico_nivel2"),
+    ):
+        if valores:
+            mascara_clientes &= clientes[coluna_clientes].isin(valores).to_numpy()
+            mascara_oficinas &= oficinas[coluna_oficinas].isin(valores).to_numpy()
+    return np.flatnonzero(mascara_clientes), np.flatnonzero(mascara_oficinas)
+
+
+def casos(base):
+    clientes = base.clientes
+    segmento = str(clientes["segmento"].iloc[0])
+    zonas = tuple(clientes["zona"].astype(str).unique()[:2])
+    bairros = tuple(clientes.loc[clientes["zona"].isin(zonas), "bairro"].astype(str).unique()[:5])
+    return [
+        {},
+        {"segmentos": (segmento,)},
+        {"segmentos": (segmento,), "zonas": zonas},
+        {"zonas": zonas, "bairros": bairros},
+        {"categorias": ("Outros Serviços", "Mecânica")},
+        {"segmentos": (segmento,), "zonas": zonas, "bairros": bairros, "servicos_nivel2": ("Alinhamento", "Não Especificado")},
+    ]
+
+
+def test_etapas_iguais_ao_filtro_direto(base):
+    for filtros in casos(base):
+        posicoes_clientes, posicoes_oficinas, bairros = motor.filtrar_segmento_zona(
+            base.clientes, base.oficinas, base.codificadores, filtros.get("segmentos", ()), filtros.get("zonas", ())
+        )
+        assert bairros == sorted(base.clientes["bairro"].iloc[posicoes_clientes].astype(str).unique())
+        esperado = filtrar_direto(base.clientes, base.oficinas, **filtros)
+        obtido = motor.filtrar(base.clientes, base.oficinas, base.codificadores, **filtros)
+        for a, b in zip(obtido, esperado):
+            np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize("filtros", [{}, {"categorias": ("Outros Serviços",)}])
+def test_raio_por_busca_binaria(base, filtros):
+    posicoes_clientes, _ = motor.filtrar(base.clientes, base.oficinas, base.codificadores, **filtros)
+    centro = motor.centroide(base.oficinas.iloc[:3])
+    # Uma busca até o raio máximo serve para todas as posições do slider
+    ordenadas = motor.distancias_ordenadas(base.indice_clientes, posicoes_clientes, centro, motor.RAIO_MAXIMO_KM)
+    d = distancia_km(centro[0], centro[1], base.clientes["latitude"].to_numpy(np.float64),
+                     base.clientes["longitude"].to_numpy(np.float64), base.metodo)
+    filtradas = np.zeros(len(d), dtype=bool)
+    filtradas[posicoes_clientes] = True
+    for raio in (0.5, 1.0, 2.5, 5.0, 12.0, motor.RAIO_MAXIMO_KM):
+        np.testing.assert_array_equal(motor.posicoes_no_raio(*ordenadas, raio), np.flatnonzero(filtradas & (d <= raio)))
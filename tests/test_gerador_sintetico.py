@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import gerador_sintetico
+from mascaras import separar_itens
+
+
+@pytest.fixture(scope="module")
+def referencia():
+    return gerador_sintetico.Referencia(os.path.dirname(os.path.abspath(gerador_sintetico.__file__)))
+
+
+def test_mesma_semente_mesmos_arquivos(tmp_path, referencia):
+    primeiro = gerador_sintetico.gerar_dados(str(tmp_path / "a"), 700, 40, semente=3, referencia=referencia, tamanho_lote=256)
+    segundo = gerador_sintetico.gerar_dados(str(tmp_path / "b"), 700, 40, semente=3, referencia=referencia, tamanho_lote=256)
+    for caminho_a, caminho_b in zip(primeiro, segundo):
+        with open(caminho_a, "rb") as a, open(caminho_b, "rb") as b:
+            assert a.read() == b.read()
+
+    clientes, oficinas = (pd.read_csv(caminho) for caminho in primeiro)
+    assert list(clientes.columns) == gerador_sintetico.COLUNAS_CLIENTES and len(clientes) == 700
+    assert list(oficinas.columns) == gerador_sintetico.COLUNAS_OFICINAS and len(oficinas) == 40
+    np.testing.assert_array_equal(clientes["id_cliente"], np.arange(1, 701))
+    assert oficinas["nome_oficina"].is_unique
+
+
+@pytest.fixture
+def diretorio_referencia(tmp_path, referencia):
+    """Cópia dos CSVs de referência, sem os clientes com segmento"""
+    for arquivo in (gerador_sintetico.ARQUIVO_CLIENTES_REFERENCIA, gerador_sintetico.ARQUIVO_OFICINAS_REFERENCIA):
+        with open(os.path.join(referencia.diretorio, arquivo), "rb") as origem:
+            (tmp_path / arquivo).write_bytes(origem.read())
+    return tmp_path
+
+
+def test_segmento_dos_clientes_segue_a_oficina_mais_proxima(diretorio_referencia):
+    referencia = gerador_sintetico.Referencia(str(diretorio_referencia))
+    clientes = gerador_sintetico.gerar_clientes(referencia, 2000, 0, np.random.default_rng(1))
+    mais_proxima, _ = referencia.indice_oficinas.k_mais_proximos(clientes["latitude"], clientes["longitude"], k=1)
+    atendidos = referencia.oficinas["segmento"].to_numpy()[mais_proxima[:, 0]]
+    assert all(segmento in separar_itens(oficina) for segmento, oficina in zip(clientes["segmento"], atendidos))
+    assert clientes["segmento"].nunique() > 1
+
+
+def test_segmento_dos_clientes_vem_da_linha_sorteada(diretorio_referencia):
+    clientes_ref = pd.read_csv(diretorio_referencia / gerador_sintetico.ARQUIVO_CLIENTES_REFERENCIA)
+    # Segmento ligado ao serviço do cliente de referência
+    segmentos = clientes_ref[["id_cliente"]].assign(segmento=np.where(clientes_ref["tipo_servico_demandado"] == "Pintura", "GF", "Meoo"))
+    segmentos.to_csv(diretorio_referencia / gerador_sintetico.ARQUIVO_SEGMENTOS_REFERENCIA, index=False)
+    referencia = gerador_sintetico.Referencia(str(diretorio_referencia))
+
+    clientes = gerador_sintetico.gerar_clientes(referencia, 2000, 0, np.random.default_rng(1))
+    pintura = clientes["tipo_servico_demandado"] == "Pintura"
+    assert pintura.any() and (clientes.loc[pintura, "segmento"] == "GF").all()
+    assert (clientes.loc[~pintura, "segmento"] == "Meoo").all()
+
+
+def test_recusa_saida_no_diretorio_de_referencia(referencia):
+    with pytest.raises(ValueError, match="referência"):
+        gerador_sintetico.gerar_dados(referencia.diretorio, 10, 10, referencia=referencia)
+    with pytest.raises(SystemExit):
+        gerador_sintetico.main(["--clientes", "10", "--oficinas", "10", "--saida", referencia.diretorio + os.sep + "."])
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+import motor
+from atribuicao import DISTANCIA_MINIMA_HUFF_KM, participacao_huff
+from distancias import distancia_km
+
+
+def huff(base, clientes, beta=2.0, raio_truncamento_km=10.0, atratividade=None):
+    return participacao_huff(
+        clientes, clientes["categoria_servico"], clientes["servico_nivel2"], base.capacidades, beta=beta,
+        raio_truncamento_km=raio_truncamento_km, atratividade=atratividade, metodo=base.metodo,
+    )
+
+
+@pytest.fixture(scope="module")
+def clientes(base):
+    return base.clientes.iloc[:500]
+
+
+@pytest.fixture(scope="module")
+def principais(base):
+    oficinas = base.oficinas[base.oficinas["categoria_servico"] == "Outros Serviços"]
+    zona = oficinas["zona"].value_counts().index[0]
+    return tuple(oficinas.loc[oficinas["zona"] == zona, "nome_oficina"].iloc[:2])
+
+
+def test_participacoes_somam_um(base, clientes):
+    linhas, colunas, participacoes = huff(base, clientes)
+    assert len(linhas) > 0 and (participacoes > 0).all()
+    np.testing.assert_allclose(np.bincount(linhas, weights=participacoes)[np.unique(linhas)], 1.0)
+
+
+@pytest.mark.parametrize("raio_truncamento_km", [1.0, 3.0, 10.0])
+def test_truncamento(base, clientes, raio_truncamento_km):
+    linhas, colunas, _ = huff(base, clientes, raio_truncamento_km=raio_truncamento_km)
+    capacidades = base.capacidades
+    d = distancia_km(clientes["latitude"].to_numpy()[linhas], clientes["longitude"].to_numpy()[linhas],
+                     capacidades.latitudes[colunas], capacidades.longitudes[colunas], base.metodo)
+    assert (d <= raio_truncamento_km).all()
+    # Raio maior só acrescenta pares
+    linhas_10, colunas_10, _ = huff(base, clientes, raio_truncamento_km=10.0)
+    assert set(zip(linhas, colunas)) <= set(zip(linhas_10, colunas_10))
+
+
+@pytest.mark.parametrize("beta", [1.0, 2.0, 3.5])
+def test_proporcional_a_atratividade_sobre_distancia(base, clientes, beta):
+    atratividade = np.linspace(1.0, 3.0, len(base.capacidades))
+    linhas, colunas, participacoes = huff(base, clientes, beta=beta, atratividade=atratividade)
+    capacidades = base.capacidades
+    d = distancia_km(clientes["latitude"].to_numpy()[linhas], clientes["longitude"].to_numpy()[linhas],
+                     capacidades.latitudes[colunas], capacidades.longitudes[colunas], base.metodo)
+    utilidade = atratividade[colunas] / np.maximum(d, DISTANCIA_MINIMA_HUFF_KM) ** beta
+    np.testing.assert_allclose(participacoes, utilidade / np.bincount(linhas, weights=utilidade)[linhas], rtol=1e-9)
+
+
+def test_dobrar_atratividade_aumenta_participacao(base, principais):
+    cenario = motor.Cenario(nome="huff", oficinas_principais=principais, raio_km=8.0, modelo=motor.MODELO_HUFF)
+    normal = motor.simular(base, cenario)
+    dobrada = motor.simular(base, motor.Cenario.de_dict({
+        "nome": "huff", "oficinas_principais": list(principais), "raio_km": 8.0, "modelo": motor.MODELO_HUFF,
+        "atratividade": {principais[0]: 2.0},
+    }))
+    clientes_normal = normal.oficinas.set_index("nome_oficina")["clientes_atendidos"]
+    clientes_dobrada = dobrada.oficinas.set_index("nome_oficina")["clientes_atendidos"]
+    assert clientes_dobrada[principais[0]] > clientes_normal[principais[0]]
+    assert dobrada.resumo["clientes_principais"] > normal.resumo["clientes_principais"]
+    # A demanda total no raio de truncamento não muda, só a divisão
+    assert clientes_dobrada.sum() == pytest.approx(clientes_normal.sum())
+
+
+def test_atratividade_da_coluna_do_cadastro(base, principais):
+    oficinas = base.oficinas.assign(**{motor.COLUNA_ATRATIVIDADE: 1.0})
+    oficinas.loc[oficinas["nome_oficina"] == principais[0], motor.COLUNA_ATRATIVIDADE] = 4.0
+    atratividade = motor.atratividade_oficinas(oficinas, {principais[1]: 3.0})
+    assert atratividade[oficinas["nome_oficina"] == principais[0]].eq(4.0).all()
+    assert atratividade[oficinas["nome_oficina"] == principais[1]].eq(3.0).all()
+    assert (atratividade[~oficinas["nome_oficina"].isin(principais)] == 1.0).all()
+    with pytest.raises(ValueError, match="fora do cadastro"):
+        motor.atratividade_oficinas(oficinas, {"Oficina inexistente": 2.0})
+    with pytest.raises(ValueError, match="positiva"):
+        motor.atratividade_oficinas(oficinas, {principais[0]: 0.0})
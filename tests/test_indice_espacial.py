@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from distancias import distancia_km
+from indice_espacial import IndiceGrade
+
+
+@pytest.fixture(scope="module")
+def pontos(base):
+    return base.clientes["latitude"].to_numpy(dtype=np.float64), base.clientes["longitude"].to_numpy(dtype=np.float64)
+
+
+@pytest.fixture(scope="module")
+def consultas(base):
+    oficinas = base.oficinas.iloc[:10]
+    return list(zip(oficinas["latitude"].to_numpy(dtype=np.float64), oficinas["longitude"].to_numpy(dtype=np.float64)))
+
+
+@pytest.mark.parametrize("metodo", ["haversine", "elipsoidal"])
+@pytest.mark.parametrize("tamanho_celula_km", [0.5, 1.0, 3.0])
+@pytest.mark.parametrize("raio_km", [0.5, 2.0, 7.5])
+def test_no_raio_igual_forca_bruta(pontos, consultas, metodo, tamanho_celula_km, raio_km):
+    latitudes, longitudes = pontos
+    indice = IndiceGrade(latitudes, longitudes, tamanho_celula_km=tamanho_celula_km, metodo=metodo)
+    for lat, lon in consultas:
+        posicoes, distancias = indice.no_raio(lat, lon, raio_km)
+        todas = distancia_km(lat, lon, latitudes, longitudes, metodo)
+        esperadas = np.flatnonzero(todas <= raio_km)
+        ordem = np.argsort(posicoes)
+        np.testing.assert_array_equal(posicoes[ordem], esperadas)
+        np.testing.assert_allclose(distancias[ordem], todas[esperadas])
+
+
+@pytest.mark.parametrize("metodo", ["haversine", "elipsoidal"])
+@pytest.mark.parametrize("k", [1, 5])
+def test_k_mais_proximos_igual_forca_bruta(base, pontos, metodo, k):
+    latitudes, longitudes = pontos
+    indice = IndiceGrade(latitudes, longitudes, tamanho_celula_km=1.0, metodo=metodo)
+    lat_consulta = base.oficinas["latitude"].to_numpy(dtype=np.float64)
+    lon_consulta = base.oficinas["longitude"].to_numpy(dtype=np.float64)
+    posicoes, distancias = indice.k_mais_proximos(lat_consulta, lon_consulta, k=k)
+    assert posicoes.shape == distancias.shape == (len(lat_consulta), k)
+    for i, (lat, lon) in enumerate(zip(lat_consulta, lon_consulta)):
+        todas = distancia_km(lat, lon, latitudes, longitudes, metodo)
+        np.testing.assert_allclose(distancias[i], np.sort(todas)[:k])
+        np.testing.assert_allclose(todas[posicoes[i]], distancias[i])
+
+
+def test_k_maior_que_o_indice_completa_com_vazios():
+    indice = IndiceGrade([-23.55, -23.56], [-46.63, -46.64])
+    posicoes, distancias = indice.k_mais_proximos([-23.55], [-46.63], k=4)
+    assert sorted(posicoes[0, :2]) == [0, 1]
+    np.testing.assert_array_equal(posicoes[0, 2:], [-1, -1])
+    assert np.isinf(distancias[0, 2:]).all()
@@ -0,0 +1,72 @@
+import json
+import logging
+import time
+
+import pytest
+
+import instrumentacao
+from instrumentacao import Medidor, configurar_log, logger
+
+
+@pytest.fixture
+def log(tmp_path):
+    """Log JSON lines temporário; os handlers do logger são restaurados no fim"""
+    handlers = list(logger.handlers)
+    caminho = tmp_path / "desempenho.jsonl"
+    yield caminho
+    for handler in logger.handlers[len(handlers):]:
+        handler.close()
+        logger.removeHandler(handler)
+
+
+def test_registros_das_etapas():
+    medidor = Medidor({"raio_km": 5.0})
+    with medidor.etapa("filtros", 100) as registro:
+        time.sleep(0.01)
+        registro["linhas_saida"] = 40
+    registro = medidor.iniciar("raio", 40)
+    medidor.concluir(registro, linhas_saida=7)
+
+    @medidor.medir("tabelas")
+    def dobrar(x):
+        return 2 * x
+
+    assert dobrar(3) == 6
+    tabela = medidor.tabela()
+    assert tabela["etapa"].tolist() == ["filtros", "raio", "tabelas"]
+    assert tabela["linhas_entrada"].tolist()[:2] == [100, 40]
+    assert tabela["linhas_saida"].tolist()[:2] == [40, 7]
+    assert tabela["segundos"].iloc[0] >= 0.01
+    assert not any(chave.startswith("_") for registro in medidor.registros for chave in registro)
+
+
+def test_etapa_registrada_mesmo_com_excecao():
+    medidor = Medidor()
+    with pytest.raises(RuntimeError):
+        with medidor.etapa("falha"):
+            raise RuntimeError("erro")
+    assert [r["etapa"] for r in medidor.registros] == ["falha"]
+
+
+def test_log_json_lines(log, monkeypatch):
+    monkeypatch.delenv(instrumentacao.VARIAVEL_LOG, raising=False)
+    assert configurar_log() is None
+    monkeypatch.setenv(instrumentacao.VARIAVEL_LOG, str(log))
+    assert configurar_log() == str(log)
+    # Uma nova execução do script não duplica o handler
+    configurar_log()
+    assert sum(isinstance(h, logging.FileHandler) and h.baseFilename == str(log) for h in logger.handlers) == 1
+
+    medidor = Medidor({"segmentos": ["Frota"]})
+    with medidor.etapa("carregar", 10):
+        pass
+    with medidor.etapa("mapa"):
+        pass
+    for handler in logger.handlers:
+        handler.flush()
+
+    linhas = [json.loads(linha) for linha in log.read_text(encoding="utf-8").splitlines()]
+    assert [linha["etapa"] for linha in linhas] == ["carregar", "mapa"]
+    assert {linha["execucao"] for linha in linhas} == {medidor.execucao}
+    assert linhas[0]["contexto"] == {"segmentos": ["Frota"]} and linhas[0]["linhas_entrada"] == 10
+    assert {"segundos", "momento", "memoria_delta_mb"} <= set(linhas[0])
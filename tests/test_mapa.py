@@ -0,0 +1,48 @@
+import folium
+import numpy as np
+import pandas as pd
+import pytest
+
+from mapa import NIVEIS_DENSIDADE, adicionar_densidade, adicionar_oficinas_agrupadas, binar_pontos, camadas_densidade
+
+
+@pytest.fixture(scope="module")
+def pontos(base):
+    return base.clientes["latitude"].to_numpy(np.float64), base.clientes["longitude"].to_numpy(np.float64)
+
+
+@pytest.mark.parametrize("celula", [0.01, 0.003, 0.001])
+def test_binagem_igual_groupby(pontos, celula):
+    latitudes, longitudes = pontos
+    binados = binar_pontos(latitudes, longitudes, celula)
+    esperado = (
+        pd.DataFrame({"lat": latitudes, "lon": longitudes,
+                      "i": np.floor(latitudes / celula), "j": np.floor(longitudes / celula)})
+        .groupby(["i", "j"]).agg(lat=("lat", "mean"), lon=("lon", "mean"), peso=("lat", "size"))
+    )
+    assert binados[:, 2].sum() == len(latitudes)
+    np.testing.assert_array_equal(binados[:, 2], esperado["peso"].to_numpy())
+    np.testing.assert_allclose(binados[:, 0], esperado["lat"].to_numpy(), atol=1e-5)
+    np.testing.assert_allclose(binados[:, 1], esperado["lon"].to_numpy(), atol=1e-5)
+
+
+def test_camadas_por_zoom(pontos):
+    camadas = camadas_densidade(*pontos)
+    assert [(zoom_min, zoom_max) for zoom_min, zoom_max, _ in camadas] == [n[:2] for n in NIVEIS_DENSIDADE]
+    # Células menores nunca juntam mais pontos
+    tamanhos = [len(p) for _, _, p in camadas]
+    assert tamanhos == sorted(tamanhos)
+    assert len(binar_pontos([], [], 0.01)) == 0
+
+
+def test_html_do_mapa(base, pontos):
+    mapa = folium.Map(location=[-23.55, -46.63], zoom_start=12)
+    adicionar_densidade(mapa, camadas_densidade(*pontos), radius=15)
+    oficinas = base.oficinas.iloc[:10]
+    adicionar_oficinas_agrupadas(mapa, oficinas, "Principal", ["red"] * len(oficinas))
+    adicionar_oficinas_agrupadas(mapa, oficinas.iloc[:0], "Concorrente", [])
+    html = mapa.get_root().render()
+    assert html.count("L.heatLayer(") == len(NIVEIS_DENSIDADE)
+    assert html.count("mapa.on(\"zoomend\"") == 1
+    assert html.count("L.AwesomeMarkers.icon") == 1
+    assert f"Principal: {oficinas['nome_oficina'].iloc[0]}" in html
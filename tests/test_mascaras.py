@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mascaras import MAXIMO_ITENS, CodificadorBits, filtrar_mascara, separar_itens
+
+
+def test_separar_itens():
+    assert separar_itens("Meoo, GF") == ["Meoo", "GF"]
+    assert separar_itens("Meoo_GF") == ["Meoo", "GF"]
+    assert separar_itens("GF") == ["GF"]
+    assert separar_itens(" , ") == []
+
+
+def test_codificar_e_decodificar():
+    codificador = CodificadorBits(["Meoo", "GF", "Pesados"])
+    serie = pd.Series(["Meoo, GF", "GF", None, "Outro", "Meoo_GF"])
+    mascaras = codificador.codificar(serie, separar=separar_itens)
+    assert [sorted(codificador.decodificar(m)) for m in mascaras] == [["GF", "Meoo"], ["GF"], [], [], ["GF", "Meoo"]]
+    assert codificador.codificar(pd.Series(["GF", "Meoo"])).tolist() == [codificador.mascara(["GF"]), codificador.mascara(["Meoo"])]
+
+
+def test_filtro_igual_a_separar_textos():
+    rng = np.random.default_rng(2)
+    valores = ["Meoo", "GF", "Pesados", "Motos"]
+    textos = pd.Series([", ".join(rng.choice(valores, rng.integers(1, 4), replace=False)) for _ in range(500)])
+    codificador = CodificadorBits(valores)
+    mascaras = codificador.codificar(textos, separar=separar_itens)
+    for selecao in (["GF"], ["Meoo", "Motos"], ["Inexistente"], valores):
+        esperado = [bool(set(separar_itens(texto)) & set(selecao)) for texto in textos]
+        np.testing.assert_array_equal(filtrar_mascara(mascaras, codificador.mascara(selecao)), esperado)
+
+
+def test_vocabulario_limitado_a_um_int64():
+    CodificadorBits(range(MAXIMO_ITENS))
+    with pytest.raises(ValueError, match="excede"):
+        CodificadorBits(range(MAXIMO_ITENS + 1))
+    # O último bit ainda é positivo e filtra corretamente
+    codificador = CodificadorBits(range(MAXIMO_ITENS))
+    ultimo = codificador.mascara([MAXIMO_ITENS - 1])
+    assert ultimo > 0 and filtrar_mascara([ultimo, 1], ultimo).tolist() == [True, False]
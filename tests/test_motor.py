@@ -0,0 +1,102 @@
+"""Golden: ``motor.simular`` contra a lógica do app original (laços por linha com geopy)."""
+
+import numpy as np
+import pytest
+
+import motor
+from classificacao import get_service_category, get_service_level2
+from mascaras import separar_itens
+
+
+def simular_como_app_original(clientes_df, oficinas_df, principais, raio_km, zonas=(), categorias=()):
+    """Filtros, raio do centroide, oficina mais próxima e raio dos concorrentes como no app antes do motor"""
+    geodesic = pytest.importorskip("geopy.distance").geodesic
+    clientes, oficinas = clientes_df, oficinas_df
+    if zonas:
+        clientes = clientes[clientes["zona"].isin(zonas)]
+        oficinas = oficinas[oficinas["zona"].isin(zonas)]
+    if categorias:
+        clientes = clientes[clientes["nivel_1_servico"].isin(categorias)]
+        oficinas = oficinas[oficinas["categoria_servico"].isin(categorias)]
+
+    # As principais vêm do cadastro inteiro, sem os filtros
+    principais_df = oficinas_df[oficinas_df["nome_oficina"].isin(principais)]
+    centro = (principais_df["latitude"].mean(), principais_df["longitude"].mean())
+
+    def no_raio(df):
+        return df[[geodesic((lat, lon), centro).km <= raio_km for lat, lon in zip(df["latitude"], df["longitude"])]]
+
+    clientes_no_raio = no_raio(clientes)
+    oficinas_no_raio = no_raio(oficinas)
+    concorrentes = oficinas_no_raio[~oficinas_no_raio["nome_oficina"].isin(principais)]
+    opcoes = principais_df.to_dict("records") + concorrentes.to_dict("records")
+
+    atribuidas, no_raio_concorrente = [], []
+    for _, cliente in clientes_no_raio.iterrows():
+        posicao = (cliente["latitude"], cliente["longitude"])
+        mais_proxima, menor = motor.ATENDIMENTO_NENHUM, float("inf")
+        for oficina in opcoes:
+            if cliente["segmento"] in separar_itens(oficina["segmento"]) and (
+                oficina["categoria_servico"] == get_service_category(cliente["tipo_servico_demandado"])
+                or oficina["servico_nivel2"] == get_service_level2(cliente["tipo_servico_demandado"])
+            ):
+                d = geodesic(posicao, (oficina["latitude"], oficina["longitude"])).km
+                if d < menor:
+                    mais_proxima, menor = oficina["nome_oficina"], d
+        atribuidas.append(mais_proxima)
+        no_raio_concorrente.append(any(
+            geodesic(posicao, (c["latitude"], c["longitude"])).km <= raio_km for c in concorrentes.to_dict("records")
+        ))
+    atribuidas = np.array(atribuidas, dtype=object)
+
+    resumo = {
+        "clientes_filtro": len(clientes),
+        "oficinas_filtro": len(oficinas),
+        "clientes_raio": len(clientes_no_raio),
+        "oficinas_raio": len(oficinas_no_raio),
+        "concorrentes_raio": len(concorrentes),
+        "clientes_principais": int(np.isin(atribuidas, principais_df["nome_oficina"]).sum()),
+        "clientes_concorrentes": int(np.isin(atribuidas, concorrentes["nome_oficina"]).sum()),
+        "clientes_no_raio_concorrente": int(sum(no_raio_concorrente)),
+    }
+    return resumo, atribuidas
+
+
+@pytest.fixture(scope="module")
+def principais(base):
+    """Duas oficinas de serviços gerais na zona com mais oficinas (próximas e com clientes compatíveis)"""
+    oficinas = base.oficinas[base.oficinas["categoria_servico"] == "Outros Serviços"]
+    zona = oficinas["zona"].value_counts().index[0]
+    return tuple(oficinas.loc[oficinas["zona"] == zona, "nome_oficina"].iloc[:2])
+
+
+@pytest.mark.parametrize("raio_km, filtrar_zona, categorias", [
+    (4.0, False, ()),
+    (6.5, True, ("Mecânica", "Funilaria e Pintura", "Outros Serviços")),
+])
+def test_simular_igual_ao_app_original(base, principais, raio_km, filtrar_zona, categorias):
+    filtros = {"categorias": categorias}
+    if filtrar_zona:
+        filtros["zonas"] = (str(base.oficinas.loc[base.oficinas["nome_oficina"] == principais[0], "zona"].iloc[0]),)
+    resultado = motor.simular(base, motor.Cenario(nome="golden", oficinas_principais=principais, raio_km=raio_km, **filtros))
+    esperado, atribuidas = simular_como_app_original(base.clientes, base.oficinas, principais, raio_km, **filtros)
+
+    assert esperado["clientes_principais"] > 0 and esperado["clientes_concorrentes"] > 0
+    assert {chave: resultado.resumo[chave] for chave in esperado} == esperado
+    np.testing.assert_array_equal(resultado.clientes["nome_oficina_mais_proxima"].to_numpy(dtype=object), atribuidas)
+
+
+def test_congelar_base_protege_arrays_e_dataframes(diretorio_dados):
+    base = motor.congelar_base(motor.carregar_base(diretorio_dados))
+    for array in (base.indice_clientes.latitudes, base.capacidades.unitarios):
+        assert not array.flags.writeable
+        with pytest.raises(ValueError):
+            array[0] = 0
+    # Colunas novas e alterações em seleções (copy-on-write) não chegam à base
+    latitudes = base.clientes["latitude"].to_numpy().copy()
+    selecao = base.clientes.iloc[:10]
+    selecao["latitude"] = 0.0
+    derivada = base.clientes.assign(coluna_nova=1)
+    derivada.loc[:, "latitude"] = 0.0
+    assert "coluna_nova" not in base.clientes
+    np.testing.assert_array_equal(base.clientes["latitude"].to_numpy(), latitudes)
@@ -0,0 +1,82 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from distancias import distancia_km
+from mascaras import filtrar_mascara
+from otimizacao import coberturas, limiar_concorrencia, otimizar_cenario, pesos_objetivo, preparar_candidatas, selecionar_locais
+
+
+@pytest.fixture(scope="module")
+def problema(base):
+    """Clientes, 12 candidatas e os demais como concorrentes (com peso pelo valor do serviço)"""
+    clientes = base.clientes.iloc[:1500]
+    candidatas_df, candidatas = preparar_candidatas(base.oficinas.iloc[:12], base.codificadores)
+    concorrentes = base.capacidades.linhas(base.capacidades.posicoes(base.oficinas.index[12:]))
+    limiar = limiar_concorrencia(clientes, concorrentes, base.metodo)
+    pesos = pesos_objetivo(clientes, "valor_estimado_servico")
+    return clientes, candidatas_df, candidatas, limiar, pesos
+
+
+def test_coberturas_iguais_forca_bruta(base, problema):
+    clientes, candidatas_df, candidatas, limiar, _ = problema
+    cobertura = coberturas(clientes, candidatas, limiar, base.metodo)
+    for j, candidata in candidatas_df.iterrows():
+        compativel = filtrar_mascara(clientes["mascara_segmento"], candidata["mascara_segmento"]) & (
+            (clientes["categoria_servico"].astype(object) == candidata["categoria_servico"])
+            | (clientes["servico_nivel2"].astype(object) == candidata["servico_nivel2"])
+        ).to_numpy()
+        d = distancia_km(clientes["latitude"].to_numpy(np.float64), clientes["longitude"].to_numpy(np.float64),
+                         candidatas.latitudes[j], candidatas.longitudes[j], base.metodo)
+        np.testing.assert_array_equal(cobertura[j], np.flatnonzero(compativel & (d <= limiar)))
+
+
+def valor(cobertura, pesos, escolhidas):
+    capturado = np.zeros(len(pesos), dtype=bool)
+    for j in escolhidas:
+        capturado[cobertura[j]] = True
+    return pesos[capturado].sum()
+
+
+@pytest.mark.parametrize("k", [1, 2, 3])
+def test_guloso_contra_forca_bruta(base, problema, k):
+    clientes, _, candidatas, limiar, pesos = problema
+    cobertura = coberturas(clientes, candidatas, limiar, base.metodo)
+    selecao, capturado = selecionar_locais(cobertura, pesos, k)
+    escolhidas = [j for j, _ in selecao]
+    assert len(escolhidas) == k
+    assert pesos[capturado].sum() == pytest.approx(valor(cobertura, pesos, escolhidas))
+
+    otimo = max(valor(cobertura, pesos, combinacao) for combinacao in combinations(range(len(cobertura)), k))
+    if k == 1:
+        assert pesos[capturado].sum() == pytest.approx(otimo)
+    # Garantia do guloso em cobertura ponderada
+    assert pesos[capturado].sum() >= (1 - 1 / np.e) * otimo - 1e-9
+
+    # O guloso preguiçoso escolhe o mesmo que o guloso que reavalia todas as candidatas a cada passo
+    escolhidas_simples = []
+    for _ in range(k):
+        ganhos = [valor(cobertura, pesos, escolhidas_simples + [j]) if j not in escolhidas_simples else -1.0
+                  for j in range(len(cobertura))]
+        escolhidas_simples.append(int(np.argmax(ganhos)))
+    assert escolhidas == escolhidas_simples
+
+
+def test_nova_candidata_usa_servico_informado(base):
+    segmento = str(base.clientes["segmento"].iloc[0])
+    centro = base.clientes[["latitude", "longitude"]].astype(np.float64).mean()
+    # Pelo nome seria "Outros Serviços"/"Não Especificado"; o serviço informado é freios
+    nova = pd.DataFrame([{
+        "nome_oficina": "Novo Ponto Centro", "latitude": centro["latitude"], "longitude": centro["longitude"],
+        "segmento": segmento, "categoria_servico": "Freios", "servico_nivel2": "Manutenção de Freios",
+    }])
+    tabela, capturado = otimizar_cenario(base, 1, novas_candidatas=nova, concorrentes=[])
+    clientes = base.clientes
+    esperado = (clientes["segmento"].astype(str) == segmento) & (
+        (clientes["categoria_servico"] == "Freios") | (clientes["servico_nivel2"] == "Manutenção de Freios")
+    )
+    assert tabela["nome_oficina"].tolist() == ["Novo Ponto Centro"]
+    assert esperado.any()
+    np.testing.assert_array_equal(capturado, esperado.to_numpy())
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import motor
+from atribuicao import perfis_compativeis
+from distancias import distancia_km
+from rede_viaria import RedeViaria, atribuir_oficina_mais_rapida, criar_grafo, salvar_grafo, tempos_ate_nos
+
+
+def grafo_grade(lat0, lat1, lon0, lon1, passo, semente=0):
+    """Grade de ruas de mão dupla com velocidades sorteadas"""
+    latitudes, longitudes = np.meshgrid(np.arange(lat0, lat1, passo), np.arange(lon0, lon1, passo), indexing="ij")
+    ids = np.arange(latitudes.size).reshape(latitudes.shape)
+    origem = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+    destino = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+    km = distancia_km(latitudes.ravel()[origem], longitudes.ravel()[origem], latitudes.ravel()[destino], longitudes.ravel()[destino])
+    minutos = km / np.random.default_rng(semente).choice([20.0, 30.0, 50.0], len(origem)) * 60
+    return criar_grafo(latitudes.ravel(), longitudes.ravel(), np.r_[origem, destino], np.r_[destino, origem], np.r_[minutos, minutos])
+
+
+def floyd_warshall(grafo):
+    n = len(grafo)
+    tempos = np.full((n, n), np.inf)
+    np.fill_diagonal(tempos, 0.0)
+    tempos[grafo.origem, grafo.destino] = grafo.minutos
+    for k in range(n):
+        tempos = np.minimum(tempos, tempos[:, k, None] + tempos[None, k, :])
+    return tempos
+
+
+def test_tempos_iguais_floyd_warshall():
+    rng = np.random.default_rng(4)
+    n = 40
+    origem, destino = rng.integers(0, n, 160), rng.integers(0, n, 160)
+    grafo = criar_grafo(rng.random(n), rng.random(n), origem, destino, rng.uniform(0.5, 10.0, 160))
+    fontes = np.array([0, 7, 7, 39])
+    limite = 12.0
+    # Linha i: tempo de cada nó até a fonte i (sentido nó -> fonte)
+    esperado = floyd_warshall(grafo)[:, fontes].T
+    esperado[esperado > limite] = np.inf
+    np.testing.assert_allclose(tempos_ate_nos(grafo, fontes, limite), esperado, rtol=1e-6)
+
+
+@pytest.fixture(scope="module")
+def base_rede(diretorio_dados, tmp_path_factory):
+    clientes = pd.read_csv(f"{diretorio_dados}/{motor.ARQUIVO_CLIENTES}", usecols=["latitude", "longitude"])
+    caminho = str(tmp_path_factory.mktemp("rede") / "grafo.npz")
+    salvar_grafo(grafo_grade(clientes["latitude"].min() - 0.01, clientes["latitude"].max() + 0.01,
+                             clientes["longitude"].min() - 0.01, clientes["longitude"].max() + 0.01, 0.01), caminho)
+    return motor.carregar_base(diretorio_dados, arquivo_grafo=caminho)
+
+
+def test_cache_de_tempos(base_rede, tmp_path):
+    rede = RedeViaria(base_rede.rede.grafo, str(tmp_path))
+    nos = np.array([3, 1, 4, 1])
+    calculados = rede.tempos_ate(nos)
+    assert len(list(tmp_path.iterdir())) == 1
+    lidos = rede.tempos_ate(nos)
+    assert isinstance(lidos, np.memmap)
+    np.testing.assert_array_equal(lidos, calculados)
+    np.testing.assert_array_equal(lidos, tempos_ate_nos(rede.grafo, nos, rede.limite_minutos))
+
+
+def test_submatriz_recusa_oficina_desconhecida(base_rede):
+    tempos = base_rede.tempos_oficinas
+    ids = base_rede.oficinas.index[:3]
+    assert tempos.submatriz(ids, [0, 1]).shape == (3, 2)
+    with pytest.raises(ValueError, match="sem tempos"):
+        tempos.submatriz([ids[0], -99], [0, 1])
+
+
+def test_mais_rapida_igual_laco_por_cliente(base_rede):
+    clientes = base_rede.clientes.iloc[:300]
+    capacidades = base_rede.capacidades
+    tempos = base_rede.tempos_oficinas
+    pesos = clientes["receita_anual"].to_numpy()
+    posicao, minutos, totais = atribuir_oficina_mais_rapida(
+        clientes, clientes["categoria_servico"], clientes["servico_nivel2"], capacidades, tempos, tamanho_bloco=32, pesos=pesos
+    )
+
+    esperada_posicao = np.full(len(clientes), -1)
+    esperados_minutos = np.full(len(clientes), np.inf)
+    completa = tempos.tempos[tempos.linhas] + tempos.acesso[:, None]
+    for perfil, colunas in perfis_compativeis(clientes, clientes["categoria_servico"], clientes["servico_nivel2"], capacidades):
+        for cliente in perfil:
+            no = clientes["no_rede"].iloc[cliente]
+            opcoes = completa[tempos.ids.get_indexer(capacidades.ids[colunas]), no]
+            if np.isfinite(opcoes).any():
+                esperada_posicao[cliente] = colunas[np.argmin(opcoes)]
+                esperados_minutos[cliente] = opcoes.min() + clientes["acesso_rede_min"].iloc[cliente]
+    assert (esperada_posicao >= 0).any()
+    np.testing.assert_array_equal(posicao, esperada_posicao)
+    np.testing.assert_allclose(minutos, esperados_minutos, rtol=1e-5)
+    atribuidos = posicao >= 0
+    np.testing.assert_allclose(totais, np.bincount(posicao[atribuidos], weights=pesos[atribuidos], minlength=len(capacidades)))
+
+
+def test_simular_por_tempo(base_rede):
+    principais = tuple(base_rede.oficinas["nome_oficina"].iloc[:2])
+    resultado = motor.simular(base_rede, motor.Cenario(nome="tempo", oficinas_principais=principais, raio_minutos=20.0))
+    assert np.isnan(resultado.resumo["raio_km"]) and resultado.resumo["raio_minutos"] == 20.0
+    assert resultado.resumo["clientes_raio"] > 0
+    assert (resultado.clientes["tempo_oficina_mais_proxima_min"].dropna() >= 0).all()
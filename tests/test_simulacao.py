@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import motor
+from demanda import visitas_por_ano
+from simulacao import simular_cenario_demanda, simular_demanda
+
+
+@pytest.fixture(scope="module")
+def demanda():
+    rng = np.random.default_rng(11)
+    n = 400
+    ids_oficina = rng.choice([-1, 3, 8, 20, 21], n)
+    visitas_ano = rng.choice([1.0, 2.0, 4.0, 12.0], n)
+    valores = rng.uniform(100.0, 900.0, n)
+    return ids_oficina, visitas_ano, valores
+
+
+def test_media_perto_do_valor_esperado(demanda):
+    ids_oficina, visitas_ano, valores = demanda
+    resultado = simular_demanda(ids_oficina, visitas_ano, valores, replicacoes=4000, horizonte_dias=90.0, semente=1)
+    resumo = resultado.resumo
+    np.testing.assert_array_equal(resultado.ids, [3, 8, 20, 21])
+    atendidos = ids_oficina >= 0
+    taxa = visitas_ano * 90.0 / 365.0
+    for id_oficina in resultado.ids:
+        clientes = ids_oficina == id_oficina
+        assert resumo.loc[id_oficina, "servicos_esperado"] == pytest.approx(taxa[clientes].sum())
+        assert resumo.loc[id_oficina, "receita_esperado"] == pytest.approx((taxa * valores)[clientes].sum())
+    for nome in ("servicos", "receita"):
+        amostras = getattr(resultado, nome)
+        erro_padrao = amostras.std(axis=0, ddof=1) / np.sqrt(len(amostras))
+        assert (np.abs(resumo[f"{nome}_media"] - resumo[f"{nome}_esperado"]) < 4 * erro_padrao).all()
+        assert (resumo[f"{nome}_ic_inf"] < resumo[f"{nome}_media"]).all()
+        assert (resumo[f"{nome}_faixa_inf"] <= resumo[f"{nome}_faixa_sup"]).all()
+    # Soma de Poisson independentes: variância igual à média
+    np.testing.assert_allclose(resultado.servicos.var(axis=0, ddof=1), resumo["servicos_esperado"], rtol=0.1)
+    assert resultado.servicos.sum(axis=1).mean() == pytest.approx(taxa[atendidos].sum(), rel=0.01)
+
+
+def test_mesma_semente_mesmo_resultado(demanda):
+    primeiro = simular_demanda(*demanda, replicacoes=300, semente=42)
+    segundo = simular_demanda(*demanda, replicacoes=300, semente=42)
+    outro = simular_demanda(*demanda, replicacoes=300, semente=43)
+    np.testing.assert_array_equal(primeiro.servicos, segundo.servicos)
+    np.testing.assert_array_equal(primeiro.receita, segundo.receita)
+    assert not np.array_equal(primeiro.receita, outro.receita)
+
+
+def test_sem_ruido_receita_e_servicos_vezes_valor():
+    ids_oficina = np.array([5, 5, 7, -1])
+    resultado = simular_demanda(ids_oficina, [12.0, 6.0, 4.0, 50.0], [100.0, 100.0, 250.0, 999.0],
+                                replicacoes=200, ruido_valor=0.0, semente=0)
+    np.testing.assert_allclose(resultado.receita[:, 0], resultado.servicos[:, 0] * 100.0)
+    np.testing.assert_allclose(resultado.receita[:, 1], resultado.servicos[:, 1] * 250.0)
+    vazio = simular_demanda(np.full(3, -1), np.ones(3), np.ones(3), replicacoes=10, semente=0)
+    assert vazio.servicos.shape == (10, 0) and vazio.resumo.empty
+
+
+def test_simular_cenario(base):
+    principais = tuple(base.oficinas["nome_oficina"].iloc[:2])
+    resultado = motor.simular(base, motor.Cenario(nome="mc", oficinas_principais=principais, raio_km=5.0))
+    monte_carlo = simular_cenario_demanda(resultado, replicacoes=200, semente=0)
+    assert set(monte_carlo.resumo["nome_oficina"]) <= set(resultado.oficinas["nome_oficina"])
+    atendidos = resultado.clientes[resultado.clientes["oficina_mais_proxima"] >= 0]
+    assert monte_carlo.resumo["servicos_esperado"].sum() == pytest.approx(visitas_por_ano(atendidos["frequencia_demanda"]).sum())
+    huff = motor.simular(base, motor.Cenario(nome="huff", oficinas_principais=principais, raio_km=5.0, modelo=motor.MODELO_HUFF))
+    with pytest.raises(ValueError, match="oficina mais próxima"):
+        simular_cenario_demanda(huff)
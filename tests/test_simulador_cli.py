@@ -0,0 +1,54 @@
+import json
+import zipfile
+
+import pandas as pd
+import pytest
+
+import motor
+import simulador_cli
+
+
+@pytest.fixture
+def arquivo_cenarios(base, tmp_path):
+    nomes = base.oficinas["nome_oficina"]
+    conteudo = {
+        "padrao": {"raio_km": 5},
+        "cenarios": [
+            {"nome": "um", "oficinas_principais": [nomes.iloc[0]]},
+            {"nome": "dois", "oficinas_principais": [nomes.iloc[1], nomes.iloc[2]], "raio_km": 3},
+            {"nome": "invalido", "oficinas_principais": ["Oficina inexistente"]},
+        ],
+    }
+    caminho = tmp_path / "cenarios.json"
+    caminho.write_text(json.dumps(conteudo), encoding="utf-8")
+    return caminho
+
+
+def test_resumo_igual_simular(base, diretorio_dados, arquivo_cenarios, tmp_path):
+    saida = tmp_path / "saida"
+    codigo = simulador_cli.main([str(arquivo_cenarios), "--dados", diretorio_dados, "--saida", str(saida),
+                                 "--formato", "csv", "--detalhes", "--replicacoes", "50", "--semente", "0"])
+    # O cenário inválido fica registrado no resumo e a execução termina com falha
+    assert codigo == 1
+    resumo = pd.read_csv(saida / "resumo.csv").set_index("cenario")
+    assert "nenhuma oficina principal" in resumo.loc["invalido", "erro"]
+    for cenario in simulador_cli.ler_cenarios(json.loads(arquivo_cenarios.read_text(encoding="utf-8")))[:2]:
+        esperado = motor.simular(base, cenario).resumo
+        for campo in ("clientes_raio", "clientes_principais", "clientes_concorrentes", "receita_principais"):
+            assert resumo.loc[cenario.nome, campo] == pytest.approx(esperado[campo])
+    for tabela in ("cubos", "clientes", "oficinas", "demanda"):
+        assert set(pd.read_csv(saida / f"{tabela}.csv")["cenario"]) == {"um", "dois"}
+
+
+def test_zip_por_cenario(diretorio_dados, arquivo_cenarios, tmp_path):
+    caminho_zip = tmp_path / "resultados.zip"
+    simulador_cli.main([str(arquivo_cenarios), "--dados", diretorio_dados, "--zip", str(caminho_zip), "--formato", "parquet"])
+    with zipfile.ZipFile(caminho_zip) as arquivo:
+        assert arquivo.namelist() == ["um/cubos.parquet", "dois/cubos.parquet", "resumo.parquet"]
+
+
+def test_cenarios_repetidos_recusados():
+    with pytest.raises(ValueError, match="repetidos: a"):
+        simulador_cli.ler_cenarios([{"nome": "a", "oficinas_principais": ["x"]}, {"nome": "a", "oficinas_principais": ["y"]}])
+    with pytest.raises(ValueError, match="não vazia"):
+        simulador_cli.ler_cenarios({"cenarios": []})
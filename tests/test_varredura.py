@@ -0,0 +1,51 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import motor
+from varredura import expandir_grade, varrer
+
+CAMPOS = ("clientes_raio", "concorrentes_raio", "concorrentes_ativos", "clientes_principais",
+          "clientes_concorrentes", "clientes_sem_oficina", "receita_principais", "receita_concorrentes")
+
+
+@pytest.fixture(scope="module")
+def cenarios(base):
+    nomes = base.oficinas["nome_oficina"]
+    segmento = str(base.clientes["segmento"].iloc[0])
+    return expandir_grade(
+        [(nomes.iloc[0],), (nomes.iloc[3], nomes.iloc[10])],
+        raios_km=(2.0, 6.0),
+        segmentos=((), (segmento,)),
+        conjuntos_concorrentes=(None, tuple(nomes.iloc[20:40])),
+    )
+
+
+def test_expandir_grade(base, cenarios):
+    nomes = base.oficinas["nome_oficina"]
+    grade = itertools.product(
+        [(nomes.iloc[0],), (nomes.iloc[3], nomes.iloc[10])], (2.0, 6.0),
+        ((), (str(base.clientes["segmento"].iloc[0]),)), (None, tuple(nomes.iloc[20:40])),
+    )
+    assert [(c.oficinas_principais, c.raio_km, c.segmentos, c.concorrentes) for c in cenarios] == list(grade)
+    assert len({c.nome for c in cenarios}) == len(cenarios)
+
+
+@pytest.mark.parametrize("processos", [1, 2])
+def test_varredura_igual_simular_em_sequencia(base, cenarios, processos):
+    tabela = varrer(base, cenarios, processos=processos, tamanho_lote=3).set_index("cenario")
+    assert (tabela["posicao"].to_numpy() == np.arange(1, len(cenarios) + 1)).all()
+    assert tabela["clientes_principais"].is_monotonic_decreasing
+    for cenario in cenarios:
+        resumo = motor.simular(base, cenario).resumo
+        linha = tabela.loc[cenario.nome]
+        for campo in CAMPOS:
+            assert linha[campo] == pytest.approx(resumo[campo]), (cenario.nome, campo)
+
+
+def test_varredura_recusa_cenario_invalido(base, cenarios):
+    with pytest.raises(ValueError, match="não encontradas"):
+        varrer(base, [motor.Cenario(nome="x", oficinas_principais=("Oficina inexistente",))], processos=1)
+    with pytest.raises(ValueError, match="Critério"):
+        varrer(base, cenarios, processos=1, ordenar_por="nome")
@@ -0,0 +1,208 @@
+"""Varredura paralela de cenários: oficinas principais x raio x segmentos x concorrentes.
+
+Os arrays de clientes e oficinas (coordenadas, máscaras, códigos de serviço
+e a matriz de capacidades) são gravados uma vez como ``.npy`` em um
+diretório temporário e abertos com memory-map por cada processo do pool;
+cada tarefa leva só os parâmetros do cenário (posições das principais,
+raio, máscara de segmento, concorrentes). O resultado é uma tabela de
+cenários ordenada pelos clientes (ou pela receita anual) capturados pelas
+principais.
+"""
+
+import itertools
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import motor
+from agregacao import ATENDIMENTO_CONCORRENTES, ATENDIMENTO_NENHUM, ATENDIMENTO_PRINCIPAIS
+from atribuicao import MatrizCapacidades
+from indice_espacial import IndiceGrade
+from mascaras import filtrar_mascara
+
+# Campos array da MatrizCapacidades compartilhados entre os processos
+CAMPOS_CAPACIDADES = ("ids", "latitudes", "longitudes", "unitarios", "mascara_segmento", "mascara_servicos", "codigo_categoria", "codigo_nivel2")
+
+CRITERIOS_ORDENACAO = ("clientes_principais", "receita_principais")
+
+ROTULO_TODOS_SEGMENTOS = "Todos"
+ROTULO_TODOS_CONCORRENTES = "Todos no raio"
+
+# Contexto de cada processo do pool (arrays em memory-map, índices e capacidades)
+_CONTEXTO = {}
+
+
+def expandir_grade(conjuntos_principais, raios_km=(motor.RAIO_PADRAO_KM,), segmentos=((),), conjuntos_concorrentes=(None,)):
+    """Lista de ``motor.Cenario`` com todas as combinações da grade.
+
+    ``segmentos`` é uma lista de seleções (``()`` = todos os segmentos) e
+    ``conjuntos_concorrentes`` uma lista de conjuntos de nomes (``None`` = todos
+    os concorrentes no raio).
+    """
+    combinacoes = itertools.product(conjuntos_principais, raios_km, segmentos, conjuntos_concorrentes)
+    return [
+        motor.Cenario(
+            nome=f"varredura_{i + 1:05d}",
+            oficinas_principais=tuple(principais),
+            raio_km=float(raio),
+            segmentos=tuple(selecao),
+            concorrentes=None if concorrentes is None else tuple(concorrentes),
+        )
+        for i, (principais, raio, selecao, concorrentes) in enumerate(combinacoes)
+    ]
+
+
+def gravar_compartilhados(base, diretorio):
+    """Grava os arrays usados pela varredura em ``diretorio`` e devolve os metadados para os processos"""
+    clientes = base.clientes
+    codigo_categoria, categorias = pd.factorize(clientes["categoria_servico"])
+    codigo_nivel2, niveis2 = pd.factorize(clientes["servico_nivel2"])
+    arrays = {
+        "clientes_latitude": clientes["latitude"].to_numpy(),
+        "clientes_longitude": clientes["longitude"].to_numpy(),
+        "clientes_mascara_segmento": clientes["mascara_segmento"].to_numpy(dtype=np.int64),
+        "clientes_mascara_servico": clientes["mascara_servico"].to_numpy(dtype=np.int64),
+        "clientes_codigo_categoria": codigo_categoria.astype(np.int32),
+        "clientes_codigo_nivel2": codigo_nivel2.astype(np.int32),
+        "clientes_receita_anual": clientes["receita_anual"].to_numpy(dtype=np.float64),
+        "oficinas_latitude": base.oficinas["latitude"].to_numpy(),
+        "oficinas_longitude": base.oficinas["longitude"].to_numpy(),
+    }
+    for campo in CAMPOS_CAPACIDADES:
+        arrays[f"capacidades_{campo}"] = getattr(base.capacidades, campo)
+    for nome, array in arrays.items():
+        np.save(os.path.join(diretorio, f"{nome}.npy"), np.ascontiguousarray(array))
+
+    return {
+        "arrays": tuple(arrays),
+        "categorias_clientes": tuple(categorias),
+        "niveis2_clientes": tuple(niveis2),
+        "categorias_oficinas": base.capacidades.categorias,
+        "niveis2_oficinas": base.capacidades.niveis2,
+        "metodo": base.metodo,
+    }
+
+
+def _iniciar_processo(diretorio, metadados):
+    """Abre os arrays compartilhados (memory-map, somente leitura) e monta índices e capacidades do processo"""
+    arrays = {nome: np.load(os.path.join(diretorio, f"{nome}.npy"), mmap_mode="r") for nome in metadados["arrays"]}
+    _CONTEXTO.clear()
+    _CONTEXTO.update(arrays)
+    _CONTEXTO["metadados"] = metadados
+    _CONTEXTO["capacidades"] = MatrizCapacidades(
+        categorias=metadados["categorias_oficinas"],
+        niveis2=metadados["niveis2_oficinas"],
+        **{campo: arrays[f"capacidades_{campo}"] for campo in CAMPOS_CAPACIDADES},
+    )
+    _CONTEXTO["indice_clientes"] = IndiceGrade(arrays["clientes_latitude"], arrays["clientes_longitude"], tamanho_celula_km=1.0, metodo=metadados["metodo"])
+    _CONTEXTO["indice_oficinas"] = IndiceGrade(arrays["oficinas_latitude"], arrays["oficinas_longitude"], tamanho_celula_km=2.0, metodo=metadados["metodo"])
+
+
+def _clientes(posicoes):
+    """DataFrame (só das posições pedidas) com as colunas usadas na atribuição"""
+    metadados = _CONTEXTO["metadados"]
+    return pd.DataFrame({
+        "latitude": _CONTEXTO["clientes_latitude"][posicoes],
+        "longitude": _CONTEXTO["clientes_longitude"][posicoes],
+        "mascara_segmento": _CONTEXTO["clientes_mascara_segmento"][posicoes],
+        "mascara_servico": _CONTEXTO["clientes_mascara_servico"][posicoes],
+        "categoria_servico": pd.Categorical.from_codes(_CONTEXTO["clientes_codigo_categoria"][posicoes], metadados["categorias_clientes"]),
+        "servico_nivel2": pd.Categorical.from_codes(_CONTEXTO["clientes_codigo_nivel2"][posicoes], metadados["niveis2_clientes"]),
+    })
+
+
+def _avaliar(tarefa):
+    """Avalia um cenário da varredura no processo atual (mesmas regras de ``motor.simular``)"""
+    indice, principais, raio_km, selecao_segmento, concorrentes = tarefa
+    metodo = _CONTEXTO["metadados"]["metodo"]
+    capacidades = _CONTEXTO["capacidades"]
+    lat, lon = motor.centroide(pd.DataFrame({
+        "latitude": _CONTEXTO["oficinas_latitude"][principais],
+        "longitude": _CONTEXTO["oficinas_longitude"][principais],
+    }))
+
+    posicoes_clientes, _ = _CONTEXTO["indice_clientes"].no_raio(lat, lon, raio_km)
+    posicoes_oficinas, _ = _CONTEXTO["indice_oficinas"].no_raio(lat, lon, raio_km)
+    if selecao_segmento:
+        posicoes_clientes = posicoes_clientes[filtrar_mascara(_CONTEXTO["clientes_mascara_segmento"][posicoes_clientes], selecao_segmento)]
+        posicoes_oficinas = posicoes_oficinas[filtrar_mascara(capacidades.mascara_segmento[posicoes_oficinas], selecao_segmento)]
+    posicoes_clientes = np.sort(posicoes_clientes)
+
+    concorrentes_no_raio = np.setdiff1d(posicoes_oficinas, principais)
+    ativos = concorrentes_no_raio if concorrentes is None else np.intersect1d(concorrentes_no_raio, concorrentes)
+
+    ids_principais = capacidades.ids[principais]
+    ids_oficina, _, atendimento, receita_por_oficina = motor.atribuir_clientes(
+        _clientes(posicoes_clientes), capacidades, ids_principais, capacidades.ids[ativos], metodo,
+        pesos=_CONTEXTO["clientes_receita_anual"][posicoes_clientes],
+    )
+    receita_principais = float(receita_por_oficina[ids_principais].sum())
+    return {
+        "indice": indice,
+        "clientes_raio": len(posicoes_clientes),
+        "concorrentes_raio": len(concorrentes_no_raio),
+        "concorrentes_ativos": len(ativos),
+        "clientes_principais": int((atendimento == ATENDIMENTO_PRINCIPAIS).sum()),
+        "clientes_concorrentes": int((atendimento == ATENDIMENTO_CONCORRENTES).sum()),
+        "clientes_sem_oficina": int((atendimento == ATENDIMENTO_NENHUM).sum()),
+        "receita_principais": receita_principais,
+        "receita_concorrentes": float(receita_por_oficina.sum()) - receita_principais,
+    }
+
+
+def _tarefas(base, cenarios):
+    """Converte os cenários em tarefas leves (posições e máscaras), validando os nomes"""
+    posicao_por_nome = pd.Series(np.arange(len(base.oficinas)), index=base.oficinas["nome_oficina"].to_numpy())
+    posicao_por_nome = posicao_por_nome[~posicao_por_nome.index.duplicated()]
+    codificador_segmento = base.codificadores["segmento"]
+
+    tarefas = []
+    for i, cenario in enumerate(cenarios):
+        if any(cenario.filtros[1:]):
+            raise ValueError(f"Cenário {cenario.nome!r}: a varredura só filtra por segmento")
+        desconhecidas = [nome for nome in cenario.oficinas_principais if nome not in posicao_por_nome.index]
+        if desconhecidas or not cenario.oficinas_principais:
+            raise ValueError(f"Cenário {cenario.nome!r}: oficinas principais não encontradas: {', '.join(desconhecidas) or '(nenhuma)'}")
+        # Na ordem do cadastro, como em motor.simular (a média em float32 depende da ordem)
+        principais = np.sort(posicao_por_nome[list(cenario.oficinas_principais)].to_numpy())
+        concorrentes = None
+        if cenario.concorrentes is not None:
+            concorrentes = posicao_por_nome.reindex(list(cenario.concorrentes)).dropna().to_numpy(dtype=np.int64)
+        selecao = int(codificador_segmento.mascara(cenario.segmentos)) if cenario.segmentos else 0
+        tarefas.append((i, principais, cenario.raio_km, selecao, concorrentes))
+    return tarefas
+
+
+def varrer(base, cenarios, processos=None, tamanho_lote=32, ordenar_por="clientes_principais"):
+    """Avalia os cenários em paralelo e devolve a tabela ordenada por ``ordenar_por``
+    (um dos ``CRITERIOS_ORDENACAO``: clientes ou receita anual capturados pelas principais).
+
+    ``processos=1`` avalia no próprio processo (sem pool); ``None`` usa um
+    processo por CPU.
+    """
+    if ordenar_por not in CRITERIOS_ORDENACAO:
+        raise ValueError(f"Critério de ordenação {ordenar_por!r} inválido: use {', '.join(CRITERIOS_ORDENACAO)}")
+    tarefas = _tarefas(base, cenarios)
+    with tempfile.TemporaryDirectory(prefix="varredura_") as diretorio:
+        metadados = gravar_compartilhados(base, diretorio)
+        if processos == 1:
+            _iniciar_processo(diretorio, metadados)
+            resultados = [_avaliar(tarefa) for tarefa in tarefas]
+        else:
+            with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo, initargs=(diretorio, metadados)) as executor:
+                resultados = list(executor.map(_avaliar, tarefas, chunksize=tamanho_lote))
+
+    tabela = pd.DataFrame(resultados).set_index("indice").sort_index()
+    tabela.insert(0, "cenario", [c.nome for c in cenarios])
+    tabela.insert(1, "oficinas_principais", [" + ".join(c.oficinas_principais) for c in cenarios])
+    tabela.insert(2, "raio_km", [c.raio_km for c in cenarios])
+    tabela.insert(3, "segmentos", [", ".join(c.segmentos) or ROTULO_TODOS_SEGMENTOS for c in cenarios])
+    tabela.insert(4, "concorrentes", [ROTULO_TODOS_CONCORRENTES if c.concorrentes is None else ", ".join(c.concorrentes) for c in cenarios])
+    tabela["participacao_principais"] = (tabela["clientes_principais"] / tabela["clientes_raio"].where(tabela["clientes_raio"] > 0)).fillna(0.0)
+
+    tabela = tabela.sort_values([ordenar_por, "participacao_principais"], ascending=False, kind="stable").reset_index(drop=True)
+    tabela.insert(0, "posicao", np.arange(1, len(tabela) + 1))
+    return tabela